@@ -4,6 +4,10 @@ from slack_sdk.errors import SlackApiError
 from datetime import datetime
 import logging
 from db import *
+from recurrence import load_events_with_occurrences, load_event_or_occurrence
+from ical import feed_url
+from directory import get_channels, is_group_member
+from historylog import flush_history
 import config
 import locale
 from dataclasses import dataclass, field
@@ -150,6 +154,14 @@ def build_attendance_blocks(
                         },
                         "action_id": f"open_filter",
                         "value": filter
+                    },
+                    {
+                        "type": "button",
+                        "text": {
+                            "type": "plain_text",
+                            "text": "Statistiky"
+                        },
+                        "action_id": "go_to_stats"
                     }
                 ]
             },
@@ -424,15 +436,22 @@ def show_attendance(
     """
     try:
         # Load data
-        events = load_events_from_db() if filter == "all" else load_events_by_type_from_db(FILTER_DB.get(filter))
+        events = load_events_with_occurrences(None if filter == "all" else FILTER_DB.get(filter))
         user_attendance = load_participants_for_user(user_id)
         
         # Check admin status
-        attendance_admins = client.usergroups_users_list(usergroup=config.admin_group)
-        is_admin = user_id in attendance_admins['users']
+        is_admin = is_group_member(client, config.admin_group, user_id)
 
         # Build and publish view
         blocks = build_attendance_blocks(events, user_attendance, is_admin, page, filter)
+        if calendar_url := feed_url(user_id):
+            blocks.append({
+                "type": "context",
+                "elements": [{
+                    "type": "mrkdwn",
+                    "text": f"📅 Kalendář s tvou docházkou: <{calendar_url}|odkaz pro Google/Apple kalendář>"
+                }]
+            })
         
         client.views_publish(
             user_id=user_id,
@@ -655,7 +674,7 @@ def show_participants(
     """Show event participants in a modal view with pagination."""
     try:
         participants = load_participants_from_event(event_id)
-        event = load_event_from_db(event_id)
+        event = load_event_or_occurrence(event_id)
         
         blocks = create_participant_blocks(
             participants, 
@@ -753,6 +772,8 @@ def show_history(
 ) -> None:
     """Show event history in a modal view with pagination."""
     try:
+        # Rows queued by this process are inserted first, so the latest change is shown
+        flush_history(logger)
         history = load_history_from_event(event_id)
         blocks = create_history_blocks(history, page, event_id)
         
@@ -994,22 +1015,8 @@ def share_event(
          logger.error(f"Error opening modal: {e}")
 
 def fetch_channels(client: WebClient, logger: logging.Logger) -> List[Dict[str, Any]]:
-    """Fetch channels from Slack"""
-    try:
-        response = client.conversations_list(
-            types="public_channel,private_channel",
-            exclude_archived=True
-        )
-        channels = sorted(
-            [
-                {"text": {"type": "plain_text", "text": channel["name"]}, "value": channel["id"]}
-                for channel in response["channels"]
-            ],
-            key=lambda x: locale.strxfrm(x["text"]["text"])
-        )
-        return channels
-    except SlackApiError as e:
-        logger.error(f"Error fetching channels: {e}")
+    """Get channels from the channel directory"""
+    return get_channels(client, logger)
 
 def open_chat_attendance_modal(
     body: Dict[str, Any],
@@ -0,0 +1,234 @@
+"""
+Micro-benchmarks of the block builders and formatters run on every interaction.
+
+Fixtures are generated deterministically (150 users, 300 events, 5000
+history rows), so results of different commits are comparable on the same
+machine. The builders are pure, no database or Slack connection is used.
+
+Usage:
+    python benchmarks.py --save        # store baseline
+    python benchmarks.py               # compare with the baseline, exit 1 on regression
+    python benchmarks.py --filter history --threshold 0.1
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+import statistics
+import argparse
+import random
+import json
+import time
+import os
+import config
+from attendance import (
+    build_attendance_blocks, create_participant_blocks, format_status_section,
+    create_history_blocks, get_participant_groups, HISTORY_PAGE_SIZE
+)
+from events import build_event_list_blocks
+from edit import build_participant_blocks
+from settings import build_settings_blocks
+from stats import build_stats_blocks
+
+# Constants
+BASELINE_FILE = "benchmarks_baseline.json"
+FIXTURE_SEED = 20240901
+USERS = 150
+EVENTS = 300
+HISTORY_ROWS = 5000
+CHANNELS = 200
+DEFAULT_THRESHOLD = 0.25
+REPEATS = 7
+# Target duration of one repeat, the number of calls is calibrated to it
+TARGET_SECONDS = 0.2
+
+EVENT_TYPES = ["Trénink", "Trénink", "Trénink", "Turnaj", "Ostatní"]
+STATUSES = ["Coming", "Coming", "Coming", "Late", "Not Coming"]
+NOTES = [None, None, None, "", "přijdu později", "nemoc", "práce, možná dorazím na konec"]
+
+def build_fixtures() -> Dict[str, Any]:
+    """Build deterministic users, events, participants and history."""
+    rng = random.Random(FIXTURE_SEED)
+    now = datetime.now().replace(second=0, microsecond=0)
+
+    users = [
+        {
+            "user_id": f"U{i:08d}",
+            "name": f"Hráč {i:03d} Příjmení",
+            "category": "Women" if i % 3 == 0 else "Open"
+        }
+        for i in range(USERS)
+    ]
+
+    events = []
+    for i in range(EVENTS):
+        start = now + timedelta(days=i // 2 - 10, hours=(i % 2) * 3)
+        events.append({
+            "id": i + 1,
+            "name": f"Událost {i + 1}",
+            "start_time": start,
+            "end_time": start + timedelta(hours=2),
+            "lock_time": start - timedelta(hours=rng.choice([1, 12, 24])),
+            "type": EVENT_TYPES[i % len(EVENT_TYPES)],
+            "address": "Sportovní hala, Praha" if i % 4 else None
+        })
+
+    # Participation of every user in one event, as loaded for the participants modal
+    participants = [
+        {**user, "status": rng.choice(STATUSES), "note": rng.choice(NOTES)}
+        for user in users
+        if rng.random() < 0.9
+    ]
+
+    # One user's attendance over all events, as loaded for the Home tab
+    user_attendance = [
+        {"event_id": event["id"], "status": rng.choice(STATUSES), "note": rng.choice(NOTES)}
+        for event in events
+        if rng.random() < 0.7
+    ]
+
+    history = []
+    timestamp = now - timedelta(days=30)
+    for _ in range(HISTORY_ROWS):
+        user = rng.choice(users)
+        old_status, new_status = rng.sample(["Coming", "Late", "Not Coming"], 2)
+        timestamp += timedelta(seconds=rng.randint(10, 900))
+        history.append({
+            "name": user["name"],
+            "old_status": old_status,
+            "new_status": new_status,
+            "old_note": rng.choice(NOTES),
+            "new_note": rng.choice(NOTES),
+            "timestamp": timestamp
+        })
+    history.reverse()
+
+    rollups = []
+    for user in users:
+        coming, late, not_coming = rng.randint(0, 40), rng.randint(0, 8), rng.randint(0, 15)
+        best = rng.randint(0, coming + late)
+        rollups.append({
+            **user, "coming": coming, "late": late, "not_coming": not_coming,
+            "late_cancellations": rng.randint(0, 4), "current_streak": rng.randint(0, best), "best_streak": best
+        })
+
+    channels = [{"text": {"type": "plain_text", "text": f"kanal-{i:03d}"}, "value": f"C{i:08d}"} for i in range(CHANNELS)]
+    config_values = {**config.config, "export_channel": channels[CHANNELS // 2]["value"]}
+
+    return {
+        "users": users,
+        "events": events,
+        "participants": participants,
+        "user_attendance": user_attendance,
+        "history": history,
+        "rollups": rollups,
+        "channels": channels,
+        "config_values": config_values
+    }
+
+def build_cases(fixtures: Dict[str, Any]) -> Dict[str, Callable[[], Any]]:
+    """Map benchmark names to calls of the measured functions."""
+    events = fixtures["events"]
+    participants = fixtures["participants"]
+    attendance = fixtures["user_attendance"]
+    history = fixtures["history"]
+    training = next(event for event in events if event["type"] == "Trénink")
+    tournament = next(event for event in events if event["type"] == "Turnaj")
+    group = get_participant_groups(participants, "Coming")
+    last_history_page = (len(history) - 1) // HISTORY_PAGE_SIZE
+
+    return {
+        "build_attendance_blocks[admin,page0]": lambda: build_attendance_blocks(events, attendance, True, 0, "all"),
+        "build_attendance_blocks[member,page5]": lambda: build_attendance_blocks(events, attendance, False, 5, "all"),
+        "create_participant_blocks[training,coming]": lambda: create_participant_blocks(participants, training, 0),
+        "create_participant_blocks[tournament,not_coming]": lambda: create_participant_blocks(participants, tournament, 2),
+        "format_status_section": lambda: format_status_section(config.coming_text, "🟢", group),
+        "create_history_blocks[first]": lambda: create_history_blocks(history, 0, "1"),
+        "create_history_blocks[last]": lambda: create_history_blocks(history, last_history_page, "1"),
+        "build_event_list_blocks[page0]": lambda: build_event_list_blocks(events, 0),
+        "build_event_list_blocks[page10]": lambda: build_event_list_blocks(events, 10),
+        "edit.build_participant_blocks[empty]": lambda: build_participant_blocks(training),
+        "edit.build_participant_blocks[participant]": lambda: build_participant_blocks(training, participants[0]),
+        "settings.build_settings_blocks": lambda: build_settings_blocks(fixtures["channels"], fixtures["config_values"]),
+        "stats.build_stats_blocks": lambda: build_stats_blocks(fixtures["rollups"], "2024/25", "Trénink")
+    }
+
+def calibrate(func: Callable[[], Any]) -> int:
+    """Find number of calls per repeat taking about TARGET_SECONDS."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= TARGET_SECONDS / 10 or number >= 1_000_000:
+            return max(1, int(number * TARGET_SECONDS / max(elapsed, 1e-9)))
+        number *= 10
+
+def measure(func: Callable[[], Any], repeats: int = REPEATS) -> Dict[str, float]:
+    """Measure per-call time in microseconds over several repeats."""
+    number = calibrate(func)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number * 1e6)
+    return {
+        "min_us": min(timings),
+        "median_us": statistics.median(timings),
+        "stdev_us": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "calls": number
+    }
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[Tuple[str, float]]:
+    """Get benchmarks whose minimum grew by more than threshold against the baseline."""
+    regressions = []
+    for name, stats in results.items():
+        old = baseline.get(name)
+        if old and old["min_us"]:
+            change = stats["min_us"] / old["min_us"] - 1
+            if change > threshold:
+                regressions.append((name, change))
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative slowdown counted as regression")
+    parser.add_argument("--filter", default="", help="Run only benchmarks containing this text")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    args = parser.parse_args()
+
+    # Default texts, the builders read them from config module globals
+    config.update_global_variables()
+    cases = build_cases(build_fixtures())
+
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    print(f"{'benchmark':<50} {'min us':>10} {'median us':>10} {'baseline':>10} {'change':>8}")
+    for name, func in cases.items():
+        if args.filter not in name:
+            continue
+        stats = results[name] = measure(func, args.repeats)
+        old = baseline.get(name)
+        change = f"{stats['min_us'] / old['min_us'] - 1:+.0%}" if old and old["min_us"] else ""
+        print(f"{name:<50} {stats['min_us']:>10.1f} {stats['median_us']:>10.1f} "
+              f"{old['min_us'] if old else float('nan'):>10.1f} {change:>8}")
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"created": datetime.now().isoformat(), "results": results}, f, indent=2)
+        print(f"\nBaseline stored in {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, change in regressions:
+        print(f"REGRESSION {name}: {change:+.0%} (threshold {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,3 +1,5 @@
+# First, so the imports below are timed
+import startup
 import os
 import re
 import logging
@@ -5,7 +7,6 @@ from datetime import datetime
 from dotenv import load_dotenv
 from typing import Dict, Any, Tuple, List, Callable, Optional
 from slack_bolt import App
-from slack_bolt.adapter.socket_mode import SocketModeHandler
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from db import *
@@ -14,10 +15,28 @@ from events import *
 from export import *
 from settings import *
 from edit import *
+from coalesce import submit_participation, flush_all
+from recurrence import (
+    load_event_or_occurrence, load_occurrences_in_range, materialize_occurrence,
+    delete_event_or_occurrence, load_events_with_occurrences
+)
+from export_jobs import submit_export_job, start_export_recovery, shutdown_export_jobs
+from scheduler import start_scheduler, stop_scheduler
+from ical import start_feed_server, stop_feed_server
+from metrics import InstrumentedWebClient, instrument_app, start_metrics_server, stop_metrics_server
+from tracing import start_tracing, stop_tracing
+from querystats import dump_query_stats
+from workers import socket_mode_layout, create_handler, run_workers, share_changes
+from usersearch import search_users, user_index
+from historylog import start_history_writer, stop_history_writer
+from outbox import start_outbox_dispatcher, stop_outbox_dispatcher, subscribe_webhook
+from stats import show_stats, start_rollup_refresher, stop_rollup_refresher, FILTERS_BLOCK
+from directory import CHANNEL_EVENTS, SUBTEAM_EVENTS, handle_directory_event, load_directory
 import config
 import calendar
 import locale
 
+startup.mark("imports")
 load_dotenv()
 
 # Initialize locale
@@ -26,6 +45,7 @@ locale.setlocale(locale.LC_COLLATE, 'cs_CZ.utf8')
 # Constants
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 SLACK_APP_TOKEN = os.getenv("SLACK_APP_TOKEN")
+SLACK_API_URL = os.getenv("SLACK_API_URL", WebClient.BASE_URL)
 UNKNOWN_USER = "Unknown"
 DEFAULT_DATE_FORMAT = '%Y-%m-%d'
 DEFAULT_PAGE = 0
@@ -104,6 +124,7 @@ EDIT_EVENT_PATTERN = re.compile(r"^edit_event_\d+$")
 DUPLICATE_EVENT_PATTERN = re.compile(r"^duplicate_event_\d+$")
 SELECT_EVENT_PATTERN = re.compile(r"^select_event_\d+$")
 SELECT_USER_PATTERN = re.compile(r"select_edit_user_(\d+)")
+REPEAT_EVENT_PATTERN = re.compile(r"^repeat_event_\d+$")
 
 MESSAGES = {
     "ERROR": "Prosím, vyplňte všechna povinná pole.",
@@ -138,7 +159,8 @@ ERROR_MESSAGES = {
 
 EXPORT_BLOCKS = {
     "START_DATE": "start_date",
-    "END_DATE": "end_date"
+    "END_DATE": "end_date",
+    "FORMAT": "export_format"
 }
 
 DATE_BLOCKS = {
@@ -173,8 +195,9 @@ class SlackBotError(Exception):
     pass
 
 # Initialize app and client
-app = App(token=SLACK_BOT_TOKEN)
-client = WebClient(token=SLACK_BOT_TOKEN)
+client = InstrumentedWebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_URL)
+app = App(client=client)
+instrument_app(app)
 
 def get_user_by_id(
     user_id: str,
@@ -366,6 +389,16 @@ def handle_home_opened(event: Dict[str, Any], logger: logging.Logger) -> None:
     except Exception as e:
         logger.error(f"Error in home opened handler: {datetime.now()} - {e}")
 
+def handle_directory_changed(event: Dict[str, Any], logger: logging.Logger) -> None:
+    """Handle channel and user group events keeping the channel directory fresh"""
+    try:
+        handle_directory_event(event, logger)
+    except Exception as e:
+        logger.error(f"Error in directory event handler: {datetime.now()} - {e}")
+
+for directory_event in CHANNEL_EVENTS + SUBTEAM_EVENTS:
+    app.event(directory_event)(handle_directory_changed)
+
 @app.action("main_menu_overflow")
 def handle_main_menu_overflow(ack: Any, body: Dict[str, Any], client: WebClient, logger: logging.Logger) -> None:
     """Handle main menu overflow action selection."""
@@ -564,6 +597,7 @@ def handle_attendance_action(
         event_id, user_id = parse_attendance_value(action_value)
         view_id = body["user"]["id"]
         
+        event_id = materialize_occurrence(event_id)
         insert_participation(event_id, user_id, status)
         show_edit_attendance_players(client, logger, event_id, view_id, user_id)
         
@@ -612,6 +646,50 @@ def go_to_attendance_action(
         logger.error(f"Error in attendance action: {datetime.now()} - {e}")
         raise
 
+@app.action("go_to_stats")
+def go_to_stats_action(
+    ack: Any,
+    body: Dict[str, Any],
+    client: WebClient,
+    logger: logging.Logger
+) -> None:
+    """Handle opening of the attendance statistics dashboard."""
+    ack()
+    show_stats(client, body["user"]["id"], logger)
+
+@app.action("stats_season_select")
+@app.action("stats_type_select")
+def handle_stats_filter(
+    ack: Any,
+    body: Dict[str, Any],
+    client: WebClient,
+    logger: logging.Logger
+) -> None:
+    """Handle change of the season or event type of the statistics dashboard."""
+    ack()
+    try:
+        filters = body["view"]["state"]["values"][FILTERS_BLOCK]
+        show_stats(
+            client,
+            body["user"]["id"],
+            logger,
+            filters["stats_season_select"]["selected_option"]["value"],
+            filters["stats_type_select"]["selected_option"]["value"]
+        )
+    except Exception as e:
+        logger.error(f"Error filtering statistics: {datetime.now()} - {e}")
+
+@app.action("show_query_stats")
+def show_query_stats_action(
+    ack: Any,
+    body: Dict[str, Any],
+    client: WebClient,
+    logger: logging.Logger
+) -> None:
+    """Handle opening of the query statistics modal."""
+    ack()
+    show_query_stats(body, client, logger)
+
 def go_to_attendance_page(
     ack: Any,
     body: Dict[str, Any],
@@ -667,14 +745,22 @@ def handle_participation_action(
         user_id = body["user"]["id"]
         
         note = body['view']['state']['values'][f'reason_{event_id}'][f'reason_input_{event_id}']['value']
-        event = load_event_from_db(event_id)
+        event = load_event_or_occurrence(event_id)
         
         if datetime.now() > event["lock_time"]:
             client.chat_postMessage(channel=user_id, text=LOCKED_MESSAGE)
-        else:
-            insert_participation(event_id, user_id, status, note)
-            
-        go_to_attendance_page(ack, body, logger, page, filter)
+            go_to_attendance_page(ack, body, logger, page, filter)
+            return
+
+        event_id = materialize_occurrence(event_id)
+        submit_participation(
+            event_id,
+            user_id,
+            status,
+            note,
+            lambda: show_attendance(client, user_id, logger, page, filter),
+            logger
+        )
         
     except SlackApiError as e:
         logger.error(f"Slack API error in {status} action: {datetime.now()} - {e}")
@@ -947,6 +1033,14 @@ def save_settings_to_config(settings: Dict[str, str]) -> None:
     for key, value in settings.items():
         config.set_setting(key, value)
     config.save_settings()
+    notify_change("settings")
+
+def reload_settings(kind: str, **keys: Any) -> None:
+    """Change listener, settings may be saved by another worker process."""
+    if kind == "settings":
+        config.load_settings()
+
+add_change_listener(reload_settings)
 
 @app.action("save_settings")
 def handle_save_settings(
@@ -1086,7 +1180,7 @@ def delete_event_action(
         action_value = body["actions"][0]["value"]
         event_id, page = parse_delete_action(action_value)
         
-        delete_event(event_id)
+        delete_event_or_occurrence(event_id)
         
         client.chat_postMessage(
             channel=user_id,
@@ -1283,6 +1377,72 @@ def handle_duplicate_submission(
         logger.error(f"Error handling duplicate submission: {datetime.now()} - {e}")
         raise
 
+@app.action(REPEAT_EVENT_PATTERN)
+def handle_repeat_action(
+    ack: Any,
+    body: Dict[str, Any],
+    client: WebClient,
+    logger: logging.Logger
+) -> None:
+    """
+    Handle repeat event action.
+    
+    Args:
+        ack: Acknowledge function
+        body: Request body
+        client: Slack client instance
+        logger: Logger instance
+    """
+    try:
+        ack()
+        action_id = body['actions'][0]['action_id']
+        event_id = action_id.split('_')[-1]
+
+        if not event_id.isdigit():
+            raise ValueError(ERROR_MESSAGES["INVALID_ID"])
+
+        open_repeat_modal(client, body['trigger_id'], event_id)
+        
+    except SlackApiError as e:
+        logger.error(f"Slack API error: {datetime.now()} - {e}")
+        raise
+    except Exception as e:
+        logger.error(f"Error handling repeat action: {datetime.now()} - {e}")
+        raise
+
+@app.view(REPEAT_EVENT_PATTERN)
+def handle_repeat_submission(
+    ack: Any,
+    body: Dict[str, Any],
+    client: WebClient,
+    logger: logging.Logger
+) -> None:
+    """
+    Handle repeat event submission.
+    
+    Args:
+        ack: Acknowledge function
+        body: Request body
+        client: Slack client instance
+        logger: Logger instance
+    """
+    try:
+        event = load_event_from_db(body['view']['callback_id'].split('_')[-1])
+        if event and event.get('series_id'):
+            return ack(response_action="errors", errors={
+                "repeat_interval_block": MESSAGES_RECURRENCE["IN_SERIES"]
+            })
+
+        ack()
+        handle_repeat_event_submission(client, body, logger)
+        
+    except SlackApiError as e:
+        logger.error(f"Slack API error: {datetime.now()} - {e}")
+        raise
+    except Exception as e:
+        logger.error(f"Error handling repeat submission: {datetime.now()} - {e}")
+        raise
+
 def validate_export_dates(start_date: str, end_date: str) -> bool:
     """Validate export date range."""
     try:
@@ -1312,6 +1472,9 @@ def handle_export_dates_submission(
         state_values = body["view"]["state"]["values"]
         start_date = state_values[EXPORT_BLOCKS["START_DATE"]][f"{EXPORT_BLOCKS['START_DATE']}_select"]["selected_date"]
         end_date = state_values[EXPORT_BLOCKS["END_DATE"]][f"{EXPORT_BLOCKS['END_DATE']}_select"]["selected_date"]
+        export_format = get_selected_option_value(
+            state_values, EXPORT_BLOCKS["FORMAT"], f"{EXPORT_BLOCKS['FORMAT']}_select"
+        ) or DEFAULT_EXPORT_FORMAT
         user_id = body["user"]["id"]
 
         if not validate_export_dates(start_date, end_date):
@@ -1321,7 +1484,7 @@ def handle_export_dates_submission(
             return
 
         ack()
-        export_data_to_csv(start_date, end_date, user_id, client, logger)
+        submit_export_job(start_date, end_date, user_id, client, logger, export_format)
 
     except SlackApiError as e:
         logger.error(f"Slack API error in export: {datetime.now()} - {e}")
@@ -1485,20 +1648,8 @@ def handle_user_selection(
         logger: Logger instance
     """
     try:
-        user_input = body.get("value", "").strip().lower()
-        users = load_users_from_db()
-
-        filtered_users = (
-            [user for user in users if user_input in user['name'].lower()]
-            if user_input
-            else users
-        )
-
-        # Sort by name and limit results
-        sorted_users = sorted(
-            filtered_users, 
-            key=lambda x: x['name']
-        )[:MAX_RESULTS]
+        # Served from memory, sorted by Czech collation and limited
+        sorted_users = search_users(body.get("value", ""), MAX_RESULTS, logger)
 
         if not sorted_users:
             ack(options=[])
@@ -1563,9 +1714,16 @@ def handle_attendance_submit(
 
         start_date, end_date = get_today_and_last_day_of_next_month()
         events = load_events_in_range_from_db(start_date, end_date)
+        occurrences = [
+            occurrence
+            for occurrence in load_occurrences_in_range(
+                start_date.date(), datetime.strptime(end_date, DEFAULT_DATE_FORMAT).date(), "Trénink"
+            )
+            if occurrence["lock_time"] >= start_date
+        ]
 
-        for event in events:
-            insert_participation(event["id"], user_id, selection, note)
+        for event in [*events, *occurrences]:
+            insert_participation(materialize_occurrence(event["id"]), user_id, selection, note)
 
         show_attendance(client, user_id, logger)
 
@@ -1614,7 +1772,7 @@ def handle_participants_navigation(
         new_page = int(body["actions"][0]["value"])
         
         participants = load_participants_from_event(event_id)
-        event = load_event_from_db(event_id)
+        event = load_event_or_occurrence(event_id)
         
         blocks = create_participant_blocks(
             participants,
@@ -1714,7 +1872,7 @@ def handle_share_event_submission(
     try:
         ack()
         user_id = body["user"]["id"]
-        event_id = body["view"]["private_metadata"]
+        event_id = materialize_occurrence(body["view"]["private_metadata"])
         values = body["view"]["state"]["values"]
         text_input = values["message"]["text_input"]["value"]
         channel_id = values["share_channel_block"]["share_channel_select"]["selected_option"]["value"]
@@ -1974,7 +2132,70 @@ def handle_change_to_women_category(ack: Any, body: Dict[str, Any], client: WebC
     except Exception as e:
         logger.error(f"Error handling change to Women category: {datetime.now()} - {e}")
 
-if __name__ == "__main__":
+def on_connected() -> None:
+    """Report startup timing and warm up what the first Home tab open needs."""
+    startup.report(logging.getLogger(__name__))
+    startup.warm_up([
+        ("database", lambda: connect_to_db().close()),
+        ("events", load_events_with_occurrences),
+        ("user_index", user_index.load),
+        ("directory", lambda: load_directory(client, logging.getLogger(__name__)))
+    ], logging.getLogger(__name__))
+
+def run_bot(worker_index: int = 0) -> None:
+    """
+    Run one bot process until it is stopped.
+
+    Every worker opens its Socket Mode connections and follows changes of the
+    others through the outbox, worker 0 also runs the reminder scheduler, the
+    calendar feed server, the outbox webhook, counts started events into the
+    attendance rollups and takes over export jobs of processes that stopped,
+    also after the supervisor restarts it.
+
+    Args:
+        worker_index: Index of the worker process
+    """
+    logger = logging.getLogger(__name__)
+    startup.mark("app_setup")
     config.load_settings()
-    handler = SocketModeHandler(app, SLACK_APP_TOKEN)
-    handler.start()
+    _, connections = socket_mode_layout()
+    leader = worker_index == 0
+    start_tracing(logger)
+    start_history_writer(logger)
+    share_changes(logger)
+    start_outbox_dispatcher(logger)
+    if leader:
+        start_export_recovery(client, logger)
+        start_scheduler(client, logger)
+        start_feed_server(logger)
+        subscribe_webhook()
+        start_rollup_refresher(logger)
+    start_metrics_server(logger, worker_index)
+    startup.mark("services")
+    handlers = [create_handler(app, SLACK_APP_TOKEN) for _ in range(connections)]
+    handlers[0].client.message_listeners.append(startup.on_socket_mode_hello(on_connected))
+    try:
+        for handler in handlers[1:]:
+            handler.connect()
+        handlers[0].start()
+    finally:
+        for handler in handlers[1:]:
+            handler.close()
+        if leader:
+            stop_scheduler()
+            stop_feed_server()
+            stop_rollup_refresher()
+        stop_outbox_dispatcher()
+        stop_metrics_server()
+        flush_all(logger)
+        stop_history_writer(logger)
+        shutdown_export_jobs()
+        dump_query_stats(logger)
+        stop_tracing(logger)
+
+if __name__ == "__main__":
+    workers, _ = socket_mode_layout()
+    if workers > 1:
+        run_workers(workers, run_bot, logging.getLogger(__name__))
+    else:
+        run_bot()
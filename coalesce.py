@@ -0,0 +1,120 @@
+from typing import Dict, Any, Optional, Callable, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime
+import threading
+import logging
+from db import insert_participation, load_user_in_event
+from metrics import register_gauge
+from tracing import propagate
+
+# Constants
+COALESCE_WINDOW = 0.4  # seconds of quiet before the latest click is written
+
+@dataclass
+class PendingIntent:
+    status: str
+    note: Optional[str]
+    render: Callable[[], None]
+    clicks: int = 1
+    timer: Optional[threading.Timer] = field(default=None, repr=False)
+
+_pending: Dict[Tuple[str, int], PendingIntent] = {}
+_lock = threading.Lock()
+
+register_gauge("coalesce_pending_intents", "Participation clicks waiting to be written", lambda: len(_pending))
+
+def normalize_note(note: Optional[str]) -> str:
+    """Normalize note for comparison with the stored value."""
+    return (note or "").strip()
+
+def is_net_change(current: Optional[Dict[str, Any]], status: str, note: Optional[str]) -> bool:
+    """Check whether the intent differs from the stored participation."""
+    if not current or not current.get("status"):
+        return True
+    return current["status"] != status or normalize_note(current.get("note")) != normalize_note(note)
+
+def submit_participation(
+    event_id: int,
+    user_id: str,
+    status: str,
+    note: Optional[str],
+    render: Callable[[], None],
+    logger: logging.Logger,
+    window: float = COALESCE_WINDOW
+) -> None:
+    """
+    Queue participation change and coalesce it with clicks from the same window.
+
+    Repeated clicks for the same (user, event) restart the window, only the
+    latest intent is written and only one re-render is emitted per burst.
+    Pending intents are kept per process, clicks Slack delivers to different
+    workers or hosts are coalesced separately.
+
+    Args:
+        event_id: Event ID
+        user_id: User ID
+        status: Participation status
+        note: Optional note
+        render: Callback re-rendering the view after the write
+        logger: Logger instance
+        window: Quiet period in seconds before flushing
+    """
+    key = (user_id, int(event_id))
+    with _lock:
+        pending = _pending.get(key)
+        if pending:
+            pending.timer.cancel()
+            pending.status = status
+            pending.note = note
+            pending.render = render
+            pending.clicks += 1
+        else:
+            pending = PendingIntent(status=status, note=note, render=render)
+            _pending[key] = pending
+
+        pending.timer = threading.Timer(window, propagate(flush_participation), args=(key, logger))
+        pending.timer.daemon = True
+        pending.timer.start()
+
+def flush_participation(key: Tuple[str, int], logger: logging.Logger) -> None:
+    """
+    Write the latest intent for (user, event) and re-render once.
+
+    Args:
+        key: Tuple of user ID and event ID
+        logger: Logger instance
+    """
+    with _lock:
+        pending = _pending.pop(key, None)
+    if not pending:
+        return
+
+    user_id, event_id = key
+    try:
+        current = load_user_in_event(event_id, user_id, logger)
+        if is_net_change(current, pending.status, pending.note):
+            insert_participation(event_id, user_id, pending.status, pending.note, logger)
+        elif logger:
+            logger.debug(f"Skipping no-op participation for {user_id} in event {event_id} after {pending.clicks} clicks")
+    except Exception as e:
+        logger.error(f"Error flushing participation: {datetime.now()} - {e}")
+
+    try:
+        pending.render()
+    except Exception as e:
+        logger.error(f"Error rendering after participation: {datetime.now()} - {e}")
+
+def flush_all(logger: logging.Logger) -> None:
+    """
+    Flush all pending intents immediately, e.g. on shutdown.
+
+    Args:
+        logger: Logger instance
+    """
+    with _lock:
+        keys = list(_pending.keys())
+        for key in keys:
+            _pending[key].timer.cancel()
+
+    for key in keys:
+        flush_participation(key, logger)
@@ -0,0 +1,94 @@
+from typing import Any, Dict, Iterable, Iterator, List
+
+# Constants
+BATCH_ROWS = 10000
+DICTIONARY_COLUMNS = {"category", "event_name", "event_type", "status"}
+
+class ColumnarError(Exception):
+    """Base exception for columnar export related errors"""
+    pass
+
+def import_pyarrow():
+    """
+    Import pyarrow lazily, it is only needed for columnar exports.
+
+    Raises:
+        ColumnarError: If pyarrow is not installed
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ColumnarError("Parquet/Arrow export requires the pyarrow package")
+
+def build_schema(pa):
+    """Build typed schema of the participation export."""
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("user_id", pa.string()),
+        ("name", pa.string()),
+        ("category", dictionary),
+        ("event_id", pa.int32()),
+        ("event_name", dictionary),
+        ("event_type", dictionary),
+        ("status", dictionary),
+        ("note", pa.string()),
+        ("start_time", pa.timestamp("s")),
+        ("end_time", pa.timestamp("s"))
+    ])
+
+def chunk_rows(rows: Iterable[Dict[str, Any]], size: int = BATCH_ROWS) -> Iterator[List[Dict[str, Any]]]:
+    """Split rows into lists of given size."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def build_record_batch(pa, schema, rows: List[Dict[str, Any]]):
+    """Build record batch with dictionary encoded low-cardinality columns."""
+    columns = []
+    for column in schema:
+        source = "type" if column.name == "event_type" else column.name
+        values = [row.get(source) for row in rows]
+        if column.name in DICTIONARY_COLUMNS:
+            columns.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            columns.append(pa.array(values, type=column.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+def write_parquet(rows: Iterable[Dict[str, Any]], path: str) -> None:
+    """
+    Write participations as Parquet file, one row group per batch.
+
+    Raises:
+        ColumnarError: If pyarrow is not installed
+    """
+    pa = import_pyarrow()
+    schema = build_schema(pa)
+    with pa.parquet.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in chunk_rows(rows):
+            writer.write_batch(build_record_batch(pa, schema, chunk))
+
+def write_arrow(rows: Iterable[Dict[str, Any]], path: str) -> None:
+    """
+    Write participations as Arrow IPC (Feather v2) file.
+
+    The IPC file format needs one dictionary per column, so batches are
+    unified before writing.
+
+    Raises:
+        ColumnarError: If pyarrow is not installed
+    """
+    pa = import_pyarrow()
+    schema = build_schema(pa)
+    batches = [build_record_batch(pa, schema, chunk) for chunk in chunk_rows(rows)]
+    table = pa.Table.from_batches(batches, schema=schema).unify_dictionaries()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_file(path, schema, options=options) as writer:
+        writer.write_table(table)
@@ -0,0 +1,324 @@
+"""
+Synthetic dataset generator for scale testing of db.py queries.
+
+Fills the database from config.ini with users split across Open/Women,
+weekly training series with materialized past occurrences, tournaments
+and other events, participations and their change history. Run it only
+against a dedicated database, --truncate empties the data tables.
+
+Usage:
+    python dataset.py --users 1500 --weeks 104 --truncate
+    python dataset.py --users 150 --weeks 52 --method executemany
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import tempfile
+import argparse
+import random
+import time
+import os
+from db import connect_to_db, get_training_status, get_other_status
+import config
+
+# Constants
+USER_PREFIX = "USYN"
+DEFAULT_BATCH_SIZE = 5000
+STATUSES = ("Coming", "Late", "Not Coming")
+
+# Status weights and chance of responding at all per event type
+RESPONSE_PROFILES = {
+    "Trénink": {"respond": 0.85, "weights": (0.70, 0.10, 0.20)},
+    "Turnaj": {"respond": 0.95, "weights": (0.55, 0.05, 0.40)},
+    "Ostatní": {"respond": 0.60, "weights": (0.50, 0.05, 0.45)}
+}
+# Mean number of changes after the first answer, most people answer once
+MEAN_CHANGES = 0.4
+NOTE_CHANCE = {"Coming": 0.02, "Late": 0.8, "Not Coming": 0.5}
+NOTES = {
+    "Coming": ["možná dřív odejdu", "vezmu míče"],
+    "Late": ["přijdu o 15 min později", "práce", "doprava", "dorazím na druhou půlku"],
+    "Not Coming": ["nemoc", "práce", "dovolená", "zranění", "rodina"]
+}
+
+FIRST_NAMES_OPEN = ["Jan", "Petr", "Tomáš", "Jiří", "Martin", "Lukáš", "Ondřej", "Jakub", "Vojtěch", "Matěj", "Šimon", "Radek"]
+FIRST_NAMES_WOMEN = ["Tereza", "Anna", "Eliška", "Kateřina", "Lucie", "Barbora", "Veronika", "Klára", "Zuzana", "Markéta"]
+LAST_NAMES_OPEN = ["Novák", "Svoboda", "Dvořák", "Černý", "Procházka", "Kučera", "Veselý", "Horák", "Němec", "Růžička"]
+LAST_NAMES_WOMEN = ["Nováková", "Svobodová", "Dvořáková", "Černá", "Procházková", "Kučerová", "Veselá", "Horáková", "Němcová", "Růžičková"]
+ADDRESSES = ["Sportovní hala Vršovice", "ZŠ Hostivař, tělocvična", "Hala Strahov", None]
+
+# Training slots as (weekday, hour)
+TRAINING_SLOTS = [(0, 19), (2, 19), (4, 18), (1, 20), (3, 20)]
+
+TABLE_COLUMNS = {
+    "users": ("user_id", "name", "category"),
+    "event_series": ("id", "name", "start_time", "end_time", "lock_time", "type", "address", "interval_weeks", "until_date"),
+    "events": ("id", "name", "start_time", "end_time", "lock_time", "type", "address", "series_id", "occurrence_index"),
+    "participants": ("user_id", "event_id", "status", "note"),
+    "history": ("event_id", "user_id", "timestamp", "old_status", "new_status", "old_note", "new_note")
+}
+# Load order respects foreign keys, truncate order is the reverse
+TABLES = ("users", "event_series", "events", "participants", "history")
+
+class DatasetError(Exception):
+    """Base exception for dataset generation errors"""
+    pass
+
+def generate_users(rng: random.Random, count: int, women_share: float) -> List[Tuple]:
+    """Generate users with Czech names, women_share of them in the Women category."""
+    users = []
+    for i in range(count):
+        women = rng.random() < women_share
+        first = rng.choice(FIRST_NAMES_WOMEN if women else FIRST_NAMES_OPEN)
+        last = rng.choice(LAST_NAMES_WOMEN if women else LAST_NAMES_OPEN)
+        users.append((f"{USER_PREFIX}{i:07d}", f"{first} {last} {i}", "Women" if women else "Open"))
+    return users
+
+def generate_events(
+    rng: random.Random,
+    weeks: int,
+    weeks_ahead: int,
+    trainings_per_week: int,
+    tournaments_per_month: int,
+    first_id: int
+) -> Tuple[List[Tuple], List[Tuple]]:
+    """
+    Generate training series and events.
+
+    Past and near future training occurrences are materialized as events of
+    their series, tournaments and other events are standalone.
+
+    Returns:
+        Tuple[List[Tuple], List[Tuple]]: Series rows and event rows
+    """
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    first_monday = today - timedelta(days=today.weekday(), weeks=weeks)
+    series, events = [], []
+    next_id = first_id
+
+    for index, (weekday, hour) in enumerate(TRAINING_SLOTS[:trainings_per_week]):
+        series_id = first_id + index
+        start = first_monday + timedelta(days=weekday, hours=hour)
+        address = ADDRESSES[index % len(ADDRESSES)]
+        series.append((
+            series_id, "Trénink", start, start + timedelta(hours=2), start - timedelta(hours=3),
+            "Trénink", address, 1, None
+        ))
+        for occurrence in range(weeks + weeks_ahead):
+            occurrence_start = start + timedelta(weeks=occurrence)
+            events.append((
+                next_id, "Trénink", occurrence_start, occurrence_start + timedelta(hours=2),
+                occurrence_start - timedelta(hours=3), "Trénink", address, series_id, occurrence
+            ))
+            next_id += 1
+
+    days = (weeks + weeks_ahead) * 7
+    for _ in range(days * tournaments_per_month // 30):
+        start = first_monday + timedelta(days=rng.randrange(days), hours=rng.choice([9, 10]))
+        events.append((
+            next_id, f"Turnaj {rng.choice(['Praha', 'Brno', 'Plzeň', 'Olomouc'])}", start,
+            start + timedelta(hours=8), start - timedelta(days=7), "Turnaj", rng.choice(ADDRESSES), None, None
+        ))
+        next_id += 1
+    for _ in range(days // 30):
+        start = first_monday + timedelta(days=rng.randrange(days), hours=18)
+        events.append((
+            next_id, rng.choice(["Teambuilding", "Schůze", "Grilovačka"]), start,
+            start + timedelta(hours=3), start - timedelta(days=2), "Ostatní", None, None, None
+        ))
+        next_id += 1
+
+    return series, events
+
+def pick_status(rng: random.Random, weights: Sequence[float]) -> str:
+    return rng.choices(STATUSES, weights)[0]
+
+def pick_note(rng: random.Random, status: str) -> Optional[str]:
+    return rng.choice(NOTES[status]) if rng.random() < NOTE_CHANCE[status] else None
+
+def generate_participations(
+    rng: random.Random,
+    users: List[Tuple],
+    events: List[Tuple],
+    now: datetime
+) -> Iterator[Tuple[Tuple, List[Tuple]]]:
+    """
+    Generate participation of every responding user in every event with its history.
+
+    The first history row records the first answer (old status "Nezadáno"),
+    then a geometric number of changes follows, the last one matching the
+    stored participation. Changes happen between announcement and lock time.
+    History statuses are the configured display texts, as written by
+    log_participant_change.
+
+    Yields:
+        Tuple[Tuple, List[Tuple]]: Participant row and its history rows
+    """
+    change_chance = MEAN_CHANGES / (1 + MEAN_CHANGES)
+    for event in events:
+        event_id, start, lock_time, event_type = event[0], event[2], event[4], event[5]
+        profile = RESPONSE_PROFILES[event_type]
+        display = get_training_status if event_type == "Trénink" else get_other_status
+        announced = start - timedelta(days=14)
+        window_end = min(lock_time, now)
+        if window_end <= announced:
+            continue
+        window = (window_end - announced).total_seconds()
+        # Future events got answers only from the early deciders so far
+        respond = profile["respond"] * min(1.0, window / (lock_time - announced).total_seconds())
+
+        for user_id, _, _ in users:
+            if rng.random() >= respond:
+                continue
+            changes = 0
+            while rng.random() < change_chance:
+                changes += 1
+            offsets = sorted(rng.random() * window for _ in range(changes + 1))
+
+            history = []
+            status, note = None, None
+            for offset in offsets:
+                new_status = pick_status(rng, profile["weights"])
+                while new_status == status:
+                    new_status = pick_status(rng, profile["weights"])
+                new_note = pick_note(rng, new_status)
+                history.append((
+                    event_id, user_id, announced + timedelta(seconds=int(offset)),
+                    display(status) if status else "Nezadáno", display(new_status), note, new_note
+                ))
+                status, note = new_status, new_note
+            yield (user_id, event_id, status, note), history
+
+def format_tsv_value(value: Any) -> str:
+    """Format value for LOAD DATA with default escaping, None as \\N."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+class Loader:
+    """Collect rows per table and load them with LOAD DATA or batched executemany."""
+
+    def __init__(self, cursor: Any, method: str, batch_size: int, directory: str):
+        self.cursor = cursor
+        self.method = method
+        self.batch_size = batch_size
+        self.directory = directory
+        self.batches: Dict[str, List[Tuple]] = {table: [] for table in TABLES}
+        self.files: Dict[str, Any] = {}
+        self.counts: Dict[str, int] = {table: 0 for table in TABLES}
+
+    def add(self, table: str, row: Tuple) -> None:
+        self.counts[table] += 1
+        if self.method == "load-data":
+            if table not in self.files:
+                path = os.path.join(self.directory, f"{table}.tsv")
+                self.files[table] = open(path, "w", encoding="utf-8", newline="\n")
+            self.files[table].write("\t".join(format_tsv_value(value) for value in row) + "\n")
+            return
+        batch = self.batches[table]
+        batch.append(row)
+        if len(batch) >= self.batch_size:
+            self.insert(table)
+
+    def insert(self, table: str) -> None:
+        """Insert collected rows, connector rewrites executemany to a multi-row INSERT."""
+        batch = self.batches[table]
+        if not batch:
+            return
+        columns = TABLE_COLUMNS[table]
+        self.cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})",
+            batch
+        )
+        batch.clear()
+
+    def finish(self, table: str) -> None:
+        """Load remaining rows of the table."""
+        if self.method != "load-data":
+            self.insert(table)
+            return
+        if table not in self.files:
+            return
+        self.files.pop(table).close()
+        self.cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({', '.join(TABLE_COLUMNS[table])})",
+            (os.path.join(self.directory, f"{table}.tsv"),)
+        )
+
+def next_id(cursor: Any, table: str) -> int:
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+    return cursor.fetchone()[0]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1500)
+    parser.add_argument("--women-share", type=float, default=0.35)
+    parser.add_argument("--weeks", type=int, default=104, help="Weeks of past events")
+    parser.add_argument("--weeks-ahead", type=int, default=4, help="Weeks of materialized upcoming trainings")
+    parser.add_argument("--trainings-per-week", type=int, default=3, choices=range(1, len(TRAINING_SLOTS) + 1))
+    parser.add_argument("--tournaments-per-month", type=int, default=2)
+    parser.add_argument("--method", choices=["load-data", "executemany"], default="load-data",
+                        help="load-data needs local_infile enabled on the server")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--truncate", action="store_true", help="Empty the data tables first")
+    args = parser.parse_args()
+
+    # History rows carry the status texts configured in config.ini
+    config.load_settings()
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    connection = connect_to_db(allow_local_infile=args.method == "load-data")
+    cursor = connection.cursor()
+    try:
+        # Rows are consistent by construction, checks would only slow the load down
+        cursor.execute("SET foreign_key_checks = 0, unique_checks = 0")
+        if args.truncate:
+            for table in reversed(TABLES):
+                cursor.execute(f"TRUNCATE TABLE {table}")
+            cursor.execute("TRUNCATE TABLE event_series_exceptions")
+            cursor.execute("TRUNCATE TABLE attendance_rollups")
+
+        users = generate_users(rng, args.users, args.women_share)
+        series, events = generate_events(
+            rng, args.weeks, args.weeks_ahead, args.trainings_per_week, args.tournaments_per_month,
+            max(next_id(cursor, "events"), next_id(cursor, "event_series"))
+        )
+
+        with tempfile.TemporaryDirectory(prefix="dataset_") as directory:
+            loader = Loader(cursor, args.method, args.batch_size, directory)
+            for row in users:
+                loader.add("users", row)
+            for row in series:
+                loader.add("event_series", row)
+            for row in events:
+                loader.add("events", row)
+            for participant, history in generate_participations(rng, users, events, datetime.now()):
+                loader.add("participants", participant)
+                for row in history:
+                    loader.add("history", row)
+            generated = time.perf_counter()
+
+            for table in TABLES:
+                loader.finish(table)
+            connection.commit()
+
+        loaded = time.perf_counter()
+        print(", ".join(f"{count} {table}" for table, count in loader.counts.items()))
+        # With executemany, batches are inserted while generating
+        print(f"Generated in {generated - started:.1f} s, final load in {loaded - generated:.1f} s "
+              f"({args.method}, {sum(loader.counts.values()) / max(loaded - started, 1e-9):.0f} rows/s overall)")
+        print("Run python stats.py --backfill to rebuild attendance statistics")
+        return 0
+    except Exception as e:
+        connection.rollback()
+        raise DatasetError(f"Dataset generation failed: {e}")
+    finally:
+        cursor.execute("SET foreign_key_checks = 1, unique_checks = 1")
+        cursor.close()
+        connection.close()
+
+if __name__ == "__main__":
+    raise SystemExit(main())
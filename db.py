@@ -1,25 +1,163 @@
 import mysql.connector
+import mysql.connector.pooling
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from configparser import ConfigParser
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Tuple, Callable
+from contextlib import contextmanager
+import threading
 import logging
+import socket
+import time
+import sys
+import os
 import config
+from metrics import DB_QUERY_SECONDS, DB_ERRORS, register_gauge
+from tracing import start_span, end_span, SPAN_KIND_CLIENT
+from querystats import record_query, set_explainer
+
+# Constants
+# mysql.connector refuses larger pools
+MAX_POOL_SIZE = 32
+POOL_WAIT_TIMEOUT = 5.0
+POOL_WAIT_STEP = 0.005
+# Attendance statistics are kept per season starting in this month
+SEASON_START_MONTH = 9
+# Cancelling this close to the start counts as a late cancellation
+LATE_CANCELLATION_WINDOW = timedelta(hours=24)
+ATTENDED_STATUSES = ("Coming", "Late")
+CREATE_EXPORT_ATTEMPTS = 3
 
 class DatabaseError(Exception):
     """Base exception for database related errors"""
     pass
 
-def connect_to_db() -> mysql.connector.MySQLConnection:
+# Callbacks of caches that follow writes, called as listener(kind, **keys)
+_change_listeners: List[Callable[..., None]] = []
+
+def add_change_listener(listener: Callable[..., None]) -> None:
+    """Register callback notified after events, participations, settings or users change."""
+    _change_listeners.append(listener)
+
+def notify_change(kind: str, **keys: Any) -> None:
+    """
+    Notify registered listeners about a committed write.
+    
+    Args:
+        kind: "event", "series", "participation", "settings" or "user"
+        keys: Identifiers of the changed row, missing ones mean "any"
+    """
+    for listener in _change_listeners:
+        try:
+            listener(kind, **keys)
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Change listener error: {datetime.now()} - {e}")
+
+_origin: Optional[Tuple[int, str]] = None
+
+def process_origin() -> str:
+    """Get ID of this process stored with its outbox messages, new after a fork."""
+    global _origin
+    if _origin is None or _origin[0] != os.getpid():
+        _origin = (os.getpid(), f"{socket.gethostname()}-{os.getpid()}-{os.urandom(4).hex()}")
+    return _origin[1]
+
+# Set by historylog while the write-behind history writer runs
+_history_writer: Optional[Callable[[Dict[str, Any]], None]] = None
+
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+def track_in_flight(delta: int) -> None:
+    """Count connections currently held by queries."""
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += delta
+
+register_gauge("db_connections_in_use", "Database connections currently held by queries", lambda: _in_flight)
+
+def caller_name(depth: int = 2) -> str:
+    """Get name of the db.py function that issued the query, used as metrics label."""
+    return sys._getframe(depth).f_code.co_name
+
+_pool: Optional[mysql.connector.pooling.MySQLConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> Optional[mysql.connector.pooling.MySQLConnectionPool]:
+    """
+    Get connection pool of this process, None unless DB_POOL_SIZE is set.
+    
+    The pool is created per process ID, so forked workers never share
+    sockets of the parent.
+    
+    Raises:
+        DatabaseError: If the pool cannot be created
+    """
+    global _pool, _pool_pid
+    size = int(os.getenv("DB_POOL_SIZE", "0"))
+    if size <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            config = ConfigParser()
+            config.read("config.ini")
+            try:
+                _pool = mysql.connector.pooling.MySQLConnectionPool(
+                    pool_name=f"attendance_{os.getpid()}",
+                    pool_size=min(size, MAX_POOL_SIZE),
+                    host=config.get("database", "host"),
+                    user=config.get("database", "user"),
+                    password=config.get("database", "password"),
+                    database=config.get("database", "database")
+                )
+            except mysql.connector.Error as err:
+                raise DatabaseError(f"Failed to create connection pool: {err}")
+            _pool_pid = os.getpid()
+        return _pool
+
+register_gauge("db_pool_size", "Size of the connection pool of this process, 0 without pool",
+               lambda: _pool.pool_size if _pool and _pool_pid == os.getpid() else 0)
+
+def get_pooled_connection(pool: mysql.connector.pooling.MySQLConnectionPool) -> Any:
+    """
+    Borrow connection from the pool, waiting while all are in use.
+    
+    Closing the connection returns it to the pool.
+    
+    Raises:
+        DatabaseError: If no connection frees up within POOL_WAIT_TIMEOUT
+    """
+    deadline = time.monotonic() + POOL_WAIT_TIMEOUT
+    while True:
+        try:
+            return pool.get_connection()
+        except mysql.connector.errors.PoolError:
+            # Exhausted pool raises instead of blocking
+            if time.monotonic() >= deadline:
+                raise DatabaseError(f"No free connection in the pool within {POOL_WAIT_TIMEOUT} s")
+            time.sleep(POOL_WAIT_STEP)
+
+def connect_to_db(allow_local_infile: bool = False, dedicated: bool = False) -> mysql.connector.MySQLConnection:
     """
     Create database connection with error handling.
     
+    Uses the process's pool when DB_POOL_SIZE is set.
+    
+    Args:
+        allow_local_infile: Allow LOAD DATA LOCAL INFILE, used by dataset.py, never pooled
+        dedicated: Open a connection outside the pool, for connections held for the life of the process
+        
     Returns:
         mysql.connector.MySQLConnection: Database connection
         
     Raises:
         DatabaseError: If connection fails
     """
+    pool = None if allow_local_infile or dedicated else get_pool()
+    if pool:
+        return get_pooled_connection(pool)
+
     config = ConfigParser()
     config.read("config.ini")
 
@@ -28,7 +166,8 @@ def connect_to_db() -> mysql.connector.MySQLConnection:
             host=config.get("database", "host"),
             user=config.get("database", "user"),
             password=config.get("database", "password"),
-            database=config.get("database", "database")
+            database=config.get("database", "database"),
+            allow_local_infile=allow_local_infile
         )
         return connection
     except mysql.connector.Error as err:
@@ -38,7 +177,8 @@ def connect_to_db() -> mysql.connector.MySQLConnection:
 
 def execute_query(query: str, params: Optional[tuple] = None, 
                  fetchone: bool = False, 
-                 logger: Optional[logging.Logger] = None) -> Optional[List[Dict[str, Any]]]:
+                 logger: Optional[logging.Logger] = None,
+                 lastrowid: bool = False) -> Optional[List[Dict[str, Any]]]:
     """
     Execute SQL query with error handling and resource management.
     
@@ -47,15 +187,22 @@ def execute_query(query: str, params: Optional[tuple] = None,
         params: Query parameters
         fetchone: Whether to fetch one result or all results
         logger: Optional logger instance
+        lastrowid: Whether to return ID of the inserted row
         
     Returns:
-        Optional[List[Dict[str, Any]]]: Query results
+        Optional[List[Dict[str, Any]]]: Query results, or inserted row ID if lastrowid is set
         
     Raises:
         DatabaseError: If query execution fails
     """
     connection = None
     cursor = None
+    function = caller_name()
+    start = time.perf_counter()
+    span, token = start_span(f"db {function}", SPAN_KIND_CLIENT, **{"db.system": "mysql", "db.function": function})
+    error = None
+    rows = 0
+    track_in_flight(1)
     try:
         connection = connect_to_db()
         cursor = connection.cursor(dictionary=True)
@@ -67,19 +214,28 @@ def execute_query(query: str, params: Optional[tuple] = None,
         
         if query.strip().lower().startswith("select"):
             if fetchone:
-                return cursor.fetchone()
-            return cursor.fetchall()
+                result = cursor.fetchone()
+                rows = int(result is not None)
+                return result
+            result = cursor.fetchall()
+            rows = len(result)
+            return result
         else:
             connection.commit()
-            return None
+            rows = max(cursor.rowcount, 0)
+            return cursor.lastrowid if lastrowid else None
             
     except mysql.connector.Error as err:
+        error = err
+        DB_ERRORS.inc(function=function)
         if connection:
             connection.rollback()
         if logger:
             logger.error(f"Database query error: {err}")
         raise DatabaseError(f"Query execution failed: {err}")
     except Exception as e:
+        error = e
+        DB_ERRORS.inc(function=function)
         if connection:
             connection.rollback()
         if logger:
@@ -90,6 +246,144 @@ def execute_query(query: str, params: Optional[tuple] = None,
             cursor.close()
         if connection:
             connection.close()
+        track_in_flight(-1)
+        end_span(span, token, error)
+        elapsed = time.perf_counter() - start
+        DB_QUERY_SECONDS.observe(elapsed, function=function)
+        record_query(query, params, elapsed, rows, error is not None, logger)
+
+def explain_query(query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
+    """
+    Get EXPLAIN plan of SELECT query, used by the slow query log.
+    
+    Args:
+        query: SELECT query
+        params: Query parameters
+        
+    Returns:
+        List[Dict[str, Any]]: Rows of the plan
+    """
+    connection = connect_to_db()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(f"EXPLAIN {query}", params or ())
+        plan = cursor.fetchall()
+        cursor.close()
+        return plan
+    finally:
+        connection.close()
+
+set_explainer(explain_query)
+
+@contextmanager
+def transaction(logger: Optional[logging.Logger] = None) -> Iterator[Any]:
+    """
+    Run several statements on one connection in a single transaction.
+    
+    Args:
+        logger: Optional logger instance
+        
+    Yields:
+        Cursor returning rows as dictionaries
+        
+    Raises:
+        DatabaseError: If any statement fails, the transaction is rolled back
+    """
+    connection = None
+    cursor = None
+    # Frames: generator <- contextlib __enter__ <- db.py function
+    function = caller_name(3)
+    start = time.perf_counter()
+    span, token = start_span(f"db {function}", SPAN_KIND_CLIENT, **{"db.system": "mysql", "db.function": function})
+    error = None
+    track_in_flight(1)
+    try:
+        connection = connect_to_db()
+        connection.start_transaction()
+        cursor = connection.cursor(dictionary=True)
+        yield cursor
+        connection.commit()
+    except Exception as e:
+        error = e
+        DB_ERRORS.inc(function=function)
+        if connection:
+            connection.rollback()
+        if logger:
+            logger.error(f"Database transaction error: {e}")
+        if isinstance(e, DatabaseError):
+            raise
+        raise DatabaseError(f"Transaction failed: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            connection.close()
+        track_in_flight(-1)
+        end_span(span, token, error)
+        DB_QUERY_SECONDS.observe(time.perf_counter() - start, function=function)
+
+def stream_query(query: str, params: Optional[tuple] = None,
+                 batch_size: int = 500,
+                 logger: Optional[logging.Logger] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Execute SELECT query on an unbuffered cursor and yield rows in batches.
+    
+    Args:
+        query: SQL query to execute
+        params: Query parameters
+        batch_size: Number of rows fetched from the server at once
+        logger: Optional logger instance
+        
+    Yields:
+        Dict[str, Any]: Result rows
+        
+    Raises:
+        DatabaseError: If query execution fails
+    """
+    connection = None
+    cursor = None
+    # Time spent in execute and fetches only, the consumer runs between batches
+    elapsed = 0.0
+    streamed = 0
+    failed = False
+    try:
+        connection = connect_to_db()
+        cursor = connection.cursor(dictionary=True, buffered=False)
+        
+        if logger:
+            logger.debug(f"Streaming query: {query} with params: {params}")
+            
+        start = time.perf_counter()
+        try:
+            cursor.execute(query, params or ())
+        finally:
+            elapsed += time.perf_counter() - start
+        while True:
+            start = time.perf_counter()
+            try:
+                rows = cursor.fetchmany(batch_size)
+            finally:
+                elapsed += time.perf_counter() - start
+            if not rows:
+                break
+            streamed += len(rows)
+            yield from rows
+            
+    except mysql.connector.Error as err:
+        failed = True
+        if logger:
+            logger.error(f"Database stream error: {err}")
+        raise DatabaseError(f"Query streaming failed: {err}")
+    finally:
+        record_query(query, params, elapsed, streamed, failed, logger)
+        if cursor:
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                # Unread rows left behind by an abandoned generator
+                pass
+        if connection:
+            connection.close()
 
 def get_training_status(status: str) -> str:
     """Map standard status to training status."""
@@ -119,6 +413,23 @@ def load_events_from_db(logger: Optional[logging.Logger] = None) -> List[Dict[st
     now = datetime.now()
     return execute_query(query, (now,), logger=logger)
 
+def load_events_ending_after(since, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    query = """
+        SELECT * FROM events 
+        WHERE end_time > %s
+        ORDER BY start_time ASC
+    """ 
+    return execute_query(query, (since,), logger=logger)
+
+def load_events_locking_between(start, end, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    query = """
+        SELECT * FROM events 
+        WHERE lock_time > %s
+        AND lock_time <= %s
+        ORDER BY lock_time ASC
+    """ 
+    return execute_query(query, (start, end,), logger=logger)
+
 def load_events_by_type_from_db(type, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
     query = """
         SELECT * FROM events 
@@ -155,17 +466,422 @@ def load_users_not_in_event(event_id, logger: Optional[logging.Logger] = None) -
     """
     return execute_query(query, (event_id,), logger=logger)
 
+PARTICIPANTS_IN_RANGE_QUERY = """
+    SELECT u.user_id, u.name, p.event_id, e.name AS event_name, e.type, u.category, p.status, p.note, e.start_time, e.end_time
+    FROM users u
+    JOIN participants p ON u.user_id = p.user_id
+    JOIN events e ON p.event_id = e.id
+    WHERE DATE(e.start_time) >= %s
+    AND DATE(e.end_time) <= %s
+    ORDER BY e.start_time ASC, u.name ASC
+"""
+
 def load_participants_in_range(start_date, end_date, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    return execute_query(PARTICIPANTS_IN_RANGE_QUERY, (start_date, end_date,), logger=logger)
+
+def iter_participants_in_range(start_date, end_date, batch_size: int = 500, logger: Optional[logging.Logger] = None) -> Iterator[Dict[str, Any]]:
+    return stream_query(PARTICIPANTS_IN_RANGE_QUERY, (start_date, end_date,), batch_size=batch_size, logger=logger)
+
+def iter_changed_participants_in_range(start_date, end_date, watermark, batch_size: int = 500, logger: Optional[logging.Logger] = None) -> Iterator[Dict[str, Any]]:
+    # Filtered by insert time, history rows written behind land with an older timestamp
     query = """
-        SELECT u.name, e.name AS event_name, u.category, p.status, p.note, e.start_time, e.end_time
-        FROM users u
-        JOIN participants p ON u.user_id = p.user_id
-        JOIN events e ON p.event_id = e.id
+        SELECT u.user_id, u.name, p.event_id, e.name AS event_name, e.type, u.category, p.status, p.note,
+               e.start_time, e.end_time, c.changed_at
+        FROM (
+            SELECT event_id, user_id, MAX(timestamp) AS changed_at
+            FROM history
+            WHERE inserted_at >= %s
+            GROUP BY event_id, user_id
+        ) c
+        JOIN participants p ON p.event_id = c.event_id AND p.user_id = c.user_id
+        JOIN users u ON u.user_id = p.user_id
+        JOIN events e ON e.id = p.event_id
         WHERE DATE(e.start_time) >= %s
         AND DATE(e.end_time) <= %s
-        ORDER BY e.start_time ASC, u.name ASC
+        ORDER BY c.changed_at ASC, e.start_time ASC, u.name ASC
     """
-    return execute_query(query, (start_date, end_date,), logger=logger)
+    return stream_query(query, (watermark, start_date, end_date,), batch_size=batch_size, logger=logger)
+
+def load_last_change_in_range(start_date, end_date, logger: Optional[logging.Logger] = None) -> Optional[datetime]:
+    query = """
+        SELECT MAX(h.inserted_at) AS last_change
+        FROM history h
+        JOIN events e ON h.event_id = e.id
+        WHERE DATE(e.start_time) >= %s
+        AND DATE(e.end_time) <= %s
+    """
+    result = execute_query(query, (start_date, end_date,), fetchone=True, logger=logger)
+    return result['last_change'] if result else None
+
+def load_export_watermark(start_date, end_date, logger: Optional[logging.Logger] = None) -> Optional[datetime]:
+    query = """
+        SELECT watermark FROM export_watermarks
+        WHERE start_date = %s AND end_date = %s
+    """
+    result = execute_query(query, (start_date, end_date,), fetchone=True, logger=logger)
+    return result['watermark'] if result else None
+
+def save_export_watermark(start_date, end_date, watermark, logger: Optional[logging.Logger] = None) -> None:
+    query = """
+        INSERT INTO export_watermarks (start_date, end_date, watermark)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE watermark = VALUES(watermark)
+    """
+    execute_query(query, (start_date, end_date, watermark), logger=logger)
+
+def load_sent_reminders(since, logger: Optional[logging.Logger] = None) -> List[str]:
+    query = """
+        SELECT reminder_key FROM sent_reminders
+        WHERE lock_time > %s
+    """
+    return [row['reminder_key'] for row in execute_query(query, (since,), logger=logger)]
+
+def save_sent_reminder(reminder_key, lock_time, logger: Optional[logging.Logger] = None) -> None:
+    query = """
+        INSERT IGNORE INTO sent_reminders (reminder_key, lock_time)
+        VALUES (%s, %s)
+    """
+    execute_query(query, (reminder_key, lock_time), logger=logger)
+
+def delete_sent_reminders_before(before, logger: Optional[logging.Logger] = None) -> None:
+    query = """
+        DELETE FROM sent_reminders
+        WHERE lock_time <= %s
+    """
+    execute_query(query, (before,), logger=logger)
+
+def try_named_lock(connection: Any, name: str) -> bool:
+    """
+    Take server-wide named lock on the connection without waiting.
+    
+    The lock is held until the connection closes, so the connection has to
+    stay open, see connect_to_db(dedicated=True).
+    
+    Raises:
+        DatabaseError: If the query fails
+    """
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (name,))
+        acquired = cursor.fetchone()[0]
+        cursor.close()
+        return acquired == 1
+    except mysql.connector.Error as err:
+        raise DatabaseError(f"Failed to take lock {name}: {err}")
+
+def holds_named_lock(connection: Any, name: str) -> bool:
+    """
+    Check that the connection still holds the named lock, also keeps the connection alive.
+    
+    Raises:
+        DatabaseError: If the query fails, e.g. the connection was lost with the lock
+    """
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT IS_USED_LOCK(%s) = CONNECTION_ID()", (name,))
+        held = cursor.fetchone()[0]
+        cursor.close()
+        return held == 1
+    except mysql.connector.Error as err:
+        raise DatabaseError(f"Failed to check lock {name}: {err}")
+
+def season_of(start_time: datetime) -> str:
+    """Get label of the season the event belongs to, e.g. "2024/25"."""
+    year = start_time.year if start_time.month >= SEASON_START_MONTH else start_time.year - 1
+    return f"{year}/{(year + 1) % 100:02d}"
+
+def season_bounds(season: str) -> Tuple[datetime, datetime]:
+    """Get start (inclusive) and end (exclusive) of the season."""
+    year = int(season.split("/")[0])
+    return datetime(year, SEASON_START_MONTH, 1), datetime(year + 1, SEASON_START_MONTH, 1)
+
+def count_streaks(statuses: List[str]) -> Tuple[int, int]:
+    """
+    Count attendance streaks in answers ordered by event start.
+
+    Coming and Late extend the streak, Not Coming breaks it, events without
+    an answer are skipped.
+
+    Returns:
+        Tuple[int, int]: Current streak (ending with the last answer) and the longest one
+    """
+    current = best = 0
+    for status in statuses:
+        current = current + 1 if status in ATTENDED_STATUSES else 0
+        best = max(best, current)
+    return current, best
+
+def is_late_cancellation(old_status: Optional[str], new_status: str, start_time: datetime, changed_at: datetime) -> bool:
+    """Check whether the change cancels attendance less than LATE_CANCELLATION_WINDOW before the start."""
+    return (
+        old_status in ATTENDED_STATUSES
+        and new_status not in ATTENDED_STATUSES
+        and changed_at >= start_time - LATE_CANCELLATION_WINDOW
+    )
+
+def load_event_participant_ids(cursor: Any, event_id: int) -> List[str]:
+    cursor.execute("SELECT user_id FROM participants WHERE event_id = %s", (event_id,))
+    return [row['user_id'] for row in cursor.fetchall()]
+
+def lock_attendance_rollup(cursor: Any, user_id: str, event_type: str, start_time: datetime) -> None:
+    """
+    Lock rollup row of the member, season and event type until the caller's transaction ends.
+
+    The row is created empty if missing, so there is always a row to lock.
+    Participation writes lock it before touching participants, so concurrent
+    writes of one member are serialized instead of deadlocking in the
+    refresh.
+    """
+    cursor.execute(
+        """INSERT INTO attendance_rollups (season, event_type, user_id)
+           VALUES (%s, %s, %s)
+           ON DUPLICATE KEY UPDATE user_id = user_id""",
+        (season_of(start_time), event_type, user_id)
+    )
+
+def refresh_attendance_rollup(cursor: Any, user_id: str, event_type: str, start_time: datetime,
+                              late_cancellations: int = 0) -> None:
+    """
+    Recompute rollup of the member, season and event type within the caller's transaction.
+
+    Status counts and streaks are recounted from the member's answers to the
+    events of the season that already started (an indexed read of one member),
+    late cancellations cannot be
+    recounted from participants and are incremented by the write path. The
+    rollup row is locked first and the answers are read with a locking read,
+    so a concurrent write committed after the transaction's snapshot is
+    counted and the two refreshes cannot overwrite each other.
+    
+    Args:
+        cursor: Cursor of the transaction writing the participation
+        user_id: User ID
+        event_type: Type of the changed event
+        start_time: Start of the changed event, selects the season
+        late_cancellations: Late cancellations to add
+    """
+    season = season_of(start_time)
+    season_start, season_end = season_bounds(season)
+    lock_attendance_rollup(cursor, user_id, event_type, start_time)
+    cursor.execute(
+        """SELECT p.status
+           FROM participants p
+           JOIN events e ON e.id = p.event_id
+           WHERE p.user_id = %s AND e.type = %s AND e.start_time >= %s AND e.start_time < %s
+           AND e.start_time < NOW()
+           ORDER BY e.start_time ASC
+           LOCK IN SHARE MODE""",
+        (user_id, event_type, season_start, season_end)
+    )
+    statuses = [row['status'] for row in cursor.fetchall()]
+    current_streak, best_streak = count_streaks(statuses)
+    cursor.execute(
+        """UPDATE attendance_rollups
+           SET coming = %s, late = %s, not_coming = %s,
+               late_cancellations = late_cancellations + %s,
+               current_streak = %s, best_streak = %s
+           WHERE season = %s AND event_type = %s AND user_id = %s""",
+        (statuses.count("Coming"), statuses.count("Late"), statuses.count("Not Coming"),
+         late_cancellations, current_streak, best_streak, season, event_type, user_id)
+    )
+
+def load_attendance_rollups(season: str, event_type: str, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    query = """
+        SELECT u.user_id, u.name, u.category, r.coming, r.late, r.not_coming,
+               r.late_cancellations, r.current_streak, r.best_streak
+        FROM attendance_rollups r
+        JOIN users u ON u.user_id = r.user_id
+        WHERE r.season = %s AND r.event_type = %s
+    """
+    return execute_query(query, (season, event_type,), logger=logger)
+
+def refresh_started_event_rollups(logger: Optional[logging.Logger] = None) -> int:
+    """
+    Count answers to events that started since the last call into the rollups.
+
+    Rollups count only started events, so the answers of an event are added
+    once it starts. The time up to which events are counted is kept in the
+    rollup_watermark table, events started while no process called this are
+    counted by the next call.
+
+    Args:
+        logger: Optional logger instance
+
+    Returns:
+        int: Number of refreshed rollup rows
+    """
+    with transaction(logger) as cursor:
+        cursor.execute("SELECT NOW() AS now")
+        now = cursor.fetchone()['now']
+        cursor.execute("SELECT counted_until FROM rollup_watermark WHERE id = 1 FOR UPDATE")
+        row = cursor.fetchone()
+        if not row:
+            # Rollups were never rebuilt with the watermark, see stats.py --backfill
+            cursor.execute("INSERT INTO rollup_watermark (id, counted_until) VALUES (1, %s)", (now,))
+            return 0
+        cursor.execute(
+            """SELECT DISTINCT p.user_id, e.type, e.start_time
+               FROM participants p
+               JOIN events e ON e.id = p.event_id
+               WHERE e.start_time >= %s AND e.start_time < %s
+               ORDER BY p.user_id, e.type, e.start_time""",
+            (row['counted_until'], now)
+        )
+        refreshed = set()
+        for answer in cursor.fetchall():
+            key = (answer['user_id'], answer['type'], season_of(answer['start_time']))
+            if key not in refreshed:
+                refreshed.add(key)
+                refresh_attendance_rollup(cursor, answer['user_id'], answer['type'], answer['start_time'])
+        cursor.execute("UPDATE rollup_watermark SET counted_until = %s WHERE id = 1", (now,))
+    return len(refreshed)
+
+def rebuild_attendance_rollups(logger: Optional[logging.Logger] = None) -> int:
+    """
+    Recompute all rollups from participants and history in one transaction.
+
+    Late cancellations are recounted from history, whose statuses are stored
+    as the texts configured at the time of the change, so texts changed since
+    then are not recognized.
+    
+    Returns:
+        int: Number of rollup rows
+        
+    Raises:
+        DatabaseError: If the rebuild fails, the old rollups are kept
+    """
+    attended_texts = {config.coming_training, config.late_training, config.coming_text, config.late_text}
+    cancelled_texts = {config.notcoming_training, config.notcoming_text}
+    rollups: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+
+    def rollup(season: str, event_type: str, user_id: str) -> Dict[str, Any]:
+        return rollups.setdefault((season, event_type, user_id), {"statuses": [], "late_cancellations": 0})
+
+    with transaction(logger) as cursor:
+        cursor.execute("SELECT NOW() AS now")
+        now = cursor.fetchone()['now']
+        cursor.execute(
+            """SELECT p.user_id, p.status, e.type, e.start_time
+               FROM participants p
+               JOIN events e ON e.id = p.event_id
+               WHERE e.start_time < %s
+               ORDER BY e.start_time ASC""",
+            (now,)
+        )
+        for row in cursor.fetchall():
+            rollup(season_of(row['start_time']), row['type'], row['user_id'])["statuses"].append(row['status'])
+
+        cursor.execute(
+            """SELECT h.user_id, h.old_status, h.new_status, h.timestamp, e.type, e.start_time
+               FROM history h
+               JOIN events e ON e.id = h.event_id
+               WHERE h.timestamp >= e.start_time - INTERVAL %s SECOND""",
+            (int(LATE_CANCELLATION_WINDOW.total_seconds()),)
+        )
+        for row in cursor.fetchall():
+            if row['old_status'] in attended_texts and row['new_status'] in cancelled_texts:
+                rollup(season_of(row['start_time']), row['type'], row['user_id'])["late_cancellations"] += 1
+
+        cursor.execute("DELETE FROM attendance_rollups")
+        rows = [
+            (season, event_type, user_id, values["statuses"].count("Coming"), values["statuses"].count("Late"),
+             values["statuses"].count("Not Coming"), values["late_cancellations"], *count_streaks(values["statuses"]))
+            for (season, event_type, user_id), values in rollups.items()
+        ]
+        if rows:
+            cursor.executemany(
+                """INSERT INTO attendance_rollups
+                       (season, event_type, user_id, coming, late, not_coming, late_cancellations, current_streak, best_streak)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                rows
+            )
+        cursor.execute(
+            """INSERT INTO rollup_watermark (id, counted_until) VALUES (1, %s)
+               ON DUPLICATE KEY UPDATE counted_until = VALUES(counted_until)""",
+            (now,)
+        )
+    return len(rows)
+
+def write_outbox(cursor: Any, kind: str, event_id: Optional[int], payload: Dict[str, Any]) -> None:
+    """
+    Add message to the outbox within the caller's transaction.
+    
+    Args:
+        cursor: Cursor of the transaction writing the change
+        kind: "participation", "event_created", "event_updated", "event_deleted",
+            or "change" for cache notifications of other kinds
+        event_id: ID of the changed event, None if the change is not about one
+        payload: JSON serializable details of the change
+    """
+    query = """
+        INSERT INTO outbox (kind, event_id, origin, payload)
+        VALUES (%s, %s, %s, %s)
+    """
+    cursor.execute(query, (kind, event_id, process_origin(), json.dumps(payload, default=str, ensure_ascii=False)))
+
+def save_change_message(kind: str, keys: Dict[str, Any], logger: Optional[logging.Logger] = None) -> None:
+    """Add cache notification of a change not written through the outbox to it."""
+    with transaction(logger) as cursor:
+        write_outbox(cursor, "change", keys.get("event_id"), {"kind": kind, "keys": keys})
+
+def load_outbox_after(last_id: int, limit: int, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    query = """
+        SELECT id, kind, event_id, origin, payload, created_at FROM outbox
+        WHERE id > %s
+        ORDER BY id ASC
+        LIMIT %s
+    """
+    return execute_query(query, (last_id, limit,), logger=logger)
+
+def load_last_outbox_id(logger: Optional[logging.Logger] = None) -> int:
+    query = """
+        SELECT COALESCE(MAX(id), 0) AS last_id FROM outbox
+    """
+    return execute_query(query, fetchone=True, logger=logger)['last_id']
+
+def delete_outbox_before(before, logger: Optional[logging.Logger] = None) -> None:
+    query = """
+        DELETE FROM outbox
+        WHERE created_at < %s
+    """
+    execute_query(query, (before,), logger=logger)
+
+def load_outbox_checkpoint(subscriber: str, logger: Optional[logging.Logger] = None) -> Optional[int]:
+    query = """
+        SELECT last_id FROM outbox_checkpoints
+        WHERE subscriber = %s
+    """
+    result = execute_query(query, (subscriber,), fetchone=True, logger=logger)
+    return result['last_id'] if result else None
+
+def save_outbox_checkpoint(subscriber: str, last_id: int, logger: Optional[logging.Logger] = None) -> None:
+    query = """
+        INSERT INTO outbox_checkpoints (subscriber, last_id)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE last_id = VALUES(last_id)
+    """
+    execute_query(query, (subscriber, last_id,), logger=logger)
+
+def save_reminder_deliveries(deliveries: List[Tuple[Any, ...]], logger: Optional[logging.Logger] = None) -> None:
+    """
+    Record results of reminder digests with one multi-row INSERT.
+    
+    Args:
+        deliveries: Tuples of (user_id, event_ids, status, attempts, error)
+        logger: Optional logger instance
+        
+    Raises:
+        DatabaseError: If the insert fails
+    """
+    if not deliveries:
+        return
+
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(deliveries))
+    query = f"""
+    INSERT INTO reminder_deliveries (user_id, event_ids, status, attempts, error)
+    VALUES {placeholders}
+    """
+    params = tuple(value for delivery in deliveries for value in delivery)
+    execute_query(query, params, logger=logger)
 
 def load_event_from_db(event_id, logger: Optional[logging.Logger] = None) -> Optional[Dict[str, Any]]:
     query = """
@@ -210,6 +926,15 @@ def load_history_from_event(event_id, logger: Optional[logging.Logger] = None) -
     """
     return execute_query(query, (event_id,), logger=logger)
 
+def load_user_feed_participations(user_id, since, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    query = """
+        SELECT p.event_id, p.status, p.note
+        FROM participants p
+        JOIN events e ON p.event_id = e.id
+        WHERE p.user_id = %s AND e.end_time > %s
+    """
+    return execute_query(query, (user_id, since,), logger=logger)
+
 def load_participants_for_user(user_id, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
     query = """
         SELECT event_id, status, note, user_id
@@ -278,15 +1003,11 @@ def add_event_to_db(name, start_time, end_time, lock_time, event_type, address,
     INSERT INTO events (name, start_time, end_time, lock_time, type, address)
     VALUES (%s, %s, %s, %s, %s, %s)
     """
-    execute_query(query, (name, start_time, end_time, lock_time, event_type, address), logger=logger)
-
-def update_participation(event_id, user_id, status, logger: Optional[logging.Logger] = None) -> None:
-    query = """
-            UPDATE participants 
-            SET status = %s 
-            WHERE user_id = %s AND event_id = %s
-        """
-    execute_query(query, (status, user_id, event_id), logger=logger)
+    with transaction(logger) as cursor:
+        cursor.execute(query, (name, start_time, end_time, lock_time, event_type, address))
+        event_id = cursor.lastrowid
+        write_outbox(cursor, "event_created", event_id, {"name": name, "type": event_type, "start_time": start_time})
+    notify_change("event", event_id=event_id)
 
 def insert_participation(event_id: int, user_id: str, status: str, 
                         note: Optional[str] = None,
@@ -308,72 +1029,216 @@ def insert_participation(event_id: int, user_id: str, status: str,
         if note is not None:
             note = note.strip()
 
-        event = execute_query(
-            "SELECT type FROM events WHERE id = %s",
-            (event_id,),
-            fetchone=True,
-            logger=logger
-        )
-        if not event:
-            raise DatabaseError(f"Event {event_id} not found")
-
-         # Map status if event is training
-        if event['type'] == 'Trénink':
-            new_status = get_training_status(status)
-        else:
-            new_status = get_other_status(status)
+        # Participation and its outbox message are committed together
+        with transaction(logger) as cursor:
+            # Shared lock keeps the event from changing type or being deleted meanwhile
+            cursor.execute("SELECT type, start_time FROM events WHERE id = %s LOCK IN SHARE MODE", (event_id,))
+            event = cursor.fetchone()
+            if not event:
+                raise DatabaseError(f"Event {event_id} not found")
+            lock_attendance_rollup(cursor, user_id, event['type'], event['start_time'])
 
-        participant = execute_query(
-            "SELECT * FROM participants WHERE user_id = %s AND event_id = %s",
-            (user_id, event_id),
-            fetchone=True,
-            logger=logger
-        )
+             # Map status if event is training
+            if event['type'] == 'Trénink':
+                new_status = get_training_status(status)
+            else:
+                new_status = get_other_status(status)
 
-        if participant:
-            execute_query(
-                """UPDATE participants 
-                   SET status = %s, note = %s 
-                   WHERE user_id = %s AND event_id = %s""",
-                (status, note, user_id, event_id),
-                logger=logger
+            cursor.execute(
+                "SELECT * FROM participants WHERE user_id = %s AND event_id = %s FOR UPDATE",
+                (user_id, event_id)
             )
+            rows = cursor.fetchall()
+            participant = rows[0] if rows else None
 
-            if event['type'] == 'Trénink':
-                old_status = get_training_status(participant['status'])
+            if participant:
+                cursor.execute(
+                    """UPDATE participants 
+                       SET status = %s, note = %s 
+                       WHERE user_id = %s AND event_id = %s""",
+                    (status, note, user_id, event_id)
+                )
+
+                if event['type'] == 'Trénink':
+                    old_status = get_training_status(participant['status'])
+                else:
+                    old_status = get_other_status(participant['status'])
+                old_note = participant['note']
             else:
-                old_status = get_other_status(participant['status'])
+                cursor.execute(
+                    """INSERT INTO participants (user_id, event_id, status, note) 
+                       VALUES (%s, %s, %s, %s)""",
+                    (user_id, event_id, status, note)
+                )
+                old_status = "Nezadáno"
+                old_note = None
 
-            log_participant_change(event_id, user_id, old_status, 
-                                 new_status, participant['note'], note, logger)
-        else:
-            execute_query(
-                """INSERT INTO participants (user_id, event_id, status, note) 
-                   VALUES (%s, %s, %s, %s)""",
-                (user_id, event_id, status, note),
-                logger=logger
+            late_cancellation = is_late_cancellation(
+                participant['status'] if participant else None, status, event['start_time'], datetime.now()
             )
-            log_participant_change(event_id, user_id, "Nezadáno", 
-                                 new_status, None, note, logger)
+            refresh_attendance_rollup(cursor, user_id, event['type'], event['start_time'], int(late_cancellation))
+            write_outbox(cursor, "participation", event_id, {
+                "user_id": user_id,
+                "status": status,
+                "note": note,
+                "old_status": participant['status'] if participant else None,
+                "old_note": old_note
+            })
+
+        log_participant_change(event_id, user_id, old_status, 
+                             new_status, old_note, note, logger)
+        notify_change("participation", event_id=event_id, user_id=user_id)
 
     except DatabaseError:
         if logger:
             logger.error(f"Failed to update participation for user {user_id} in event {event_id}")
         raise
 
+def set_history_writer(writer: Optional[Callable[[Dict[str, Any]], None]]) -> None:
+    """Route history rows to writer instead of inserting them one by one, None restores direct inserts."""
+    global _history_writer
+    _history_writer = writer
+
 def log_participant_change(event_id, user_id, old_status, new_status, old_note, new_note, logger: Optional[logging.Logger] = None) -> None:
+    if _history_writer:
+        _history_writer({
+            "event_id": event_id,
+            "user_id": user_id,
+            "timestamp": datetime.now(),
+            "old_status": old_status,
+            "new_status": new_status,
+            "old_note": old_note,
+            "new_note": new_note
+        })
+        return
+
     query = """
         INSERT INTO history (event_id, user_id, old_status, new_status, old_note, new_note) 
         VALUES (%s, %s, %s, %s, %s, %s)
     """
     execute_query(query, (event_id, user_id, old_status, new_status, old_note, new_note), logger=logger)
 
-def duplicate_event_to_db(name, start_time, end_time, lock_time, event_type, address, logger: Optional[logging.Logger] = None) -> None:
-    query = """
+HISTORY_INSERT_COLUMNS = "event_id, user_id, timestamp, old_status, new_status, old_note, new_note"
+
+def history_row_values(row: Dict[str, Any]) -> tuple:
+    return (row['event_id'], row['user_id'], row['timestamp'], row['old_status'],
+            row['new_status'], row['old_note'], row['new_note'])
+
+def insert_history_rows(rows: List[Dict[str, Any]], logger: Optional[logging.Logger] = None) -> None:
+    """
+    Insert history rows with one multi-row INSERT in a transaction.
+    
+    Args:
+        rows: Rows with event_id, user_id, timestamp, old_status, new_status, old_note and new_note
+        logger: Optional logger instance
+        
+    Raises:
+        DatabaseError: If the insert fails, no row is inserted
+    """
+    if not rows:
+        return
+
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(rows))
+    query = f"""
+    INSERT INTO history ({HISTORY_INSERT_COLUMNS})
+    VALUES {placeholders}
+    """
+    params = tuple(value for row in rows for value in history_row_values(row))
+
+    with transaction(logger) as cursor:
+        if logger:
+            logger.debug(f"Inserting {len(rows)} history rows")
+        cursor.execute(query, params)
+
+def insert_history_rows_skipping_orphans(rows: List[Dict[str, Any]], logger: Optional[logging.Logger] = None) -> int:
+    """
+    Insert history rows one by one in a transaction, skipping rows whose event or user no longer exists.
+    
+    Rows are written behind, so their event or user may be deleted before they
+    are inserted and fail the foreign keys of the whole multi-row INSERT.
+    
+    Args:
+        rows: Rows with event_id, user_id, timestamp, old_status, new_status, old_note and new_note
+        logger: Optional logger instance
+        
+    Returns:
+        int: Number of skipped rows
+        
+    Raises:
+        DatabaseError: If an insert fails for another reason, no row is inserted
+    """
+    query = f"""
+    INSERT INTO history ({HISTORY_INSERT_COLUMNS})
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """
+    skipped = 0
+    with transaction(logger) as cursor:
+        for row in rows:
+            try:
+                cursor.execute(query, history_row_values(row))
+            except mysql.connector.IntegrityError as e:
+                # A failed statement does not abort the MySQL transaction, the other rows stay
+                skipped += 1
+                if logger:
+                    logger.warning(f"Skipping history row of event {row['event_id']} and user {row['user_id']}: {e}")
+    return skipped
+
+def bulk_insert_events(events: List[Dict[str, Any]], logger: Optional[logging.Logger] = None) -> List[int]:
+    """
+    Insert several events with one multi-row INSERT in a transaction.
+    
+    Args:
+        events: Events with name, start_time, end_time, lock_time, type and address
+        logger: Optional logger instance
+        
+    Returns:
+        List[int]: IDs of the inserted events in input order
+        
+    Raises:
+        DatabaseError: If the insert fails, no event is inserted
+    """
+    if not events:
+        return []
+
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(events))
+    query = f"""
     INSERT INTO events (name, start_time, end_time, lock_time, type, address)
-    VALUES (%s, %s, %s, %s, %s, %s)
+    VALUES {placeholders}
     """
-    execute_query(query, (name, start_time, end_time, lock_time, event_type, address), logger=logger)
+    params = tuple(
+        value
+        for event in events
+        for value in (event['name'], event['start_time'], event['end_time'],
+                      event['lock_time'], event['type'], event['address'])
+    )
+
+    ids_query = """
+    SELECT id FROM events
+    WHERE id >= %s
+    ORDER BY id ASC
+    LIMIT %s
+    """
+
+    with transaction(logger) as cursor:
+        if logger:
+            logger.debug(f"Bulk inserting {len(events)} events")
+        # Takes the REPEATABLE READ snapshot before the insert, so rows other
+        # transactions insert meanwhile stay invisible to the read below
+        cursor.execute("SELECT MAX(id) AS last_id FROM events")
+        cursor.fetchone()
+        cursor.execute(query, params)
+        # lastrowid is the first ID of the insert, the others need not be evenly
+        # spaced, e.g. with interleaved auto-increment locking
+        cursor.execute(ids_query, (cursor.lastrowid, len(events)))
+        event_ids = [row['id'] for row in cursor.fetchall()]
+        if len(event_ids) != len(events):
+            raise DatabaseError(f"Inserted {len(events)} events, read back {len(event_ids)}")
+        for event_id, event in zip(event_ids, events):
+            write_outbox(cursor, "event_created", event_id,
+                         {"name": event['name'], "type": event['type'], "start_time": event['start_time']})
+    for event_id in event_ids:
+        notify_change("event", event_id=event_id)
+    return event_ids
 
 def update_event(name, event_type, address, lock_timestamp, event_id, logger: Optional[logging.Logger] = None) -> None:
     lock_time = datetime.fromtimestamp(lock_timestamp)
@@ -383,19 +1248,50 @@ def update_event(name, event_type, address, lock_timestamp, event_id, logger: Op
     SET name = %s, type = %s, address = %s, lock_time = %s
     WHERE id = %s
     """
-    execute_query(query, (name, event_type, address, lock_time, event_id), logger=logger)
-
-def update_participant(participant_id, status, note, logger: Optional[logging.Logger] = None) -> None:
-    query = """
-    UPDATE participants
-    SET status = %s, note = %s
+    series_query = """
+    UPDATE event_series
+    SET name = %s, type = %s, address = %s, lock_time = %s
     WHERE id = %s
     """
-    execute_query(query, (status, note, participant_id), logger=logger)
+    with transaction(logger) as cursor:
+        cursor.execute(
+            "SELECT type, start_time, series_id, occurrence_index FROM events WHERE id = %s FOR UPDATE",
+            (event_id,)
+        )
+        previous = cursor.fetchone()
+        cursor.execute(query, (name, event_type, address, lock_time, event_id))
+        if previous and previous['type'] != event_type:
+            # Participations move to the rollups of the new type
+            for user_id in load_event_participant_ids(cursor, event_id):
+                refresh_attendance_rollup(cursor, user_id, previous['type'], previous['start_time'])
+                refresh_attendance_rollup(cursor, user_id, event_type, previous['start_time'])
+        template = previous and previous['series_id'] and previous['occurrence_index'] == 0
+        if template:
+            # Occurrences not materialized yet are expanded from the series row,
+            # materialized ones keep their own values
+            cursor.execute(series_query, (name, event_type, address, lock_time, previous['series_id']))
+        write_outbox(cursor, "event_updated", event_id, {
+            "name": name,
+            "type": event_type,
+            "address": address,
+            "lock_time": lock_time
+        })
+    notify_change("event", event_id=event_id)
+    if template:
+        notify_change("series")
 
 def delete_event(event_id, logger: Optional[logging.Logger] = None) -> None:
     query = "DELETE FROM events WHERE id = %s"
-    execute_query(query, (event_id,), logger=logger)
+    with transaction(logger) as cursor:
+        cursor.execute("SELECT type, start_time FROM events WHERE id = %s FOR UPDATE", (event_id,))
+        event = cursor.fetchone()
+        user_ids = load_event_participant_ids(cursor, event_id) if event else []
+        # Participants are deleted with the event by the foreign key
+        cursor.execute(query, (event_id,))
+        for user_id in user_ids:
+            refresh_attendance_rollup(cursor, user_id, event['type'], event['start_time'])
+        write_outbox(cursor, "event_deleted", event_id, {})
+    notify_change("event", event_id=event_id)
 
 def check_user(user_id, name, logger: Optional[logging.Logger] = None) -> None:
     query = """
@@ -408,6 +1304,7 @@ def check_user(user_id, name, logger: Optional[logging.Logger] = None) -> None:
             VALUES (%s, %s)
         """
         execute_query(query, (user_id, name), logger=logger)
+        notify_change("user", user_id=user_id, name=name)
 
 def update_user_category(user_id: str, category: str, logger: Optional[logging.Logger] = None) -> None:
     """
@@ -427,6 +1324,7 @@ def update_user_category(user_id: str, category: str, logger: Optional[logging.L
         WHERE user_id = %s
     """
     execute_query(query, (category, user_id), logger=logger)
+    notify_change("user", user_id=user_id, category=category)
 
 def check_user_category(user_id: str, logger: Optional[logging.Logger] = None) -> bool:
     """
@@ -476,4 +1374,252 @@ def load_user_from_db(user_id, logger: Optional[logging.Logger] = None) -> Optio
         SELECT * FROM users 
         WHERE user_id = %s
     """
-    return execute_query(query, (user_id,), fetchone=True, logger=logger)
\ No newline at end of file
+    return execute_query(query, (user_id,), fetchone=True, logger=logger)
+
+def create_export_job(start_date, end_date, export_format: str, requested_by: str, owner: str,
+                      logger: Optional[logging.Logger] = None) -> Tuple[int, bool]:
+    """
+    Insert queued export job unless an identical one is queued or running.
+    
+    active_key is unique and set only while the job is queued or running, so
+    concurrent requests of all processes create a single job.
+    
+    Args:
+        start_date: Start date of the range
+        end_date: End date of the range
+        export_format: Format of the artifact
+        requested_by: User ID requesting the export
+        owner: Process that will run the job, see process_origin
+        logger: Optional logger instance
+        
+    Returns:
+        Tuple[int, bool]: ID of the new or the identical active job and whether it was created
+        
+    Raises:
+        DatabaseError: If the job cannot be inserted or found
+    """
+    active_key = f"{start_date}|{end_date}|{export_format}"
+    insert = """
+        INSERT INTO export_jobs (start_date, end_date, export_format, status, requested_by, active_key, owner, heartbeat_at)
+        VALUES (%s, %s, %s, 'queued', %s, %s, %s, CURRENT_TIMESTAMP)
+    """
+    with transaction(logger) as cursor:
+        # The active job may finish between the failed insert and the read, then insert again
+        for _ in range(CREATE_EXPORT_ATTEMPTS):
+            try:
+                cursor.execute(insert, (start_date, end_date, export_format, requested_by, active_key, owner))
+                return cursor.lastrowid, True
+            except mysql.connector.IntegrityError:
+                cursor.execute("SELECT id FROM export_jobs WHERE active_key = %s FOR UPDATE", (active_key,))
+                active = cursor.fetchone()
+                if active:
+                    return active['id'], False
+    raise DatabaseError(f"Failed to create export job {active_key}")
+
+def add_export_job_subscriber(job_id: int, user_id: str, logger: Optional[logging.Logger] = None) -> None:
+    query = """
+        INSERT IGNORE INTO export_job_subscribers (job_id, user_id)
+        VALUES (%s, %s)
+    """
+    execute_query(query, (job_id, user_id), logger=logger)
+
+def load_export_job_subscribers(job_id: int, logger: Optional[logging.Logger] = None) -> List[str]:
+    query = """
+        SELECT user_id FROM export_job_subscribers
+        WHERE job_id = %s
+    """
+    return [row['user_id'] for row in execute_query(query, (job_id,), logger=logger)]
+
+def update_export_job(job_id: int, status: str, rows_exported: int = 0,
+                      artifact_path: Optional[str] = None, error: Optional[str] = None,
+                      logger: Optional[logging.Logger] = None) -> None:
+    query = """
+        UPDATE export_jobs
+        SET status = %s, rows_exported = %s, artifact_path = %s, error = %s,
+            active_key = IF(%s IN ('done', 'failed'), NULL, active_key),
+            finished_at = IF(%s IN ('done', 'failed'), CURRENT_TIMESTAMP, NULL)
+        WHERE id = %s
+    """
+    execute_query(query, (status, rows_exported, artifact_path, error, status, status, job_id), logger=logger)
+
+def claim_export_job(job_id: int, owner: str, logger: Optional[logging.Logger] = None) -> bool:
+    """
+    Move queued job of the owner to running, setting started_at.
+    
+    Returns:
+        bool: False if the job is no longer queued for this owner, e.g. it was taken over
+    """
+    query = """
+        UPDATE export_jobs
+        SET status = 'running', started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP
+        WHERE id = %s AND owner = %s AND status = 'queued'
+    """
+    with transaction(logger) as cursor:
+        cursor.execute(query, (job_id, owner))
+        return cursor.rowcount == 1
+
+def take_over_export_job(job_id: int, owner: str, stale_before: datetime, logger: Optional[logging.Logger] = None) -> bool:
+    """
+    Queue job of a dead process again for the new owner.
+    
+    Returns:
+        bool: False if the job finished or its owner sent a heartbeat meanwhile
+    """
+    query = """
+        UPDATE export_jobs
+        SET status = 'queued', owner = %s, heartbeat_at = CURRENT_TIMESTAMP
+        WHERE id = %s AND status IN ('queued', 'running')
+        AND (heartbeat_at IS NULL OR heartbeat_at < %s)
+    """
+    with transaction(logger) as cursor:
+        cursor.execute(query, (owner, job_id, stale_before))
+        return cursor.rowcount == 1
+
+def touch_export_jobs(owner: str, logger: Optional[logging.Logger] = None) -> None:
+    query = """
+        UPDATE export_jobs
+        SET heartbeat_at = CURRENT_TIMESTAMP
+        WHERE owner = %s AND status IN ('queued', 'running')
+    """
+    execute_query(query, (owner,), logger=logger)
+
+def load_stale_export_jobs(stale_before: datetime, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    query = """
+        SELECT * FROM export_jobs
+        WHERE status IN ('queued', 'running')
+        AND (heartbeat_at IS NULL OR heartbeat_at < %s)
+        ORDER BY id ASC
+    """
+    return execute_query(query, (stale_before,), logger=logger)
+
+def load_reusable_export_job(start_date, end_date, export_format: str, logger: Optional[logging.Logger] = None) -> Optional[Dict[str, Any]]:
+    """
+    Load latest finished export of the range with no attendance change since.
+    
+    Changes are compared with started_at, taken before the job read its rows,
+    so a change made while the job was running invalidates the artifact.
+    
+    Args:
+        start_date: Start date of the range
+        end_date: End date of the range
+        export_format: Format of the artifact
+        logger: Optional logger instance
+        
+    Returns:
+        Optional[Dict[str, Any]]: Export job or None if the range changed
+    """
+    query = """
+        SELECT j.* FROM export_jobs j
+        WHERE j.start_date = %s AND j.end_date = %s AND j.export_format = %s
+        AND j.status = 'done' AND j.artifact_path IS NOT NULL
+        AND NOT EXISTS (
+            SELECT 1 FROM history h
+            JOIN events e ON h.event_id = e.id
+            WHERE DATE(e.start_time) >= j.start_date
+            AND DATE(e.end_time) <= j.end_date
+            AND h.inserted_at >= j.started_at
+        )
+        ORDER BY j.started_at DESC
+        LIMIT 1
+    """
+    return execute_query(query, (start_date, end_date, export_format), fetchone=True, logger=logger)
+
+def load_stale_export_artifacts(start_date, end_date, export_format: str, keep_id: int, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    query = """
+        SELECT id, artifact_path FROM export_jobs
+        WHERE start_date = %s AND end_date = %s AND export_format = %s
+        AND artifact_path IS NOT NULL AND id <> %s
+    """
+    return execute_query(query, (start_date, end_date, export_format, keep_id), logger=logger)
+
+def clear_export_artifact(job_id: int, logger: Optional[logging.Logger] = None) -> None:
+    query = "UPDATE export_jobs SET artifact_path = NULL WHERE id = %s"
+    execute_query(query, (job_id,), logger=logger)
+
+def add_series_to_db(event: Dict[str, Any], interval_weeks: int, until_date, logger: Optional[logging.Logger] = None) -> int:
+    query = """
+        INSERT INTO event_series (name, start_time, end_time, lock_time, type, address, interval_weeks, until_date)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    return execute_query(query, (event['name'], event['start_time'], event['end_time'], event['lock_time'],
+                                 event['type'], event['address'], interval_weeks, until_date),
+                         logger=logger, lastrowid=True)
+
+def add_series_exception(series_id: int, occurrence_date, logger: Optional[logging.Logger] = None) -> None:
+    query = """
+        INSERT IGNORE INTO event_series_exceptions (series_id, occurrence_date)
+        VALUES (%s, %s)
+    """
+    execute_query(query, (series_id, occurrence_date), logger=logger)
+
+def attach_event_to_series(event_id: int, series_id: int, occurrence_index: int, logger: Optional[logging.Logger] = None) -> None:
+    query = """
+        UPDATE events
+        SET series_id = %s, occurrence_index = %s
+        WHERE id = %s
+    """
+    execute_query(query, (series_id, occurrence_index, event_id), logger=logger)
+
+def load_series_from_db(series_id: int, logger: Optional[logging.Logger] = None) -> Optional[Dict[str, Any]]:
+    query = """
+        SELECT * FROM event_series
+        WHERE id = %s
+    """
+    return execute_query(query, (series_id,), fetchone=True, logger=logger)
+
+def load_series_in_window(window_start, window_end, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    query = """
+        SELECT * FROM event_series
+        WHERE start_time <= %s
+        AND (until_date IS NULL OR until_date >= DATE(%s))
+    """
+    return execute_query(query, (window_end, window_start,), logger=logger)
+
+def load_series_exceptions(series_ids: List[int], logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    if not series_ids:
+        return []
+    placeholders = ", ".join(["%s"] * len(series_ids))
+    query = f"""
+        SELECT series_id, occurrence_date FROM event_series_exceptions
+        WHERE series_id IN ({placeholders})
+    """
+    return execute_query(query, tuple(series_ids), logger=logger)
+
+def load_materialized_occurrences(series_ids: List[int], logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    if not series_ids:
+        return []
+    placeholders = ", ".join(["%s"] * len(series_ids))
+    query = f"""
+        SELECT id, series_id, occurrence_index FROM events
+        WHERE series_id IN ({placeholders})
+    """
+    return execute_query(query, tuple(series_ids), logger=logger)
+
+def load_materialized_occurrence(series_id: int, occurrence_index: int, logger: Optional[logging.Logger] = None) -> Optional[Dict[str, Any]]:
+    query = """
+        SELECT * FROM events
+        WHERE series_id = %s AND occurrence_index = %s
+    """
+    return execute_query(query, (series_id, occurrence_index), fetchone=True, logger=logger)
+
+def materialize_occurrence_to_db(occurrence: Dict[str, Any], logger: Optional[logging.Logger] = None) -> int:
+    """
+    Insert occurrence of a series as event row, or get ID of the existing one.
+    
+    Args:
+        occurrence: Expanded occurrence with series_id and occurrence_index
+        logger: Optional logger instance
+        
+    Returns:
+        int: ID of the event row
+    """
+    # LAST_INSERT_ID(id) makes lastrowid point to the existing row on duplicate
+    query = """
+        INSERT INTO events (name, start_time, end_time, lock_time, type, address, series_id, occurrence_index)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)
+    """
+    return execute_query(query, (occurrence['name'], occurrence['start_time'], occurrence['end_time'],
+                                 occurrence['lock_time'], occurrence['type'], occurrence['address'],
+                                 occurrence['series_id'], occurrence['occurrence_index']),
+                         logger=logger, lastrowid=True)
@@ -33,7 +33,171 @@ CREATE TABLE `events` (
   `end_time` datetime NOT NULL,
   `lock_time` datetime NOT NULL,
   `type` varchar(100) NOT NULL,
-  `address` varchar(255) DEFAULT NULL
+  `address` varchar(255) DEFAULT NULL,
+  `series_id` int(11) DEFAULT NULL,
+  `occurrence_index` int(11) DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_czech_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `event_series`
+--
+
+CREATE TABLE `event_series` (
+  `id` int(11) NOT NULL,
+  `name` varchar(100) NOT NULL,
+  `start_time` datetime NOT NULL,
+  `end_time` datetime NOT NULL,
+  `lock_time` datetime NOT NULL,
+  `type` varchar(100) NOT NULL,
+  `address` varchar(255) DEFAULT NULL,
+  `interval_weeks` int(11) NOT NULL DEFAULT 1,
+  `until_date` date DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_czech_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `event_series_exceptions`
+--
+
+CREATE TABLE `event_series_exceptions` (
+  `series_id` int(11) NOT NULL,
+  `occurrence_date` date NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_czech_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `export_jobs`
+--
+
+CREATE TABLE `export_jobs` (
+  `id` int(11) NOT NULL,
+  `start_date` date NOT NULL,
+  `end_date` date NOT NULL,
+  `export_format` varchar(20) NOT NULL DEFAULT 'csv',
+  `status` varchar(20) NOT NULL,
+  `requested_by` varchar(50) NOT NULL,
+  `rows_exported` int(11) NOT NULL DEFAULT 0,
+  `artifact_path` varchar(255) DEFAULT NULL,
+  `error` varchar(255) DEFAULT NULL,
+  `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `started_at` timestamp NULL DEFAULT NULL,
+  `finished_at` timestamp NULL DEFAULT NULL,
+  `active_key` varchar(64) DEFAULT NULL,
+  `owner` varchar(64) DEFAULT NULL,
+  `heartbeat_at` timestamp NULL DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_czech_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `export_job_subscribers`
+--
+
+CREATE TABLE `export_job_subscribers` (
+  `job_id` int(11) NOT NULL,
+  `user_id` varchar(50) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_czech_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `export_watermarks`
+--
+
+CREATE TABLE `export_watermarks` (
+  `start_date` date NOT NULL,
+  `end_date` date NOT NULL,
+  `watermark` timestamp NOT NULL,
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_czech_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `reminder_deliveries`
+--
+
+CREATE TABLE `reminder_deliveries` (
+  `id` int(11) NOT NULL,
+  `user_id` varchar(50) NOT NULL,
+  `event_ids` text NOT NULL,
+  `status` varchar(10) NOT NULL,
+  `attempts` int(11) NOT NULL DEFAULT 1,
+  `error` varchar(255) DEFAULT NULL,
+  `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_czech_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `sent_reminders`
+--
+
+CREATE TABLE `sent_reminders` (
+  `reminder_key` varchar(64) NOT NULL,
+  `lock_time` datetime NOT NULL,
+  `sent_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_czech_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `attendance_rollups`
+--
+
+CREATE TABLE `attendance_rollups` (
+  `season` varchar(10) NOT NULL,
+  `event_type` varchar(100) NOT NULL,
+  `user_id` varchar(50) NOT NULL,
+  `coming` int(11) NOT NULL DEFAULT 0,
+  `late` int(11) NOT NULL DEFAULT 0,
+  `not_coming` int(11) NOT NULL DEFAULT 0,
+  `late_cancellations` int(11) NOT NULL DEFAULT 0,
+  `current_streak` int(11) NOT NULL DEFAULT 0,
+  `best_streak` int(11) NOT NULL DEFAULT 0,
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_czech_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `rollup_watermark`
+--
+
+CREATE TABLE `rollup_watermark` (
+  `id` tinyint(1) NOT NULL,
+  `counted_until` datetime NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_czech_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `outbox`
+--
+
+CREATE TABLE `outbox` (
+  `id` bigint(20) NOT NULL,
+  `kind` varchar(20) NOT NULL,
+  `event_id` int(11) DEFAULT NULL,
+  `origin` varchar(64) NOT NULL,
+  `payload` text NOT NULL,
+  `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_czech_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `outbox_checkpoints`
+--
+
+CREATE TABLE `outbox_checkpoints` (
+  `subscriber` varchar(64) NOT NULL,
+  `last_id` bigint(20) NOT NULL,
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_czech_ci;
 
 -- --------------------------------------------------------
@@ -50,7 +214,8 @@ CREATE TABLE `history` (
   `old_status` varchar(20) DEFAULT NULL,
   `new_status` varchar(20) DEFAULT NULL,
   `old_note` varchar(255) DEFAULT NULL,
-  `new_note` varchar(255) DEFAULT NULL
+  `new_note` varchar(255) DEFAULT NULL,
+  `inserted_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_czech_ci;
 
 -- --------------------------------------------------------
@@ -87,15 +252,91 @@ CREATE TABLE `users` (
 -- Indexes for table `events`
 --
 ALTER TABLE `events`
+  ADD PRIMARY KEY (`id`),
+  ADD UNIQUE KEY `series_occurrence` (`series_id`,`occurrence_index`);
+
+--
+-- Indexes for table `event_series`
+--
+ALTER TABLE `event_series`
   ADD PRIMARY KEY (`id`);
 
+--
+-- Indexes for table `event_series_exceptions`
+--
+ALTER TABLE `event_series_exceptions`
+  ADD PRIMARY KEY (`series_id`,`occurrence_date`);
+
+--
+-- Indexes for table `export_jobs`
+--
+ALTER TABLE `export_jobs`
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `export_jobs_range` (`start_date`,`end_date`,`export_format`,`status`),
+  ADD UNIQUE KEY `active_key` (`active_key`);
+
+--
+-- Indexes for table `export_job_subscribers`
+--
+ALTER TABLE `export_job_subscribers`
+  ADD PRIMARY KEY (`job_id`,`user_id`);
+
+--
+-- Indexes for table `export_watermarks`
+--
+ALTER TABLE `export_watermarks`
+  ADD PRIMARY KEY (`start_date`,`end_date`);
+
+--
+-- Indexes for table `reminder_deliveries`
+--
+ALTER TABLE `reminder_deliveries`
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `user_id` (`user_id`),
+  ADD KEY `created_at` (`created_at`);
+
+--
+-- Indexes for table `sent_reminders`
+--
+ALTER TABLE `sent_reminders`
+  ADD PRIMARY KEY (`reminder_key`),
+  ADD KEY `lock_time` (`lock_time`);
+
+--
+-- Indexes for table `attendance_rollups`
+--
+ALTER TABLE `attendance_rollups`
+  ADD PRIMARY KEY (`season`,`event_type`,`user_id`),
+  ADD KEY `user_id` (`user_id`);
+
+--
+-- Indexes for table `rollup_watermark`
+--
+ALTER TABLE `rollup_watermark`
+  ADD PRIMARY KEY (`id`);
+
+--
+-- Indexes for table `outbox`
+--
+ALTER TABLE `outbox`
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `created_at` (`created_at`);
+
+--
+-- Indexes for table `outbox_checkpoints`
+--
+ALTER TABLE `outbox_checkpoints`
+  ADD PRIMARY KEY (`subscriber`);
+
 --
 -- Indexes for table `history`
 --
 ALTER TABLE `history`
   ADD PRIMARY KEY (`id`),
   ADD KEY `event_id` (`event_id`),
-  ADD KEY `user_id` (`user_id`);
+  ADD KEY `user_id` (`user_id`),
+  ADD KEY `timestamp` (`timestamp`),
+  ADD KEY `inserted_at` (`inserted_at`);
 
 --
 -- Indexes for table `participants`
@@ -121,19 +362,51 @@ ALTER TABLE `users`
 ALTER TABLE `events`
   MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
 --
+-- AUTO_INCREMENT for table `event_series`
+--
+ALTER TABLE `event_series`
+  MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
+--
+-- AUTO_INCREMENT for table `export_jobs`
+--
+ALTER TABLE `export_jobs`
+  MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
+--
 -- AUTO_INCREMENT for table `history`
 --
 ALTER TABLE `history`
   MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
 --
+-- AUTO_INCREMENT for table `outbox`
+--
+ALTER TABLE `outbox`
+  MODIFY `id` bigint(20) NOT NULL AUTO_INCREMENT;
+--
 -- AUTO_INCREMENT for table `participants`
 --
 ALTER TABLE `participants`
   MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
 --
+-- AUTO_INCREMENT for table `reminder_deliveries`
+--
+ALTER TABLE `reminder_deliveries`
+  MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
+--
 -- Constraints for dumped tables
 --
 
+--
+-- Constraints for table `events`
+--
+ALTER TABLE `events`
+  ADD CONSTRAINT `events_ibfk_1` FOREIGN KEY (`series_id`) REFERENCES `event_series` (`id`) ON DELETE SET NULL;
+
+--
+-- Constraints for table `event_series_exceptions`
+--
+ALTER TABLE `event_series_exceptions`
+  ADD CONSTRAINT `event_series_exceptions_ibfk_1` FOREIGN KEY (`series_id`) REFERENCES `event_series` (`id`) ON DELETE CASCADE;
+
 --
 -- Constraints for table `history`
 --
@@ -0,0 +1,222 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+import threading
+import logging
+import locale
+from db import add_change_listener, notify_change
+
+# Constants
+PAGE_SIZE = 200
+# Events are missed while no connection is open, reload the whole directory this often
+MAX_AGE = timedelta(hours=6)
+# Members decide admin rights, a removed admin loses them at the latest after this
+MEMBERS_MAX_AGE = timedelta(minutes=1)
+
+# Events keeping the directory fresh, the app has to subscribe to them
+CHANNEL_EVENTS = [
+    "channel_created", "channel_rename", "channel_archive", "channel_unarchive", "channel_deleted",
+    "group_rename", "group_archive", "group_unarchive", "group_deleted", "group_left"
+]
+SUBTEAM_EVENTS = ["subteam_created", "subteam_updated", "subteam_members_changed"]
+
+class DirectoryError(Exception):
+    """Base exception for channel directory related errors"""
+    pass
+
+_channels: Dict[str, Dict[str, Any]] = {}
+_user_groups: Dict[str, str] = {}
+# User group -> (user IDs, time loaded), loaded on the membership check of the group
+_members: Dict[str, Tuple[Set[str], datetime]] = {}
+_loaded_at: Optional[datetime] = None
+# False until the first load, until then there is no stale directory to serve
+_ever_loaded = False
+_refresh: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+def load_directory(client: WebClient, logger: logging.Logger) -> None:
+    """
+    Load all channels the bot can see and all user groups.
+
+    Raises:
+        DirectoryError: If Slack cannot be reached
+    """
+    global _loaded_at, _ever_loaded
+    try:
+        channels = {}
+        cursor = None
+        while True:
+            response = client.conversations_list(
+                types="public_channel,private_channel",
+                exclude_archived=True,
+                limit=PAGE_SIZE,
+                cursor=cursor
+            )
+            for channel in response["channels"]:
+                channels[channel["id"]] = {"name": channel["name"], "archived": False}
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                break
+
+        response = client.usergroups_list()
+        user_groups = {group["id"]: group["name"] for group in response["usergroups"]}
+    except SlackApiError as e:
+        raise DirectoryError(f"Error loading channel directory: {e}")
+
+    with _lock:
+        _channels.clear()
+        _channels.update(channels)
+        _user_groups.clear()
+        _user_groups.update(user_groups)
+        _members.clear()
+        _loaded_at = datetime.now()
+        _ever_loaded = True
+    logger.info(f"Channel directory loaded: {len(channels)} channels, {len(user_groups)} user groups")
+
+def is_stale() -> bool:
+    """Check whether the directory was invalidated or is older than MAX_AGE."""
+    return _loaded_at is None or datetime.now() - _loaded_at > MAX_AGE
+
+def run_refresh(client: WebClient, logger: logging.Logger) -> None:
+    try:
+        load_directory(client, logger)
+    except DirectoryError as e:
+        logger.error(f"{datetime.now()} - {e}")
+
+def refresh_in_background(client: WebClient, logger: logging.Logger) -> None:
+    """Reload the directory in a daemon thread unless a reload is already running."""
+    global _refresh
+    with _lock:
+        if _refresh and _refresh.is_alive():
+            return
+        _refresh = threading.Thread(target=run_refresh, args=(client, logger), name="directory-refresh", daemon=True)
+        _refresh.start()
+
+def ensure_loaded(client: WebClient, logger: logging.Logger) -> None:
+    """
+    Load the directory if it was never loaded, reload a stale one in the background.
+
+    The stale directory is served while it reloads, so only the very first
+    use waits for Slack.
+
+    Raises:
+        DirectoryError: If the first load cannot reach Slack
+    """
+    if not is_stale():
+        return
+    if _ever_loaded:
+        refresh_in_background(client, logger)
+    else:
+        load_directory(client, logger)
+
+def invalidate_directory() -> None:
+    """Reload the directory on its next use."""
+    global _loaded_at
+    with _lock:
+        _loaded_at = None
+
+def get_channels(client: WebClient, logger: logging.Logger) -> List[Dict[str, Any]]:
+    """
+    Get not archived channels as select options in Czech alphabetical order.
+
+    Returns:
+        List[Dict[str, Any]]: Options, empty if the directory cannot be loaded
+    """
+    try:
+        ensure_loaded(client, logger)
+    except DirectoryError as e:
+        logger.error(f"{datetime.now()} - {e}")
+        return []
+    with _lock:
+        names = [(channel_id, channel["name"]) for channel_id, channel in _channels.items() if not channel["archived"]]
+    return [
+        {"text": {"type": "plain_text", "text": name}, "value": channel_id}
+        for channel_id, name in sorted(names, key=lambda item: locale.strxfrm(item[1]))
+    ]
+
+def get_user_groups(client: WebClient, logger: logging.Logger) -> List[Dict[str, Any]]:
+    """Get user groups as select options in Czech alphabetical order."""
+    try:
+        ensure_loaded(client, logger)
+    except DirectoryError as e:
+        logger.error(f"{datetime.now()} - {e}")
+        return []
+    with _lock:
+        names = list(_user_groups.items())
+    return [
+        {"text": {"type": "plain_text", "text": name}, "value": group_id}
+        for group_id, name in sorted(names, key=lambda item: locale.strxfrm(item[1]))
+    ]
+
+def is_group_member(client: WebClient, group_id: str, user_id: str) -> bool:
+    """
+    Check whether user belongs to the user group.
+
+    Members are cached for MEMBERS_MAX_AGE and refetched sooner after
+    subteam events of the group or a reload of the directory.
+
+    Raises:
+        SlackApiError: If members cannot be fetched
+    """
+    # Membership does not need the channel list, never wait for its reload here
+    if is_stale():
+        refresh_in_background(client, logging.getLogger(__name__))
+    with _lock:
+        cached = _members.get(group_id)
+    if cached is None or datetime.now() - cached[1] > MEMBERS_MAX_AGE:
+        response = client.usergroups_users_list(usergroup=group_id)
+        cached = (set(response["users"]), datetime.now())
+        with _lock:
+            _members[group_id] = cached
+    return user_id in cached[0]
+
+def handle_directory_event(event: Dict[str, Any], logger: logging.Logger) -> None:
+    """
+    Turn channel_* and subteam_* event into a directory change.
+
+    The change goes through notify_change, so directories of the other
+    worker processes are updated as well.
+    """
+    event_type = event["type"]
+    if event_type in ("channel_created", "channel_rename", "group_rename"):
+        notify_change("directory", channel_id=event["channel"]["id"], name=event["channel"]["name"])
+    elif event_type in ("channel_archive", "group_archive"):
+        notify_change("directory", channel_id=event["channel"], archived=True)
+    elif event_type in ("channel_unarchive", "group_unarchive"):
+        notify_change("directory", channel_id=event["channel"], archived=False)
+    elif event_type in ("channel_deleted", "group_deleted", "group_left"):
+        notify_change("directory", channel_id=event["channel"], removed=True)
+    elif event_type in ("subteam_created", "subteam_updated"):
+        notify_change("directory", group_id=event["subteam"]["id"], name=event["subteam"]["name"])
+    elif event_type == "subteam_members_changed":
+        notify_change("directory", group_id=event["subteam_id"])
+    else:
+        logger.warning(f"Unexpected directory event {event_type}")
+
+def on_change(kind: str, **keys: Any) -> None:
+    """Apply directory change made by this or another process."""
+    global _loaded_at
+    if kind != "directory":
+        return
+    if "channel_id" in keys:
+        with _lock:
+            channel_id = keys["channel_id"]
+            if keys.get("removed"):
+                _channels.pop(channel_id, None)
+            elif channel_id in _channels:
+                _channels[channel_id].update({key: keys[key] for key in ("name", "archived") if key in keys})
+            elif "name" in keys:
+                _channels[channel_id] = {"name": keys["name"], "archived": keys.get("archived", False)}
+            elif not keys.get("archived"):
+                # Unarchived channel was not loaded, its name is unknown
+                _loaded_at = None
+    elif "group_id" in keys:
+        with _lock:
+            if "name" in keys:
+                _user_groups[keys["group_id"]] = keys["name"]
+            _members.pop(keys["group_id"], None)
+    else:
+        invalidate_directory()
+
+add_change_listener(on_change)
@@ -4,7 +4,8 @@ from slack_sdk.errors import SlackApiError
 from datetime import datetime
 import logging
 import config
-from db import load_events_by_date_from_db, load_event_from_db, load_user_in_event, load_user_from_db
+from db import load_events_by_date_from_db, load_user_in_event, load_user_from_db
+from recurrence import load_occurrences_in_range, load_event_or_occurrence, merge_events
 
 class EditError(Exception):
     """Base exception for edit related errors"""
@@ -217,7 +218,11 @@ def show_edit_attendance(client: WebClient, user_id: str, logger: logging.Logger
 def show_events_by_day(client: WebClient, logger: logging.Logger, selected_date: datetime, user_id: str) -> None:
     """Show events for selected date"""
     try:
-        events = load_events_by_date_from_db(selected_date)
+        day = datetime.strptime(selected_date, '%Y-%m-%d').date()
+        events = merge_events(
+            load_events_by_date_from_db(selected_date),
+            load_occurrences_in_range(day, day)
+        )
         blocks = build_header_blocks(has_export=config.export_channel != "None")
         
         for event in events:
@@ -237,7 +242,7 @@ def show_edit_attendance_players(
 ) -> None:
     """Show attendance edit view for event"""
     try:
-        event = load_event_from_db(event_id)
+        event = load_event_or_occurrence(event_id)
         blocks = build_header_blocks()
         
         # Add event info
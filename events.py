@@ -4,6 +4,7 @@ from slack_sdk.errors import SlackApiError
 from datetime import datetime, timedelta
 import logging
 from db import *
+from recurrence import create_series_from_event, load_event_or_occurrence
 
 # Constants
 MAX_BLOCKS_PER_PAGE = 50
@@ -32,6 +33,19 @@ MESSAGES = {
     "VALIDATION": "Prosím vyplňte všechna povinná pole."
 }
 
+MESSAGES_RECURRENCE = {
+    "SUCCESS": "Z události {name} byla vytvořena opakovaná série.",
+    "ERROR": "Nastala chyba při vytváření opakování.",
+    "INVALID_DATE": "Neplatné datum výjimky: {value}",
+    "NOT_FOUND": "Událost nebyla nalezena.",
+    "IN_SERIES": "Událost už je součástí opakované série."
+}
+
+RECURRENCE_INTERVALS = [
+    {"text": {"type": "plain_text", "text": "Každý týden"}, "value": "1"},
+    {"text": {"type": "plain_text", "text": "Každý druhý týden"}, "value": "2"}
+]
+
 MESSAGES_DUPLICATION = {
     "SUCCESS": "Událost {name} byla duplikována {count} krát.",
     "ERROR": "Nastala chyba při duplikaci události.",
@@ -252,7 +266,16 @@ def build_event_list_blocks(events: List[Dict], page: int) -> List[Dict[str, Any
                             "text": "Duplikovat"
                         },
                         "action_id": f"duplicate_event_{event['id']}"
-                    }
+                    },
+                    # Occurrences of a series cannot start another one
+                    *([] if event.get('series_id') else [{
+                        "type": "button",
+                        "text": {
+                            "type": "plain_text",
+                            "text": "Opakovat"
+                        },
+                        "action_id": f"repeat_event_{event['id']}"
+                    }])
                 ]
             },
             {
@@ -422,6 +445,77 @@ def open_duplicate_modal(client: WebClient, trigger_id: str, event_id: str) -> N
         }
     )
 
+def open_repeat_modal(client: WebClient, trigger_id: str, event_id: str) -> None:
+    client.views_open(
+        trigger_id=trigger_id,
+        view={
+            "type": "modal",
+            "callback_id": f"repeat_event_{event_id}",
+            "title": {
+                "type": "plain_text",
+                "text": "Opakovat událost"
+            },
+            "blocks": [
+                {
+                    "type": "input",
+                    "block_id": "repeat_interval_block",
+                    "element": {
+                        "type": "static_select",
+                        "action_id": "repeat_interval",
+                        "options": RECURRENCE_INTERVALS,
+                        "initial_option": RECURRENCE_INTERVALS[0]
+                    },
+                    "label": {
+                        "type": "plain_text",
+                        "text": "Opakování"
+                    }
+                },
+                {
+                    "type": "input",
+                    "block_id": "repeat_until_block",
+                    "optional": True,
+                    "element": {
+                        "type": "datepicker",
+                        "action_id": "repeat_until",
+                        "placeholder": {
+                            "type": "plain_text",
+                            "text": "Bez omezení"
+                        }
+                    },
+                    "label": {
+                        "type": "plain_text",
+                        "text": "Opakovat do"
+                    }
+                },
+                {
+                    "type": "input",
+                    "block_id": "repeat_exceptions_block",
+                    "optional": True,
+                    "element": {
+                        "type": "plain_text_input",
+                        "action_id": "repeat_exceptions",
+                        "placeholder": {
+                            "type": "plain_text",
+                            "text": "např. 24.12.2025, 31.12.2025"
+                        }
+                    },
+                    "label": {
+                        "type": "plain_text",
+                        "text": "Vynechat dny"
+                    }
+                }
+            ],
+            "close": {
+                "type": "plain_text",
+                "text": "Zavřít"
+            },
+            "submit": {
+                "type": "plain_text",
+                "text": "Potvrdit"
+            }
+        }
+    )
+
 def open_edit_modal(client: WebClient, trigger_id: str, event_id: str, event: Dict[str, Any]) -> None:
     unix_timestamp = event['lock_time'].timestamp()
 
@@ -575,7 +669,7 @@ def show_event_details(
         ValueError: If event is not found
     """
     try:
-        event = load_event_from_db(event_id)
+        event = load_event_or_occurrence(event_id)
         if not event:
             raise ValueError(f"Event {event_id} not found")
 
@@ -704,16 +798,10 @@ def handle_duplicate_event_submission(
         if not original_event:
             raise ValueError(MESSAGES_DUPLICATION["NOT_FOUND"])
 
-        for i in range(duplicate_count):
-            new_event = duplicate_event(original_event, i + 1)
-            duplicate_event_to_db(
-                name=new_event['name'],
-                start_time=new_event['start_time'],
-                end_time=new_event['end_time'],
-                lock_time=new_event['lock_time'],
-                event_type=new_event['type'],
-                address=new_event['address']
-            )
+        bulk_insert_events(
+            [duplicate_event(original_event, i + 1) for i in range(duplicate_count)],
+            logger
+        )
 
         client.chat_postMessage(
             channel=body['user']['id'],
@@ -741,3 +829,74 @@ def handle_duplicate_event_submission(
             text=MESSAGES_DUPLICATION["ERROR"]
         )
 
+def parse_exception_dates(value: Optional[str]) -> List[datetime]:
+    """
+    Parse comma separated dates in DD.MM.YYYY format.
+    
+    Raises:
+        ValueError: If any date is invalid
+    """
+    dates = []
+    for item in (value or "").split(","):
+        if not (item := item.strip()):
+            continue
+        try:
+            dates.append(datetime.strptime(item, '%d.%m.%Y').date())
+        except ValueError:
+            raise ValueError(MESSAGES_RECURRENCE["INVALID_DATE"].format(value=item))
+    return dates
+
+def handle_repeat_event_submission(
+    client: WebClient,
+    body: Dict[str, Any],
+    logger: logging.Logger
+) -> None:
+    """
+    Handle recurring series submission.
+    
+    Args:
+        client: Slack WebClient instance
+        body: Request body with recurrence data
+        logger: Logger instance
+    """
+    try:
+        event_id = body['view']['callback_id'].split('_')[-1]
+        values = body['view']['state']['values']
+
+        interval_weeks = int(values['repeat_interval_block']['repeat_interval']['selected_option']['value'])
+        until = values.get('repeat_until_block', {}).get('repeat_until', {}).get('selected_date')
+        until_date = datetime.strptime(until, '%Y-%m-%d').date() if until else None
+        exceptions = parse_exception_dates(
+            values.get('repeat_exceptions_block', {}).get('repeat_exceptions', {}).get('value')
+        )
+
+        event = load_event_from_db(event_id)
+        if not event:
+            raise ValueError(MESSAGES_RECURRENCE["NOT_FOUND"])
+        if event.get('series_id'):
+            raise ValueError(MESSAGES_RECURRENCE["IN_SERIES"])
+
+        create_series_from_event(event, interval_weeks, until_date, exceptions, logger)
+
+        client.chat_postMessage(
+            channel=body['user']['id'],
+            text=MESSAGES_RECURRENCE["SUCCESS"].format(name=event['name'])
+        )
+
+        show_events(client, body['user']['id'], logger)
+
+    except ValueError as e:
+        logger.error(f"Validation error: {datetime.now()} - {e}")
+        client.chat_postMessage(
+            channel=body['user']['id'],
+            text=str(e)
+        )
+    except SlackApiError as e:
+        logger.error(f"Slack API error: {datetime.now()} - {e}")
+        raise
+    except Exception as e:
+        logger.error(f"Error creating recurring series: {datetime.now()} - {e}")
+        client.chat_postMessage(
+            channel=body['user']['id'],
+            text=MESSAGES_RECURRENCE["ERROR"]
+        )
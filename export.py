@@ -1,13 +1,16 @@
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
 import tempfile
 import os
+import io
 import csv
-import requests
+import gzip
+import importlib
 import logging
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
-from db import load_participants_in_range
+from db import iter_participants_in_range
+from columnar import write_parquet, write_arrow
 import config
 
 EXPORT_MODAL = {
@@ -18,88 +21,240 @@ EXPORT_MODAL = {
     "submit": {"type": "plain_text", "text": "Potvrdit"}
 }
 
+EXPORT_FIELDS = ["name", "category", "event_name", "status", "note", "start_time", "end_time"]
+# user_id and event_id form the upsert key of delta rows
+DELTA_FIELDS = ["user_id", "event_id", *EXPORT_FIELDS, "changed_at"]
+CSV_CHUNK_ROWS = 500
+
 class ExportError(Exception):
     """Base exception for export related errors"""
     pass
 
-def export_data_to_csv(start_date: str, end_date: str, user_id: str, client: WebClient, logger: logging.Logger) -> None:
+def lazy_writer(module: str, name: str) -> Callable[[Iterable[Dict[str, Any]], str], None]:
+    """Import writer on first export, numpy of the matrix formats slows down startup."""
+    def writer(rows: Iterable[Dict[str, Any]], path: str) -> None:
+        getattr(importlib.import_module(module), name)(rows, path)
+    return writer
+
+class ExportFormat(NamedTuple):
+    label: str
+    suffix: str
+    writer: Callable[[Iterable[Dict[str, Any]], str], None]
+    incremental: bool = False
+
+def encode_csv_chunks(
+    rows: Iterable[Dict[str, Any]],
+    fieldnames: List[str],
+    chunk_rows: int = CSV_CHUNK_ROWS
+) -> Iterator[str]:
+    """
+    Encode rows to CSV text in chunks of bounded size.
+    
+    Args:
+        rows: Rows to encode
+        fieldnames: CSV columns
+        chunk_rows: Number of rows per emitted chunk
+        
+    Yields:
+        str: CSV text chunk, the first one includes the header
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow({key: row.get(key, '') for key in fieldnames})
+        count += 1
+        if count >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def write_export_file(chunks: Iterable[str], suffix: str, compress: bool = False, path: Optional[str] = None) -> str:
+    """
+    Write text chunks to a file, optionally gzip compressed.
+    
+    Args:
+        chunks: Text chunks to write
+        suffix: Temporary file suffix
+        compress: Whether to gzip the output
+        path: Target path, a temporary file is created if not given
+        
+    Returns:
+        str: Path to the written file
+    """
+    temporary = not path
+    if temporary:
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        raw_file = os.fdopen(fd, 'wb')
+    else:
+        raw_file = open(path, 'wb')
+    try:
+        with raw_file as raw:
+            stream = gzip.GzipFile(fileobj=raw, mode='wb') if compress else raw
+            try:
+                for chunk in chunks:
+                    stream.write(chunk.encode('utf-8'))
+            finally:
+                if compress:
+                    stream.close()
+    except Exception:
+        # Nobody knows the path of a partial temporary file, the caller cleans up its own
+        if temporary:
+            os.remove(path)
+        raise
+    return path
+
+def write_csv(rows: Iterable[Dict[str, Any]], path: str) -> None:
+    """Write one row per participation as CSV file."""
+    write_export_file(encode_csv_chunks(rows, EXPORT_FIELDS), '.csv', False, path)
+
+def write_csv_gz(rows: Iterable[Dict[str, Any]], path: str) -> None:
+    """Write one row per participation as gzip compressed CSV file."""
+    write_export_file(encode_csv_chunks(rows, EXPORT_FIELDS), '.csv.gz', True, path)
+
+def write_delta_csv(rows: Iterable[Dict[str, Any]], path: str) -> None:
+    """Write changed participations with their upsert key as CSV file."""
+    write_export_file(encode_csv_chunks(rows, DELTA_FIELDS), '.csv', False, path)
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "csv": ExportFormat("CSV", ".csv", write_csv),
+    "csv_gz": ExportFormat("CSV (gzip)", ".csv.gz", write_csv_gz),
+    "delta_csv": ExportFormat("Změny od posledního exportu (CSV)", "_delta.csv", write_delta_csv, incremental=True),
+    "matrix_csv": ExportFormat("Matice hráči × události (CSV)", "_matrix.csv", lazy_writer("matrix", "write_matrix_csv")),
+    "matrix_xlsx": ExportFormat("Matice hráči × události (XLSX)", "_matrix.xlsx", lazy_writer("matrix", "write_matrix_xlsx")),
+    "parquet": ExportFormat("Parquet (analýzy)", ".parquet", write_parquet),
+    "arrow": ExportFormat("Arrow IPC (analýzy)", ".arrow", write_arrow)
+}
+DEFAULT_EXPORT_FORMAT = "csv"
+
+def get_export_format(export_format: str) -> ExportFormat:
+    """
+    Get export format definition.
+    
+    Raises:
+        ExportError: If format is unknown
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f"Neznámý formát exportu: {export_format}")
+    return EXPORT_FORMATS[export_format]
+
+def upload_file_to_slack(
+    path: str,
+    filename: str,
+    client: WebClient,
+    logger: logging.Logger
+) -> str:
+    """
+    Upload file to the export channel in chunks.
+    
+    Args:
+        path: Path to the file to upload
+        filename: Name of the file in Slack
+        client: Slack WebClient instance
+        logger: Logger instance
+        
+    Returns:
+        str: Name of the export channel
+        
+    Raises:
+        ExportError: If upload fails
+    """
+    file_size = os.path.getsize(path)
+
+    # Get upload URL
+    upload_response = client.files_getUploadURLExternal(
+        filename=filename,
+        length=file_size
+    )
+    
+    if not upload_response["ok"]:
+        logger.error(f"Failed to get upload URL: {upload_response['error']}")
+        raise ExportError("Nepodařilo se získat URL pro nahrání souboru")
+
+    # Imported here, only exports talk to Slack outside WebClient
+    import requests
+
+    # A file object is streamed by requests with Content-Length taken from the file
+    with open(path, 'rb') as f:
+        response = requests.post(
+            upload_response["upload_url"],
+            data=f,
+            headers={"Content-Type": "application/octet-stream"},
+            timeout=30
+        )
+    response.raise_for_status()
+
+    # Complete upload
+    file_id = upload_response["file_id"]
+    complete_upload_response = client.files_completeUploadExternal(
+        files=[{"id": file_id, "title": filename}],
+        channel_id=config.export_channel
+    )
+
+    if not complete_upload_response["ok"]:
+        logger.error(f"Failed to complete upload: {complete_upload_response['error']}")
+        raise ExportError("Nepodařilo se dokončit nahrávání souboru")
+
+    channel_response = client.conversations_info(channel=config.export_channel)
+    return channel_response['channel']['name']
+
+def validate_dates(start_date: str, end_date: str, logger: logging.Logger) -> None:
+    """
+    Validate export dates.
+    
+    Raises:
+        ExportError: If date format is invalid
+    """
+    try:
+        datetime.strptime(start_date, '%Y-%m-%d')
+        datetime.strptime(end_date, '%Y-%m-%d')
+    except ValueError as e:
+        logger.error(f"Invalid date format: {e}")
+        raise ExportError(f"Neplatný formát data: {e}")
+
+def export_data_to_csv(
+    start_date: str,
+    end_date: str,
+    user_id: str,
+    client: WebClient,
+    logger: logging.Logger,
+    compress: bool = False
+) -> None:
     """
     Export participant data to CSV and upload to Slack.
     
+    Rows are streamed from an unbuffered cursor, encoded in chunks and
+    uploaded in chunks, so memory use does not depend on the range size.
+    
     Args:
         start_date: Start date in YYYY-MM-DD format
         end_date: End date in YYYY-MM-DD format
         user_id: Slack user ID requesting the export
         client: Slack WebClient instance
         logger: Logger instance
+        compress: Whether to gzip the CSV file
         
     Raises:
         ExportError: If export process fails
     """
     try:
-        # Validate dates
-        try:
-            datetime.strptime(start_date, '%Y-%m-%d')
-            datetime.strptime(end_date, '%Y-%m-%d')
-        except ValueError as e:
-            logger.error(f"Invalid date format: {e}")
-            raise ExportError(f"Neplatný formát data: {e}")
-
-        data = load_participants_in_range(start_date, end_date)
-        required_keys = ["name", "category", "event_name", "status", "note", "start_time", "end_time"]
-        
-        # Use secure temporary file
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as temp_file:
-            writer = csv.DictWriter(temp_file, fieldnames=required_keys)
-            writer.writeheader()
-            for row in data:
-                csv_row = {key: row.get(key, '') for key in required_keys}
-                writer.writerow(csv_row)
-            
-            temp_path = temp_file.name
+        validate_dates(start_date, end_date, logger)
 
-        try:
-            file_size = os.path.getsize(temp_path)
-            filename = f"attendance_{start_date}_to_{end_date}.csv"
-
-            # Get upload URL
-            upload_response = client.files_getUploadURLExternal(
-                filename=filename,
-                length=file_size
-            )
-            
-            if not upload_response["ok"]:
-                logger.error(f"Failed to get upload URL: {upload_response['error']}")
-                raise ExportError("Nepodařilo se získat URL pro nahrání souboru")
-
-            # Upload file
-            with open(temp_path, 'rb') as f:
-                response = requests.post(
-                    upload_response["upload_url"], 
-                    files={'file': f},
-                    timeout=30
-                )
-            response.raise_for_status()
-
-            # Complete upload
-            file_id = upload_response["file_id"]
-            complete_upload_response = client.files_completeUploadExternal(
-                files=[{"id": file_id, "title": filename}],
-                channel_id=config.export_channel
-            )
+        suffix = '.csv.gz' if compress else '.csv'
+        rows = iter_participants_in_range(start_date, end_date, logger=logger)
+        temp_path = write_export_file(encode_csv_chunks(rows, EXPORT_FIELDS), suffix, compress)
 
-            if not complete_upload_response["ok"]:
-                logger.error(f"Failed to complete upload: {complete_upload_response['error']}")
-                raise ExportError("Nepodařilo se dokončit nahrávání souboru")
-
-            # Get channel name and notify user
-            channel_response = client.conversations_info(channel=config.export_channel)
-            channel_name = channel_response['channel']['name']
+        try:
+            filename = f"attendance_{start_date}_to_{end_date}{suffix}"
+            channel_name = upload_file_to_slack(temp_path, filename, client, logger)
             client.chat_postMessage(
                 channel=user_id,
                 text=f"✅ Docházka byla vyexportována do kanálu #{channel_name}"
             )
-
         finally:
             # Clean up temporary file
             if os.path.exists(temp_path):
@@ -155,7 +310,27 @@ def create_export_blocks() -> List[Dict[str, Any]]:
             "end_date", 
             "Datum konce",
             "Vyber datum konce"
-        )
+        ),
+        {
+            "type": "input",
+            "block_id": "export_format",
+            "element": {
+                "type": "static_select",
+                "action_id": "export_format_select",
+                "options": [
+                    {"text": {"type": "plain_text", "text": label}, "value": value}
+                    for value, (label, *_) in EXPORT_FORMATS.items()
+                ],
+                "initial_option": {
+                    "text": {"type": "plain_text", "text": EXPORT_FORMATS[DEFAULT_EXPORT_FORMAT].label},
+                    "value": DEFAULT_EXPORT_FORMAT
+                }
+            },
+            "label": {
+                "type": "plain_text",
+                "text": "Formát"
+            }
+        }
     ]
 
 def export_participants(
@@ -0,0 +1,343 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+import threading
+import logging
+import os
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from db import (
+    iter_participants_in_range, iter_changed_participants_in_range,
+    load_last_change_in_range, load_export_watermark, save_export_watermark,
+    create_export_job, update_export_job, add_export_job_subscriber, load_export_job_subscribers,
+    claim_export_job, take_over_export_job, touch_export_jobs, load_stale_export_jobs,
+    load_reusable_export_job, process_origin,
+    load_stale_export_artifacts, clear_export_artifact
+)
+from metrics import register_gauge
+from historylog import flush_history
+from tracing import propagate
+from export import (
+    DEFAULT_EXPORT_FORMAT, get_export_format,
+    upload_file_to_slack, validate_dates
+)
+
+# Constants
+EXPORT_DIR = "exports"
+EXPORT_WORKERS = 2
+PROGRESS_EVERY_ROWS = 5000
+# Processes mark their queued and running jobs alive this often,
+# the leader takes over jobs not marked for STALE_AFTER
+HEARTBEAT_INTERVAL = 30.0
+STALE_AFTER = timedelta(minutes=2)
+RECOVERY_INTERVAL = 60.0
+
+MESSAGES = {
+    "QUEUED": "⏳ Export docházky {start} – {end} byl zařazen do fronty.",
+    "JOINED": "⏳ Export docházky {start} – {end} už běží, dám vědět po dokončení.",
+    "PROGRESS": "⏳ Export docházky {start} – {end}: zpracováno {rows} řádků…",
+    "REUSED": "♻️ Docházka {start} – {end} se od posledního exportu nezměnila, použit předchozí soubor.",
+    "DONE": "✅ Docházka byla vyexportována do kanálu #{channel}",
+    "ERROR": "❌ Chyba při exportu docházky."
+}
+
+@dataclass
+class ExportJob:
+    job_id: int
+    start_date: str
+    end_date: str
+    export_format: str
+    # user_id -> (DM channel, ts) of the progress message
+    subscribers: Dict[str, Tuple[Optional[str], Optional[str]]] = field(default_factory=dict)
+
+_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+_active: Dict[Tuple[str, str, str], ExportJob] = {}
+_lock = threading.Lock()
+_heartbeat: Optional[threading.Thread] = None
+_recovery: Optional[threading.Thread] = None
+_stopped = threading.Event()
+
+register_gauge("export_jobs_active", "Export jobs queued or running", lambda: len(_active))
+register_gauge("export_queue_size", "Export tasks waiting for a worker", lambda: _executor._work_queue.qsize())
+
+def job_key(start_date: str, end_date: str, export_format: str) -> Tuple[str, str, str]:
+    """Build deduplication key of an export job."""
+    return str(start_date), str(end_date), export_format
+
+def artifact_path(job: ExportJob) -> str:
+    """Build path of the artifact produced by the job."""
+    suffix = get_export_format(job.export_format).suffix
+    return os.path.join(EXPORT_DIR, f"attendance_{job.start_date}_to_{job.end_date}_{job.job_id}{suffix}")
+
+def export_filename(start_date: str, end_date: str, export_format: str) -> str:
+    """Build name of the uploaded file."""
+    return f"attendance_{start_date}_to_{end_date}{get_export_format(export_format).suffix}"
+
+def notify(client: WebClient, job: ExportJob, user_id: str, text: str, logger: logging.Logger) -> None:
+    """Post new message or update the progress message of the subscriber."""
+    try:
+        with _lock:
+            channel, ts = job.subscribers.get(user_id, (None, None))
+        if channel and ts:
+            client.chat_update(channel=channel, ts=ts, text=text)
+        else:
+            response = client.chat_postMessage(channel=user_id, text=text)
+            with _lock:
+                job.subscribers[user_id] = (response.get("channel"), response.get("ts"))
+    except SlackApiError as e:
+        logger.error(f"Slack API error notifying export subscriber: {datetime.now()} - {e}")
+
+def notify_all(client: WebClient, job: ExportJob, text: str, logger: logging.Logger) -> None:
+    """Notify all subscribers of the job, including those who joined it in other processes."""
+    try:
+        joined = load_export_job_subscribers(job.job_id, logger)
+    except Exception as e:
+        logger.error(f"Error loading export job subscribers: {datetime.now()} - {e}")
+        joined = []
+    with _lock:
+        for user_id in joined:
+            job.subscribers.setdefault(user_id, (None, None))
+        subscribers = list(job.subscribers)
+    for user_id in subscribers:
+        notify(client, job, user_id, text, logger)
+
+def count_progress(
+    rows: Iterable[Dict[str, Any]],
+    job: ExportJob,
+    client: WebClient,
+    logger: logging.Logger,
+    counter: Dict[str, int]
+) -> Iterator[Dict[str, Any]]:
+    """Pass rows through while reporting progress to subscribers."""
+    for row in rows:
+        counter["rows"] += 1
+        if counter["rows"] % PROGRESS_EVERY_ROWS == 0:
+            notify_all(client, job, MESSAGES["PROGRESS"].format(
+                start=job.start_date, end=job.end_date, rows=counter["rows"]
+            ), logger)
+        yield row
+
+def iter_export_rows(job: ExportJob, watermark: Optional[datetime], logger: logging.Logger) -> Iterator[Dict[str, Any]]:
+    """Get rows changed since the watermark, or the whole range on first export."""
+    if watermark is None:
+        return iter_participants_in_range(job.start_date, job.end_date, logger=logger)
+    return iter_changed_participants_in_range(job.start_date, job.end_date, watermark, logger=logger)
+
+def remove_stale_artifacts(job: ExportJob, logger: logging.Logger) -> None:
+    """Remove artifacts of older exports of the same range."""
+    for stale in load_stale_export_artifacts(job.start_date, job.end_date, job.export_format, job.job_id, logger):
+        if os.path.exists(stale["artifact_path"]):
+            os.remove(stale["artifact_path"])
+        clear_export_artifact(stale["id"], logger)
+
+def run_export_job(job: ExportJob, client: WebClient, logger: logging.Logger) -> None:
+    """
+    Run export job, upload the artifact and notify subscribers.
+
+    Args:
+        job: Export job to run
+        client: Slack WebClient instance
+        logger: Logger instance
+    """
+    counter = {"rows": 0}
+    path = artifact_path(job)
+    try:
+        # Sets started_at, the snapshot time the reuse check compares changes with
+        if not claim_export_job(job.job_id, process_origin(), logger):
+            logger.info(f"Export job {job.job_id} was taken over by another process")
+            return
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+
+        export_format = get_export_format(job.export_format)
+        if export_format.incremental:
+            # History rows queued by this process must not land below the watermark
+            flush_history(logger)
+            # Insert time of the newest history row, taken before reading rows, so changes
+            # inserted meanwhile, also late ones of other processes, land in the next delta
+            new_watermark = load_last_change_in_range(job.start_date, job.end_date, logger)
+            source = iter_export_rows(job, load_export_watermark(job.start_date, job.end_date, logger), logger)
+        else:
+            source = iter_participants_in_range(job.start_date, job.end_date, logger=logger)
+
+        export_format.writer(count_progress(source, job, client, logger, counter), path)
+
+        channel_name = upload_file_to_slack(
+            path, export_filename(job.start_date, job.end_date, job.export_format), client, logger
+        )
+        if export_format.incremental and new_watermark:
+            save_export_watermark(job.start_date, job.end_date, new_watermark, logger)
+        update_export_job(job.job_id, "done", counter["rows"], path, logger=logger)
+        remove_stale_artifacts(job, logger)
+        notify_all(client, job, MESSAGES["DONE"].format(channel=channel_name), logger)
+
+    except Exception as e:
+        logger.error(f"Error running export job {job.job_id}: {datetime.now()} - {e}")
+        if os.path.exists(path):
+            os.remove(path)
+        try:
+            update_export_job(job.job_id, "failed", counter["rows"], error=str(e)[:255], logger=logger)
+        except Exception as db_error:
+            logger.error(f"Error marking export job {job.job_id} failed: {datetime.now()} - {db_error}")
+        notify_all(client, job, MESSAGES["ERROR"], logger)
+    finally:
+        with _lock:
+            _active.pop(job_key(job.start_date, job.end_date, job.export_format), None)
+
+def reuse_export(previous: Dict[str, Any], user_id: str, client: WebClient, logger: logging.Logger) -> None:
+    """
+    Upload artifact of a previous export whose range did not change.
+
+    Args:
+        previous: Finished export job row
+        user_id: Slack user ID requesting the export
+        client: Slack WebClient instance
+        logger: Logger instance
+    """
+    start_date, end_date = str(previous["start_date"]), str(previous["end_date"])
+    try:
+        channel_name = upload_file_to_slack(
+            previous["artifact_path"],
+            export_filename(start_date, end_date, previous["export_format"]),
+            client,
+            logger
+        )
+        client.chat_postMessage(
+            channel=user_id,
+            text=MESSAGES["REUSED"].format(start=start_date, end=end_date) + "\n"
+                 + MESSAGES["DONE"].format(channel=channel_name)
+        )
+    except Exception as e:
+        logger.error(f"Error reusing export job {previous['id']}: {datetime.now()} - {e}")
+        client.chat_postMessage(channel=user_id, text=MESSAGES["ERROR"])
+
+def submit_export_job(
+    start_date: str,
+    end_date: str,
+    user_id: str,
+    client: WebClient,
+    logger: logging.Logger,
+    export_format: str = DEFAULT_EXPORT_FORMAT
+) -> None:
+    """
+    Queue export of the range, joining an identical running job if any.
+
+    A finished artifact is reused when no attendance in the range changed
+    since it was produced.
+
+    Args:
+        start_date: Start date in YYYY-MM-DD format
+        end_date: End date in YYYY-MM-DD format
+        user_id: Slack user ID requesting the export
+        client: Slack WebClient instance
+        logger: Logger instance
+        export_format: Key of EXPORT_FORMATS
+
+    Raises:
+        ExportError: If dates or format are invalid
+    """
+    validate_dates(start_date, end_date, logger)
+    get_export_format(export_format)
+    key = job_key(start_date, end_date, export_format)
+
+    with _lock:
+        job = _active.get(key)
+        if job:
+            job.subscribers.setdefault(user_id, (None, None))
+    if job:
+        notify(client, job, user_id, MESSAGES["JOINED"].format(start=start_date, end=end_date), logger)
+        return
+
+    previous = None
+    if not get_export_format(export_format).incremental:
+        previous = load_reusable_export_job(start_date, end_date, export_format, logger)
+    if previous and os.path.exists(previous["artifact_path"]):
+        _executor.submit(propagate(reuse_export), previous, user_id, client, logger)
+        return
+
+    # Held across the check and the insert, the unique active key dedups other processes
+    with _lock:
+        job = _active.get(key)
+        created = remote = False
+        if job:
+            job.subscribers.setdefault(user_id, (None, None))
+        else:
+            job_id, created = create_export_job(start_date, end_date, export_format, user_id, process_origin(), logger)
+            job = ExportJob(job_id, start_date, end_date, export_format, {user_id: (None, None)})
+            if created:
+                _active[key] = job
+            else:
+                remote = True
+    if remote:
+        # The process running the job notifies subscribers stored with it
+        add_export_job_subscriber(job.job_id, user_id, logger)
+    if not created:
+        notify(client, job, user_id, MESSAGES["JOINED"].format(start=start_date, end=end_date), logger)
+        return
+    start_heartbeat(logger)
+    notify(client, job, user_id, MESSAGES["QUEUED"].format(start=start_date, end=end_date), logger)
+    _executor.submit(propagate(run_export_job), job, client, logger)
+
+def run_heartbeat(logger: logging.Logger) -> None:
+    while not _stopped.wait(HEARTBEAT_INTERVAL):
+        try:
+            touch_export_jobs(process_origin(), logger)
+        except Exception as e:
+            logger.error(f"Error marking export jobs alive: {datetime.now()} - {e}")
+
+def start_heartbeat(logger: logging.Logger) -> None:
+    """Keep jobs of this process from being taken over, started with its first job."""
+    global _heartbeat
+    with _lock:
+        if _heartbeat and _heartbeat.is_alive():
+            return
+        _heartbeat = threading.Thread(target=run_heartbeat, args=(logger,), name="export-heartbeat", daemon=True)
+        _heartbeat.start()
+
+def resume_export_jobs(client: WebClient, logger: logging.Logger) -> None:
+    """
+    Take over jobs left queued or running by processes that stopped sending heartbeats.
+
+    Args:
+        client: Slack WebClient instance
+        logger: Logger instance
+    """
+    try:
+        stale_before = datetime.now() - STALE_AFTER
+        for row in load_stale_export_jobs(stale_before, logger):
+            if not take_over_export_job(row["id"], process_origin(), stale_before, logger):
+                continue
+            job = ExportJob(row["id"], str(row["start_date"]), str(row["end_date"]), row["export_format"],
+                            {row["requested_by"]: (None, None)})
+            with _lock:
+                _active[job_key(job.start_date, job.end_date, job.export_format)] = job
+            start_heartbeat(logger)
+            logger.info(f"Resuming export job {job.job_id}")
+            _executor.submit(propagate(run_export_job), job, client, logger)
+    except Exception as e:
+        logger.error(f"Error resuming export jobs: {datetime.now()} - {e}")
+
+def run_recovery(client: WebClient, logger: logging.Logger) -> None:
+    while True:
+        resume_export_jobs(client, logger)
+        if _stopped.wait(RECOVERY_INTERVAL):
+            return
+
+def start_export_recovery(client: WebClient, logger: logging.Logger) -> None:
+    """
+    Resume stale jobs now and every RECOVERY_INTERVAL, called by the leader process.
+
+    Jobs of a crashed worker are picked up within STALE_AFTER, also when the
+    leader itself keeps running.
+    """
+    global _recovery
+    if _recovery and _recovery.is_alive():
+        return
+    _recovery = threading.Thread(target=run_recovery, args=(client, logger), name="export-recovery", daemon=True)
+    _recovery.start()
+
+def shutdown_export_jobs(wait: bool = True) -> None:
+    """Stop accepting jobs and optionally wait for running ones."""
+    _executor.shutdown(wait=wait)
+    # After the running jobs, so they are not taken over while they finish
+    _stopped.set()
@@ -0,0 +1,197 @@
+"""
+Write-behind pipeline of the history (audit log) table.
+
+Participation changes put their history row into a bounded queue and return,
+a writer thread inserts queued rows with one multi-row INSERT every
+FLUSH_INTERVAL or FLUSH_ROWS rows. A batch that fails is inserted again row
+by row, dropping rows whose event or user was deleted meanwhile. Rows that
+cannot be inserted, or do not fit into the full queue, are appended to a
+local spill file and inserted again after the next successful flush. Each row keeps the time of the
+change, so late inserts do not reorder the history.
+"""
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import threading
+import logging
+import queue
+import fcntl
+import json
+import time
+import os
+from db import set_history_writer, insert_history_rows, insert_history_rows_skipping_orphans, DatabaseError
+from metrics import register_gauge
+
+# Constants
+FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_MS", "200")) / 1000
+FLUSH_ROWS = int(os.getenv("HISTORY_FLUSH_ROWS", "100"))
+MAX_QUEUE_SIZE = 10_000
+DEFAULT_SPILL_FILE = "history_spill.jsonl"
+STOP_TIMEOUT = 10.0
+
+_queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=MAX_QUEUE_SIZE)
+_stopping = threading.Event()
+_thread: Optional[threading.Thread] = None
+# Serializes flushes of the writer thread and flush_history callers
+_flush_lock = threading.Lock()
+
+register_gauge("history_queue_size", "History rows waiting to be inserted", lambda: _queue.qsize())
+
+def spill_path() -> str:
+    return os.getenv("HISTORY_SPILL_FILE", DEFAULT_SPILL_FILE)
+
+def encode_row(row: Dict[str, Any]) -> str:
+    return json.dumps({**row, "timestamp": row["timestamp"].isoformat()}, ensure_ascii=False)
+
+def decode_row(line: str) -> Dict[str, Any]:
+    row = json.loads(line)
+    row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return row
+
+def spill(rows: List[Dict[str, Any]], logger: logging.Logger) -> None:
+    """
+    Append rows to the spill file and sync it to disk.
+
+    The file is locked, so worker processes sharing it do not interleave lines.
+    """
+    with open(spill_path(), "a", encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.write("".join(encode_row(row) + "\n" for row in rows))
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+    logger.warning(f"Spilled {len(rows)} history rows to {spill_path()}")
+
+def insert_rows(rows: List[Dict[str, Any]], logger: logging.Logger) -> None:
+    """
+    Insert rows, row by row if the batch fails, so orphan rows do not block the others.
+
+    Raises:
+        DatabaseError: If the database is unavailable, no row is inserted
+    """
+    try:
+        insert_history_rows(rows, logger)
+    except DatabaseError:
+        skipped = insert_history_rows_skipping_orphans(rows, logger)
+        if skipped:
+            logger.warning(f"Dropped {skipped} history rows of deleted events or users")
+
+def replay_spill(logger: logging.Logger) -> int:
+    """
+    Insert rows of the spill file and remove them from it.
+
+    Rows of batches that fail stay in the file for the next attempt.
+
+    Returns:
+        int: Number of inserted rows
+    """
+    path = spill_path()
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return 0
+
+    inserted = 0
+    with open(path, "r+", encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            lines = [line for line in f.read().splitlines() if line.strip()]
+            try:
+                while inserted < len(lines):
+                    batch = lines[inserted:inserted + FLUSH_ROWS]
+                    insert_rows([decode_row(line) for line in batch], logger)
+                    inserted += len(batch)
+            except (DatabaseError, ValueError) as e:
+                logger.error(f"Error replaying history spill file: {datetime.now()} - {e}")
+            f.seek(0)
+            f.truncate()
+            f.write("".join(line + "\n" for line in lines[inserted:]))
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+    if inserted:
+        logger.info(f"Replayed {inserted} spilled history rows")
+    return inserted
+
+def enqueue(row: Dict[str, Any]) -> None:
+    """Queue history row, spill it directly when the queue is full."""
+    try:
+        _queue.put_nowait(row)
+    except queue.Full:
+        spill([row], logging.getLogger(__name__))
+
+def drain(limit: int) -> List[Dict[str, Any]]:
+    rows = []
+    while len(rows) < limit:
+        try:
+            rows.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return rows
+
+def write_rows(rows: List[Dict[str, Any]], logger: logging.Logger) -> None:
+    """Insert rows, spill them when the database is unavailable."""
+    try:
+        insert_rows(rows, logger)
+    except Exception as e:
+        logger.error(f"Error inserting history rows: {datetime.now()} - {e}")
+        spill(rows, logger)
+        return
+    try:
+        replay_spill(logger)
+    except Exception as e:
+        logger.error(f"Error replaying history spill file: {datetime.now()} - {e}")
+
+def flush_history(logger: logging.Logger) -> None:
+    """Insert all queued rows now, e.g. before reading the history or on shutdown."""
+    with _flush_lock:
+        while rows := drain(FLUSH_ROWS):
+            write_rows(rows, logger)
+
+def run_writer(logger: logging.Logger) -> None:
+    while not _stopping.is_set():
+        try:
+            first = _queue.get(timeout=FLUSH_INTERVAL)
+        except queue.Empty:
+            continue
+        # Collect more rows until the batch is full or the interval passes
+        rows = [first]
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while len(rows) < FLUSH_ROWS and (remaining := deadline - time.monotonic()) > 0:
+            try:
+                rows.append(_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            with _flush_lock:
+                write_rows(rows, logger)
+        except Exception as e:
+            logger.error(f"Error writing history rows: {datetime.now()} - {e}")
+
+def start_history_writer(logger: logging.Logger) -> None:
+    """
+    Start the writer thread and route history rows of this process to it.
+
+    Rows spilled before the last stop are inserted first.
+    """
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+    try:
+        replay_spill(logger)
+    except Exception as e:
+        logger.error(f"Error replaying history spill file: {datetime.now()} - {e}")
+    _stopping.clear()
+    _thread = threading.Thread(target=run_writer, args=(logger,), name="history-writer", daemon=True)
+    _thread.start()
+    set_history_writer(enqueue)
+
+def stop_history_writer(logger: logging.Logger) -> None:
+    """Insert queued rows and go back to direct inserts, called on shutdown."""
+    global _thread
+    set_history_writer(None)
+    _stopping.set()
+    if _thread:
+        _thread.join(STOP_TIMEOUT)
+        _thread = None
+    flush_history(logger)
@@ -0,0 +1,291 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+import threading
+import hashlib
+import hmac
+import logging
+import os
+import re
+from db import (
+    add_change_listener, load_event_from_db,
+    load_events_ending_after, load_user_feed_participations
+)
+from recurrence import load_occurrences, RECURRENCE_HORIZON
+import config
+
+# Constants
+FEED_PAST = timedelta(days=90)
+FEED_NAME = "Docházka"
+FEED_TEAM = "team"
+FEED_PATH_PATTERN = re.compile(r"^/calendar/([A-Za-z0-9]+)/([0-9a-f]{32})\.ics$")
+DEFAULT_FEED_HOST = "127.0.0.1"
+DEFAULT_FEED_PORT = 8080
+
+STATUS_ICONS = {
+    "Coming": "✅",
+    "Late": "⏱️",
+    "Not Coming": "❌"
+}
+
+class FeedCache:
+    """
+    Calendar feeds assembled from per-event VEVENT parts.
+
+    Event parts are rebuilt only for changed events, user statuses only
+    for users whose participation changed, whole feeds are joined lazily
+    on the next request. Everything is dropped when the day changes, the
+    feed window of past events and occurrences moves with it.
+    """
+
+    def __init__(self):
+        self._events: Optional[Dict[int, Dict[str, Any]]] = None
+        self._dirty_events: Set[int] = set()
+        self._statuses: Dict[str, Dict[int, Tuple[str, Optional[str]]]] = {}
+        self._feeds: Dict[str, Tuple[str, bytes]] = {}
+        self._day: Optional[date] = None
+        self._lock = threading.RLock()
+
+    def on_change(self, kind: str, event_id: Optional[int] = None, user_id: Optional[str] = None) -> None:
+        """Change listener registered in db.py."""
+        with self._lock:
+            if kind == "participation":
+                if user_id:
+                    self._statuses.pop(user_id, None)
+                    self._feeds.pop(user_id, None)
+                else:
+                    self._statuses.clear()
+                    self._feeds = {k: v for k, v in self._feeds.items() if k == FEED_TEAM}
+                return
+
+            # Reloaded on the next request, listeners run on the writer's thread
+            self._feeds.clear()
+            if kind == "event" and event_id is not None:
+                self._dirty_events.add(int(event_id))
+            else:
+                self._events = None
+                self._dirty_events.clear()
+
+    def _expire(self) -> None:
+        """Drop everything built on a previous day."""
+        today = date.today()
+        if self._day != today:
+            self._events = None
+            self._dirty_events.clear()
+            self._statuses.clear()
+            self._feeds.clear()
+            self._day = today
+
+    def _reload_event(self, event_id: int) -> None:
+        """Rebuild part of a single event, dropping it if it was deleted."""
+        event = load_event_from_db(event_id)
+        if event and event["end_time"] > datetime.now() - FEED_PAST:
+            self._events[event_id] = build_event_part(event)
+        else:
+            self._events.pop(event_id, None)
+
+    def _load_events(self) -> Dict[int, Dict[str, Any]]:
+        if self._events is None:
+            now = datetime.now()
+            events = load_events_ending_after(now - FEED_PAST)
+            occurrences = load_occurrences(now.date(), (now + RECURRENCE_HORIZON).date())
+            self._events = {event["id"]: build_event_part(event) for event in [*events, *occurrences]}
+            self._dirty_events.clear()
+        while self._dirty_events:
+            self._reload_event(self._dirty_events.pop())
+        return self._events
+
+    def _load_statuses(self, user_id: str) -> Dict[int, Tuple[str, Optional[str]]]:
+        if user_id not in self._statuses:
+            rows = load_user_feed_participations(user_id, datetime.now() - FEED_PAST)
+            self._statuses[user_id] = {row["event_id"]: (row["status"], row["note"]) for row in rows}
+        return self._statuses[user_id]
+
+    def get_feed(self, user_id: str) -> Tuple[str, bytes]:
+        """
+        Get ETag and body of the feed, FEED_TEAM for the feed without statuses.
+
+        Args:
+            user_id: Slack user ID or FEED_TEAM
+
+        Returns:
+            Tuple[str, bytes]: ETag and iCalendar body
+        """
+        with self._lock:
+            self._expire()
+            if user_id in self._feeds:
+                return self._feeds[user_id]
+            parts = sorted(self._load_events().values(), key=lambda part: part["start_time"])
+            statuses = {} if user_id == FEED_TEAM else self._load_statuses(user_id)
+            body = render_calendar(parts, statuses).encode("utf-8")
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            self._feeds[user_id] = (etag, body)
+            return etag, body
+
+_cache = FeedCache()
+add_change_listener(_cache.on_change)
+_server: Optional[ThreadingHTTPServer] = None
+
+def escape_text(value: Optional[str]) -> str:
+    """Escape text value according to RFC 5545."""
+    if not value:
+        return ""
+    return (value.replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def fold_line(line: str) -> str:
+    """Fold line to 75 octets, continuation lines start with a space."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    lines, current = [], ""
+    for char in line:
+        limit = 75 if not lines else 74
+        if len((current + char).encode("utf-8")) > limit:
+            lines.append(current)
+            current = char
+        else:
+            current += char
+    lines.append(current)
+    return "\r\n ".join(lines)
+
+def format_time(value: datetime) -> str:
+    """Format floating local time, times in the database are local."""
+    return value.strftime("%Y%m%dT%H%M%S")
+
+def build_event_part(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Build status independent part of VEVENT of the event."""
+    if event.get("series_id") is not None and event.get("occurrence_index") is not None:
+        uid = f"series-{event['series_id']}-{event['occurrence_index']}@slack-attendance"
+    else:
+        uid = f"event-{event['id']}@slack-attendance"
+    return {
+        "id": event["id"],
+        "start_time": event["start_time"],
+        "training": event["type"] == "Trénink",
+        "summary": event["name"],
+        "lines": [
+            f"UID:{uid}",
+            f"DTSTAMP:{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}",
+            f"DTSTART:{format_time(event['start_time'])}",
+            f"DTEND:{format_time(event['end_time'])}",
+            f"LOCATION:{escape_text(event.get('address'))}",
+            f"CATEGORIES:{escape_text(event['type'])}"
+        ]
+    }
+
+def status_label(status: str, training: bool) -> str:
+    """Translate stored status to its configured label."""
+    labels = {
+        "Coming": config.coming_training if training else config.coming_text,
+        "Late": config.late_training if training else config.late_text,
+        "Not Coming": config.notcoming_training if training else config.notcoming_text
+    }
+    return labels.get(status, status)
+
+def render_event(part: Dict[str, Any], status: Optional[Tuple[str, Optional[str]]]) -> List[str]:
+    """Render VEVENT lines, with the user's status if any."""
+    summary = part["summary"]
+    description = ""
+    if status:
+        summary = f"{STATUS_ICONS.get(status[0], '')} {summary}".strip()
+        description = status_label(status[0], part["training"])
+        if status[1]:
+            description += f"\n{status[1]}"
+    lines = ["BEGIN:VEVENT", *part["lines"], f"SUMMARY:{escape_text(summary)}"]
+    if description:
+        lines.append(f"DESCRIPTION:{escape_text(description)}")
+    lines.append("END:VEVENT")
+    return lines
+
+def render_calendar(parts: List[Dict[str, Any]], statuses: Dict[int, Tuple[str, Optional[str]]]) -> str:
+    """Render whole VCALENDAR."""
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//slack-attendance//CS",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{FEED_NAME}",
+        "X-WR-TIMEZONE:Europe/Prague"
+    ]
+    for part in parts:
+        lines.extend(render_event(part, statuses.get(part["id"])))
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(fold_line(line) for line in lines) + "\r\n"
+
+def feed_token(user_id: str) -> Optional[str]:
+    """Build secret part of the feed URL, None if feeds are not configured."""
+    secret = os.getenv("ICAL_SECRET")
+    if not secret:
+        return None
+    return hmac.new(secret.encode(), user_id.encode(), hashlib.sha256).hexdigest()[:32]
+
+def feed_url(user_id: str) -> Optional[str]:
+    """Build URL of the user's feed, None if feeds are not configured."""
+    base_url = os.getenv("ICAL_BASE_URL")
+    token = feed_token(user_id)
+    if not base_url or not token:
+        return None
+    return f"{base_url.rstrip('/')}/calendar/{user_id}/{token}.ics"
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """Serve feeds at /calendar/<user_id|team>/<token>.ics."""
+
+    def do_GET(self) -> None:
+        match = FEED_PATH_PATTERN.match(self.path.split("?", 1)[0])
+        token = feed_token(match.group(1)) if match else None
+        if not token or not hmac.compare_digest(token, match.group(2)):
+            self.send_error(404)
+            return
+
+        try:
+            etag, body = _cache.get_feed(match.group(1))
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Error building calendar feed: {datetime.now()} - {e}")
+            self.send_error(503)
+            return
+
+        if etag in (tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/calendar; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.getLogger(__name__).debug(format % args)
+
+def start_feed_server(logger: logging.Logger) -> None:
+    """
+    Start HTTP server of calendar feeds in a daemon thread.
+
+    Does nothing unless ICAL_SECRET is set.
+
+    Args:
+        logger: Logger instance
+    """
+    global _server
+    if _server or not os.getenv("ICAL_SECRET"):
+        return
+    host = os.getenv("ICAL_HOST", DEFAULT_FEED_HOST)
+    port = int(os.getenv("ICAL_PORT", DEFAULT_FEED_PORT))
+    try:
+        _server = ThreadingHTTPServer((host, port), FeedHandler)
+    except OSError as e:
+        logger.error(f"Error starting calendar feed server: {datetime.now()} - {e}")
+        return
+    threading.Thread(target=_server.serve_forever, name="ical", daemon=True).start()
+    logger.info(f"Calendar feeds served on {host}:{port}")
+
+def stop_feed_server() -> None:
+    """Stop HTTP server of calendar feeds."""
+    global _server
+    if _server:
+        _server.shutdown()
+        _server = None
@@ -0,0 +1,386 @@
+"""
+Load test of the Bolt listeners against a local Slack stand-in and a local MySQL.
+
+Synthetic payloads are dispatched straight into bot.app, Slack Web API calls
+go to an in-process fake server and queries go to the database configured
+in config.ini, so point it at a local copy loaded from db.sql first.
+
+With --http the payloads are signed and posted to a running web.py server
+instead, started with SLACK_API_URL=http://127.0.0.1:<--fake-slack-port>/api/
+and the same SLACK_SIGNING_SECRET. Latency is then measured per scenario up
+to the acknowledgement.
+
+Usage:
+    python loadtest.py --stages 5,20,50 --stage-seconds 30 --seed-users 150 --seed-events 40
+    python loadtest.py --compare loadtest_results/<previous>.json
+    python loadtest.py --http http://127.0.0.1:3000/slack/events --fake-slack-port 8090
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+import urllib.request
+import urllib.error
+import subprocess
+import threading
+import argparse
+import hashlib
+import random
+import hmac
+import json
+import time
+import os
+
+# Constants
+RESULTS_DIR = "loadtest_results"
+FAKE_TEAM_ID = "TLOADTEST"
+FAKE_BOT_TOKEN = "xoxb-loadtest"
+LOADTEST_USER_PREFIX = "ULOAD"
+ADMIN_SHARE = 0.1
+PERCENTILES = (50, 95, 99)
+
+SCENARIO_WEIGHTS = {
+    "app_home_opened": 3,
+    "coming": 4,
+    "late": 1,
+    "not_coming": 2,
+    "mass_input": 1,
+    "next_attendance_page": 2,
+    "previous_attendance_page": 1,
+    "filter_events": 1
+}
+
+class FakeSlack:
+    """Minimal Slack Web API answering every method with a plausible success."""
+
+    def __init__(self, admins: List[str], latency: float):
+        self.admins = admins
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    def respond(self, method: str) -> Dict[str, Any]:
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        responses = {
+            "auth.test": {"user_id": "UBOT", "bot_id": "BBOT", "team_id": FAKE_TEAM_ID, "url": "https://loadtest.slack.com/"},
+            "users.info": {"user": {"id": "U", "name": "loadtest", "profile": {"real_name": "Load Test", "display_name": ""}}},
+            "usergroups.users.list": {"users": self.admins},
+            "chat.postMessage": {"channel": "DLOADTEST", "ts": f"{time.time():.6f}"},
+            "conversations.list": {"channels": [], "response_metadata": {"next_cursor": ""}},
+            "usergroups.list": {"usergroups": []}
+        }
+        body = responses.get(method, {})
+        if method.startswith("views."):
+            body = {"view": {"id": "VLOADTEST", "hash": "h"}}
+        return {"ok": True, **body}
+
+    def start(self, port: int = 0) -> str:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                body = json.dumps(fake.respond(self.path.rsplit("/", 1)[-1])).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}/api/"
+
+    def stop(self) -> None:
+        if self.server:
+            self.server.shutdown()
+
+class Recorder:
+    """Collect listener durations reported by metrics.listener_observers."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, kind: str, listener: str, seconds: float, failed: bool) -> None:
+        with self.lock:
+            self.samples.setdefault(listener, []).append(seconds)
+            if failed:
+                self.errors[listener] = self.errors.get(listener, 0) + 1
+
+    def drain(self) -> Tuple[Dict[str, List[float]], Dict[str, int]]:
+        with self.lock:
+            samples, errors = self.samples, self.errors
+            self.samples, self.errors = {}, {}
+        return samples, errors
+
+def percentile(ordered: List[float], p: int) -> float:
+    """Get percentile of sorted samples by nearest rank."""
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+def summarize(samples: Dict[str, List[float]], errors: Dict[str, int], seconds: float) -> Dict[str, Dict[str, float]]:
+    """Build per listener throughput, error count and latency percentiles in ms."""
+    summary = {}
+    for listener, values in sorted(samples.items()):
+        ordered = sorted(values)
+        summary[listener] = {
+            "count": len(ordered),
+            "errors": errors.get(listener, 0),
+            "rps": len(ordered) / seconds,
+            **{f"p{p}_ms": percentile(ordered, p) * 1000 for p in PERCENTILES}
+        }
+    return summary
+
+def action_payload(user_id: str, action_id: str, value: str, view_values: Optional[Dict] = None) -> Dict[str, Any]:
+    return {
+        "type": "block_actions",
+        "team": {"id": FAKE_TEAM_ID},
+        "user": {"id": user_id},
+        "api_app_id": "ALOADTEST",
+        "trigger_id": "loadtest.trigger",
+        "actions": [{"type": "button", "action_id": action_id, "block_id": "loadtest", "value": value}],
+        "view": {"id": "VLOADTEST", "type": "home", "state": {"values": view_values or {}}}
+    }
+
+def view_payload(user_id: str, callback_id: str, values: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "view_submission",
+        "team": {"id": FAKE_TEAM_ID},
+        "user": {"id": user_id},
+        "api_app_id": "ALOADTEST",
+        "view": {"id": "VLOADTEST", "type": "modal", "callback_id": callback_id, "state": {"values": values}}
+    }
+
+def build_payload(scenario: str, user_id: str, event_ids: List[int]) -> Dict[str, Any]:
+    """Build synthetic body of the scenario as Slack would send it over Socket Mode."""
+    if scenario == "app_home_opened":
+        return {
+            "type": "event_callback",
+            "team_id": FAKE_TEAM_ID,
+            "api_app_id": "ALOADTEST",
+            "event_id": f"Ev{random.getrandbits(48):x}",
+            "event_time": int(time.time()),
+            "event": {"type": "app_home_opened", "user": user_id, "tab": "home", "channel": "DLOADTEST"}
+        }
+    if scenario in ("coming", "late", "not_coming"):
+        event_id = random.choice(event_ids)
+        prefix = {"coming": "coming", "late": "late", "not_coming": "notcoming"}[scenario]
+        reason = {f"reason_{event_id}": {f"reason_input_{event_id}": {"type": "plain_text_input", "value": None}}}
+        return action_payload(user_id, scenario, f"{prefix}_{event_id}_0_all", reason)
+    if scenario == "mass_input":
+        return view_payload(user_id, "mass_input", {
+            "attendance_selection_block": {"attendance_selection": {
+                "type": "radio_buttons", "selected_option": {"value": random.choice(["Coming", "Late", "Not Coming"])}
+            }},
+            "reason": {"reason_input": {"type": "plain_text_input", "value": None}}
+        })
+    if scenario == "next_attendance_page":
+        return action_payload(user_id, scenario, f"{random.randint(1, 3)}_all")
+    if scenario == "previous_attendance_page":
+        return action_payload(user_id, scenario, f"{random.randint(0, 2)}_all")
+    if scenario == "filter_events":
+        return view_payload(user_id, "filter_events", {
+            "filter_selection_block": {"filter_selection": {
+                "type": "radio_buttons",
+                "selected_option": {"value": random.choice(["all", "training", "tournament", "other"])}
+            }}
+        })
+    raise ValueError(f"Unknown scenario {scenario}")
+
+def seed_data(users: int, events: int) -> None:
+    """Insert synthetic users and upcoming events, reruns reuse existing users."""
+    from db import check_user, update_user_category, bulk_insert_events
+
+    for i in range(users):
+        user_id = f"{LOADTEST_USER_PREFIX}{i:05d}"
+        check_user(user_id, f"Load Test {i:05d}")
+        update_user_category(user_id, "Open" if i % 3 else "Women")
+
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=2)
+    types = ["Trénink", "Trénink", "Trénink", "Turnaj", "Ostatní"]
+    bulk_insert_events([
+        {
+            "name": f"Load test {i}",
+            "start_time": start + timedelta(days=i // 2, hours=(i % 2) * 3),
+            "end_time": start + timedelta(days=i // 2, hours=(i % 2) * 3 + 2),
+            "lock_time": start + timedelta(days=i // 2) - timedelta(hours=1),
+            "type": types[i % len(types)],
+            "address": "Hala"
+        }
+        for i in range(events)
+    ])
+
+def sign_request(secret: str, timestamp: str, body: bytes) -> str:
+    """Build X-Slack-Signature of the body as Slack does."""
+    base = b"v0:" + timestamp.encode() + b":" + body
+    return "v0=" + hmac.new(secret.encode(), base, hashlib.sha256).hexdigest()
+
+def post_signed(url: str, secret: str, payload: Dict[str, Any]) -> None:
+    """
+    Post payload the way Slack does, events as JSON, interactions as form field.
+
+    Raises:
+        urllib.error.URLError: If the request fails or is not acknowledged
+    """
+    if payload["type"] == "event_callback":
+        body = json.dumps(payload).encode()
+        content_type = "application/json"
+    else:
+        body = urlencode({"payload": json.dumps(payload)}).encode()
+        content_type = "application/x-www-form-urlencoded"
+    timestamp = str(int(time.time()))
+    request = urllib.request.Request(url, data=body, method="POST", headers={
+        "Content-Type": content_type,
+        "X-Slack-Request-Timestamp": timestamp,
+        "X-Slack-Signature": sign_request(secret, timestamp, body)
+    })
+    with urllib.request.urlopen(request, timeout=10) as response:
+        response.read()
+
+def run_virtual_user(dispatch: Callable[[str, Dict[str, Any]], None], user_id: str, event_ids: List[int],
+                     stop: threading.Event, think_time: float) -> None:
+    """Send random interactions of one member until the stage ends."""
+    scenarios = list(SCENARIO_WEIGHTS)
+    weights = list(SCENARIO_WEIGHTS.values())
+    while not stop.is_set():
+        scenario = random.choices(scenarios, weights)[0]
+        dispatch(scenario, build_payload(scenario, user_id, event_ids))
+        stop.wait(random.expovariate(1 / think_time) if think_time else 0)
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return "unknown"
+
+def compare(current: Dict[str, Any], previous_path: str, threshold: float) -> int:
+    """Print p95 change per listener of the last stage, return number of regressions."""
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    old = previous["stages"][-1]["listeners"]
+    new = current["stages"][-1]["listeners"]
+    regressions = 0
+    print(f"\nCompared with {previous['revision']} ({previous_path}), last stage p95:")
+    for listener, stats in new.items():
+        if listener not in old or not old[listener]["p95_ms"]:
+            continue
+        change = stats["p95_ms"] / old[listener]["p95_ms"] - 1
+        flag = "REGRESSION" if change > threshold else ""
+        regressions += bool(flag)
+        print(f"  {listener:<40} {old[listener]['p95_ms']:>9.1f} -> {stats['p95_ms']:>9.1f} ms ({change:+.0%}) {flag}")
+    return regressions
+
+def print_stage(stage: Dict[str, Any]) -> None:
+    print(f"\n{stage['users']} concurrent users, {stage['seconds']:.0f} s")
+    print(f"  {'listener':<40} {'count':>7} {'err':>5} {'rps':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for listener, s in stage["listeners"].items():
+        print(f"  {listener:<40} {s['count']:>7} {s['errors']:>5} {s['rps']:>7.1f} "
+              f"{s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f}")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default="5,20,50", help="Concurrent users per ramp stage")
+    parser.add_argument("--stage-seconds", type=float, default=30)
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause between interactions of one user")
+    parser.add_argument("--slack-latency-ms", type=float, default=30, help="Latency of the fake Slack API")
+    parser.add_argument("--seed-users", type=int, default=0)
+    parser.add_argument("--seed-events", type=int, default=0)
+    parser.add_argument("--compare", help="Previous result file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative p95 increase counted as regression")
+    parser.add_argument("--http", help="Post signed payloads to this web.py URL instead of dispatching in-process")
+    parser.add_argument("--signing-secret", default=os.getenv("SLACK_SIGNING_SECRET"))
+    parser.add_argument("--fake-slack-port", type=int, default=0, help="Port of the fake Slack API, set it with --http")
+    args = parser.parse_args()
+    if args.http and not args.signing_secret:
+        parser.error("--http needs --signing-secret or SLACK_SIGNING_SECRET")
+
+    fake = None
+    os.environ["SLACK_BOT_TOKEN"] = FAKE_BOT_TOKEN
+    if args.http or not os.environ.get("SLACK_API_URL"):
+        # Admin list is filled once users are known, the server reads it per request
+        fake = FakeSlack([], args.slack_latency_ms / 1000)
+        os.environ["SLACK_API_URL"] = fake.start(args.fake_slack_port)
+
+    from db import load_users_from_db, load_events_from_db
+    import metrics
+    import config
+
+    config.load_settings()
+    if args.seed_users or args.seed_events:
+        seed_data(args.seed_users, args.seed_events)
+
+    user_ids = [user["user_id"] for user in load_users_from_db()]
+    event_ids = [event["id"] for event in load_events_from_db()]
+    if not user_ids or not event_ids:
+        print("No users or events in the database, run with --seed-users/--seed-events")
+        return 1
+    if fake:
+        fake.admins.extend(user_ids[:max(1, int(len(user_ids) * ADMIN_SHARE))])
+
+    recorder = Recorder()
+    if args.http:
+        def dispatch(scenario: str, body: Dict[str, Any]) -> None:
+            start = time.perf_counter()
+            failed = False
+            try:
+                post_signed(args.http, args.signing_secret, body)
+            except (urllib.error.URLError, OSError):
+                failed = True
+            recorder("http", scenario, time.perf_counter() - start, failed)
+    else:
+        from slack_bolt.request import BoltRequest
+        import bot
+        metrics.listener_observers.append(recorder)
+
+        def dispatch(scenario: str, body: Dict[str, Any]) -> None:
+            bot.app.dispatch(BoltRequest(body=body, mode="socket_mode"))
+
+    result = {"revision": git_revision(), "started": datetime.now().isoformat(), "stages": []}
+    for users in (int(value) for value in args.stages.split(",")):
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=run_virtual_user,
+                             args=(dispatch, user_ids[i % len(user_ids)], event_ids, stop, args.think_time),
+                             daemon=True)
+            for i in range(users)
+        ]
+        recorder.drain()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.stage_seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        # Let listeners still running on Bolt's executor report back
+        time.sleep(1)
+        seconds = time.perf_counter() - started
+        samples, errors = recorder.drain()
+        stage = {"users": users, "seconds": seconds, "listeners": summarize(samples, errors, seconds)}
+        result["stages"].append(stage)
+        print_stage(stage)
+
+    if fake:
+        result["slack_calls"] = fake.calls
+        fake.stop()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{result['revision']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\nResults stored in {path}")
+
+    if args.compare:
+        return 1 if compare(result, args.compare, args.threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
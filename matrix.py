@@ -0,0 +1,127 @@
+from typing import Any, Dict, Iterable, List
+from dataclasses import dataclass
+import locale
+import csv
+import numpy as np
+import config
+
+# Status codes stored in the matrix, 0 means no answer
+STATUS_CODES = {
+    "Coming": 1,
+    "Late": 2,
+    "Not Coming": 3
+}
+
+SUMMARY_COLUMNS = ["Přijde", "Později", "Nepřijde", "Nevyplněno", "Účast %"]
+
+class MatrixError(Exception):
+    """Base exception for attendance matrix related errors"""
+    pass
+
+@dataclass
+class AttendanceMatrix:
+    users: List[str]
+    categories: List[str]
+    events: List[str]
+    statuses: np.ndarray  # users × events of status labels
+    counts: np.ndarray  # users × 4 of (coming, late, not coming, no answer)
+    rates: np.ndarray  # users of attendance rate in percent
+
+def status_labels(training: bool) -> np.ndarray:
+    """Get status labels indexed by status code."""
+    if training:
+        return np.array(["", config.coming_training, config.late_training, config.notcoming_training], dtype=object)
+    return np.array(["", config.coming_text, config.late_text, config.notcoming_text], dtype=object)
+
+def build_attendance_matrix(rows: Iterable[Dict[str, Any]]) -> AttendanceMatrix:
+    """
+    Build dense user × event matrix of statuses from range query rows.
+
+    Args:
+        rows: Rows of load_participants_in_range ordered by event start
+
+    Returns:
+        AttendanceMatrix: Matrix with per-user counts and attendance rates
+    """
+    rows = list(rows)
+    if not rows:
+        return AttendanceMatrix([], [], [], np.empty((0, 0), dtype=object),
+                                np.zeros((0, 4), dtype=np.int64), np.zeros(0))
+
+    user_ids = np.array([row["user_id"] for row in rows], dtype=object)
+    event_ids = np.array([row["event_id"] for row in rows], dtype=np.int64)
+    codes = np.array([STATUS_CODES.get(row["status"], 0) for row in rows], dtype=np.int8)
+
+    # Events keep order of their first appearance, i.e. by start time
+    unique_events, first_event, event_index = np.unique(event_ids, return_index=True, return_inverse=True)
+    event_order = np.argsort(first_event)
+    event_rank = np.empty_like(event_order)
+    event_rank[event_order] = np.arange(len(event_order))
+    columns = event_rank[event_index]
+
+    unique_users, first_user, user_index = np.unique(user_ids, return_index=True, return_inverse=True)
+    user_order = np.array(
+        sorted(range(len(unique_users)), key=lambda i: locale.strxfrm(rows[first_user[i]]["name"])),
+        dtype=np.int64
+    )
+    user_rank = np.empty_like(user_order)
+    user_rank[user_order] = np.arange(len(user_order))
+    lines = user_rank[user_index]
+
+    matrix = np.zeros((len(unique_users), len(unique_events)), dtype=np.int8)
+    matrix[lines, columns] = codes
+
+    event_rows = [rows[first_event[i]] for i in event_order]
+    training = np.array([row.get("type") == "Trénink" for row in event_rows], dtype=bool)
+    statuses = np.where(training[None, :], status_labels(True)[matrix], status_labels(False)[matrix])
+
+    counts = np.stack([(matrix == code).sum(axis=1) for code in (1, 2, 3, 0)], axis=1)
+    rates = np.round((counts[:, 0] + counts[:, 1]) * 100.0 / matrix.shape[1], 1)
+
+    user_rows = [rows[first_user[i]] for i in user_order]
+    return AttendanceMatrix(
+        users=[row["name"] for row in user_rows],
+        categories=[row.get("category") or "" for row in user_rows],
+        events=[f"{row['start_time'].strftime('%d.%m.%Y %H:%M')} {row['event_name']}" for row in event_rows],
+        statuses=statuses,
+        counts=counts,
+        rates=rates
+    )
+
+def matrix_header(matrix: AttendanceMatrix) -> List[str]:
+    """Build header row of the matrix."""
+    return ["Jméno", "Kategorie", *matrix.events, *SUMMARY_COLUMNS]
+
+def matrix_rows(matrix: AttendanceMatrix) -> Iterable[List[Any]]:
+    """Yield rows of the matrix including summary columns."""
+    for i, name in enumerate(matrix.users):
+        yield [name, matrix.categories[i], *matrix.statuses[i].tolist(),
+               *matrix.counts[i].tolist(), float(matrix.rates[i])]
+
+def write_matrix_csv(rows: Iterable[Dict[str, Any]], path: str) -> None:
+    """Write attendance matrix as CSV file."""
+    matrix = build_attendance_matrix(rows)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(matrix_header(matrix))
+        writer.writerows(matrix_rows(matrix))
+
+def write_matrix_xlsx(rows: Iterable[Dict[str, Any]], path: str) -> None:
+    """
+    Write attendance matrix as XLSX file.
+
+    Raises:
+        MatrixError: If openpyxl is not installed
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise MatrixError("XLSX export requires the openpyxl package")
+
+    matrix = build_attendance_matrix(rows)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Docházka")
+    sheet.append(matrix_header(matrix))
+    for row in matrix_rows(matrix):
+        sheet.append(row)
+    workbook.save(path)
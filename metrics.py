@@ -0,0 +1,258 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from bisect import bisect_left
+import functools
+import threading
+import logging
+import time
+import os
+import re
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from tracing import start_span, end_span, SPAN_KIND_SERVER, SPAN_KIND_CLIENT
+
+# Constants
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_METRICS_HOST = "127.0.0.1"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """Cumulative histogram of durations in seconds, one series per label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # label set -> [count per bucket..., count above last bucket, sum]
+        self._series: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(key, le=str(bound))} {int(cumulative)}")
+            total = int(cumulative + series[-2])
+            lines.append(f"{self.name}_bucket{format_labels(key, le='+Inf')} {total}")
+            lines.append(f"{self.name}_sum{format_labels(key)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{format_labels(key)} {total}")
+        return lines
+
+class Counter:
+    """Monotonic counter, one series per label set."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._series: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._series.items())
+        lines.extend(f"{self.name}{format_labels(key)} {value:g}" for key, value in items)
+        return lines
+
+class Gauge:
+    """Value read from a callback at scrape time."""
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], float]):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        try:
+            lines.append(f"{self.name} {float(self.callback()):g}")
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Error reading gauge {self.name}: {datetime.now()} - {e}")
+        return lines
+
+def escape_label(value: Any) -> str:
+    """Escape label value in Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(key: Labels, **extra: str) -> str:
+    """Format label set in Prometheus text format."""
+    pairs = [*key, *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+
+LISTENER_SECONDS = Histogram("slack_listener_seconds", "Duration of Bolt listeners by action_id or callback_id")
+LISTENER_ERRORS = Counter("slack_listener_errors_total", "Exceptions raised by Bolt listeners")
+DB_QUERY_SECONDS = Histogram("db_query_seconds", "Duration of database queries by db.py function")
+DB_ERRORS = Counter("db_errors_total", "Failed database queries by db.py function")
+SLACK_API_SECONDS = Histogram("slack_api_seconds", "Duration of Slack Web API calls by method")
+SLACK_API_ERRORS = Counter("slack_api_errors_total", "Failed Slack Web API calls by method and error")
+LOG_ERRORS = Counter("log_errors_total", "Records logged at ERROR level by logger")
+
+# Called as observer(kind, listener, seconds, failed) after every listener, used by loadtest.py
+listener_observers: List[Callable[[str, str, float, bool], None]] = []
+
+_metrics: List[Any] = [LISTENER_SECONDS, LISTENER_ERRORS, DB_QUERY_SECONDS, DB_ERRORS,
+                       SLACK_API_SECONDS, SLACK_API_ERRORS, LOG_ERRORS]
+_server: Optional[ThreadingHTTPServer] = None
+
+def register_gauge(name: str, help_text: str, callback: Callable[[], float]) -> None:
+    """Register gauge of a pool or queue, read at scrape time."""
+    _metrics.append(Gauge(name, help_text, callback))
+
+def render_metrics() -> str:
+    """Render all metrics in Prometheus text format."""
+    return "\n".join(line for metric in _metrics for line in metric.render()) + "\n"
+
+def listener_name(constraint: Any) -> str:
+    """Build bounded label from a listener constraint (string, pattern or dict)."""
+    if isinstance(constraint, re.Pattern):
+        return constraint.pattern
+    if isinstance(constraint, dict):
+        return ",".join(f"{key}={listener_name(value)}" for key, value in sorted(constraint.items()))
+    return str(constraint)
+
+def timed_listener(kind: str, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap listener keeping its signature, Bolt injects arguments by name."""
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        span, token = start_span(f"{kind} {name}", SPAN_KIND_SERVER, listener=name)
+        error = None
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            error = e
+            LISTENER_ERRORS.inc(kind=kind, listener=name)
+            raise
+        finally:
+            end_span(span, token, error)
+            elapsed = time.perf_counter() - start
+            LISTENER_SECONDS.observe(elapsed, kind=kind, listener=name)
+            for observer in listener_observers:
+                observer(kind, name, elapsed, error is not None)
+    return wrapper
+
+def instrument_app(app: Any) -> None:
+    """
+    Time every listener registered on the app afterwards.
+
+    Must be called before the @app.action/@app.view/... decorators run.
+
+    Args:
+        app: Bolt App instance
+    """
+    for kind in ("action", "view", "options", "event", "command", "shortcut"):
+        register = getattr(app, kind)
+
+        def instrumented(constraint: Any, *args: Any, _kind: str = kind, _register: Callable = register, **kwargs: Any):
+            decorator = _register(constraint, *args, **kwargs)
+            name = listener_name(constraint)
+
+            def wrap(func: Callable[..., Any]) -> Callable[..., Any]:
+                decorator(timed_listener(_kind, name, func))
+                return func
+            return wrap
+
+        setattr(app, kind, instrumented)
+
+class ErrorCountingHandler(logging.Handler):
+    """Count errors that handlers log and swallow instead of raising."""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        LOG_ERRORS.inc(logger=record.name)
+
+class InstrumentedWebClient(WebClient):
+    """WebClient recording duration and errors of every API method."""
+
+    def api_call(self, api_method: str, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        span, token = start_span(f"slack {api_method}", SPAN_KIND_CLIENT, **{"slack.method": api_method})
+        error = None
+        try:
+            return super().api_call(api_method, *args, **kwargs)
+        except SlackApiError as e:
+            error = e
+            SLACK_API_ERRORS.inc(method=api_method, error=str(e.response.get("error", "unknown")))
+            raise
+        except Exception as e:
+            error = e
+            SLACK_API_ERRORS.inc(method=api_method, error="exception")
+            raise
+        finally:
+            end_span(span, token, error)
+            SLACK_API_SECONDS.observe(time.perf_counter() - start, method=api_method)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serve metrics at /metrics."""
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.getLogger(__name__).debug(format % args)
+
+def start_metrics_server(logger: logging.Logger, port_offset: int = 0, attempts: int = 1) -> None:
+    """
+    Start HTTP server of metrics in a daemon thread.
+
+    Does nothing unless METRICS_PORT is set.
+
+    Args:
+        logger: Logger instance
+        port_offset: Added to METRICS_PORT, worker processes serve on consecutive ports
+        attempts: Number of consecutive ports tried, for workers without a known index
+    """
+    global _server
+    if _server or not os.getenv("METRICS_PORT"):
+        return
+    logging.getLogger().addHandler(ErrorCountingHandler())
+    host = os.getenv("METRICS_HOST", DEFAULT_METRICS_HOST)
+    for attempt in range(attempts):
+        port = int(os.getenv("METRICS_PORT")) + port_offset + attempt
+        try:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            break
+        except OSError as e:
+            if attempt == attempts - 1:
+                logger.error(f"Error starting metrics server: {datetime.now()} - {e}")
+                return
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"Metrics served on {host}:{port}/metrics")
+
+def stop_metrics_server() -> None:
+    """Stop HTTP server of metrics."""
+    global _server
+    if _server:
+        _server.shutdown()
+        _server = None
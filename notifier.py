@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from db import load_users_not_in_event, load_users_by_category, save_reminder_deliveries
+from ratelimit import RateLimiter
+from tracing import propagate
+
+# Constants
+NOTIFY_WORKERS = 4
+# chat.postMessage is limited per channel, every digest goes to a different DM
+# so the workspace-wide budget is what matters
+POST_MESSAGE_RATE = 5.0
+POST_MESSAGE_BURST = 10
+MAX_ATTEMPTS = 3
+ACTIVE_CATEGORIES = ("Open", "Women")
+
+MESSAGES = {
+    "HEADER": "⏰ Ještě nemáš vyplněnou docházku:",
+    "EVENT": "• *{name}* ({start}), uzávěrka {lock}"
+}
+
+@dataclass
+class Delivery:
+    user_id: str
+    event_ids: List[int]
+    status: str
+    attempts: int
+    error: Optional[str] = None
+
+_limiter = RateLimiter(POST_MESSAGE_RATE, POST_MESSAGE_BURST)
+
+def build_digests(events: Iterable[Dict[str, Any]], logger: logging.Logger) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Group events by active members who have not answered them yet.
+
+    Args:
+        events: Events or occurrences to remind
+        logger: Logger instance
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: User ID -> events ordered by start time
+    """
+    active = {
+        user_id
+        for category in ACTIVE_CATEGORIES
+        for user_id in load_users_by_category(category, logger)
+    }
+    digests: Dict[str, List[Dict[str, Any]]] = {}
+    for event in sorted(events, key=lambda e: e["start_time"]):
+        for user in load_users_not_in_event(event["id"], logger):
+            if user["user_id"] in active:
+                digests.setdefault(user["user_id"], []).append(event)
+    return digests
+
+def build_digest_text(events: List[Dict[str, Any]]) -> str:
+    """Build one message listing all events the user has not answered."""
+    lines = [MESSAGES["HEADER"]]
+    for event in events:
+        lines.append(MESSAGES["EVENT"].format(
+            name=event["name"],
+            start=event["start_time"].strftime('%d.%m.%Y %H:%M'),
+            lock=event["lock_time"].strftime('%d.%m.%Y %H:%M')
+        ))
+    return "\n".join(lines)
+
+def send_digest(client: WebClient, user_id: str, events: List[Dict[str, Any]], logger: logging.Logger) -> Delivery:
+    """
+    Send digest to the user, retrying after Slack rate limit responses.
+
+    Args:
+        client: Slack WebClient instance
+        user_id: Slack user ID
+        events: Events the user has not answered
+        logger: Logger instance
+
+    Returns:
+        Delivery: Result of the delivery
+    """
+    event_ids = [event["id"] for event in events]
+    text = build_digest_text(events)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        _limiter.acquire()
+        try:
+            client.chat_postMessage(channel=user_id, text=text)
+            return Delivery(user_id, event_ids, "sent", attempt)
+        except SlackApiError as e:
+            if e.response.status_code == 429 and attempt < MAX_ATTEMPTS:
+                # Header names are case-insensitive, the SDK keeps them as the server sent them
+                headers = {name.lower(): value for name, value in e.response.headers.items()}
+                retry_after = int(headers.get("retry-after", 1))
+                # Next acquire() waits out the pause for every worker
+                _limiter.pause(retry_after)
+                continue
+            logger.error(f"Slack API error sending reminder digest: {datetime.now()} - {e}")
+            return Delivery(user_id, event_ids, "failed", attempt, str(e)[:255])
+    return Delivery(user_id, event_ids, "failed", MAX_ATTEMPTS, "Rate limited")
+
+def send_reminder_digests(client: WebClient, events: List[Dict[str, Any]], logger: logging.Logger) -> List[Delivery]:
+    """
+    Send one digest per member across a bounded pool and record the results.
+
+    Args:
+        client: Slack WebClient instance
+        events: Events or occurrences to remind
+        logger: Logger instance
+
+    Returns:
+        List[Delivery]: Results of all deliveries
+    """
+    digests = build_digests(events, logger)
+    if not digests:
+        return []
+
+    with ThreadPoolExecutor(max_workers=NOTIFY_WORKERS, thread_name_prefix="notify") as executor:
+        # One context copy per task, a Context cannot be entered by two threads at once
+        futures = [
+            executor.submit(propagate(send_digest), client, user_id, user_events, logger)
+            for user_id, user_events in digests.items()
+        ]
+        deliveries = [future.result() for future in futures]
+
+    try:
+        save_reminder_deliveries([
+            (d.user_id, ",".join(map(str, d.event_ids)), d.status, d.attempts, d.error)
+            for d in deliveries
+        ], logger)
+    except Exception as e:
+        logger.error(f"Error saving reminder deliveries: {datetime.now()} - {e}")
+
+    failed = sum(1 for d in deliveries if d.status != "sent")
+    logger.info(f"Sent {len(deliveries) - failed} reminder digests, {failed} failed")
+    return deliveries
@@ -0,0 +1,235 @@
+"""
+Dispatcher of the transactional outbox, the change feed of all processes.
+
+Event and participation writes add an outbox message in the transaction of
+the change, other cached data (settings, users, series, directory) adds a
+"change" message after its write. The dispatcher of every process tails the
+outbox by ID and hands messages to subscribers registered with subscribe().
+
+Durable subscribers have a checkpoint stored in outbox_checkpoints, saved
+after their callback returned, so a message is delivered at least once, also
+across restarts. Register them in the leader process only. Callbacks must
+tolerate duplicates, the message ID identifies them. Other subscribers, like
+the cache invalidation of workers.share_changes, start at the newest message
+when the process starts and keep their position in memory.
+
+Writes of the process wake its dispatcher immediately, writes of the other
+processes are seen within POLL_INTERVAL.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+import threading
+import logging
+import json
+import time
+import os
+from db import (
+    add_change_listener, load_outbox_after, load_last_outbox_id, delete_outbox_before,
+    load_outbox_checkpoint, save_outbox_checkpoint
+)
+from metrics import register_gauge
+from tracing import start_span, end_span
+
+# Constants
+POLL_INTERVAL = 0.5
+BATCH_SIZE = 200
+RETRY_DELAY = 5.0
+# IDs are assigned before commit, a gap may still fill in; after this many seconds it is skipped as rolled back
+GAP_TIMEOUT = 5.0
+RETENTION = timedelta(days=7)
+CLEANUP_INTERVAL = timedelta(hours=1)
+WEBHOOK_TIMEOUT = 10
+STOP_TIMEOUT = 10.0
+
+class OutboxError(Exception):
+    """Base exception for outbox related errors"""
+    pass
+
+@dataclass
+class Subscriber:
+    name: str
+    callback: Callable[[Dict[str, Any]], None]
+    kinds: Optional[Set[str]] = None
+    durable: bool = True
+    last_id: Optional[int] = None
+    retry_at: float = 0.0
+
+_subscribers: Dict[str, Subscriber] = {}
+_subscribers_lock = threading.Lock()
+_wake = threading.Event()
+_stopped = threading.Event()
+_thread: Optional[threading.Thread] = None
+# First missing ID of a gap -> monotonic time the gap was first seen
+_gaps: Dict[int, float] = {}
+_last_seen_id = 0
+
+register_gauge("outbox_lag_messages", "Outbox messages not yet delivered to the slowest subscriber",
+               lambda: max((_last_seen_id - (s.last_id or _last_seen_id) for s in _subscribers.values()), default=0))
+
+def subscribe(
+    name: str,
+    callback: Callable[[Dict[str, Any]], None],
+    kinds: Optional[Set[str]] = None,
+    durable: bool = True
+) -> None:
+    """
+    Register subscriber of outbox messages.
+
+    A new subscriber starts at the newest message, a durable one later
+    continues from its checkpoint.
+
+    Args:
+        name: Unique name, the checkpoint is stored under it
+        callback: Called with id, kind, event_id, origin, payload and created_at of each message,
+            raising makes the dispatcher retry the message after RETRY_DELAY
+        kinds: Message kinds to deliver, None for all
+        durable: Keep the checkpoint in the database, False for per-process subscribers
+
+    Raises:
+        OutboxError: If the name is already registered
+    """
+    with _subscribers_lock:
+        if name in _subscribers:
+            raise OutboxError(f"Outbox subscriber {name} is already registered")
+        _subscribers[name] = Subscriber(name, callback, kinds, durable)
+    _wake.set()
+
+def on_change(kind: str, **keys: Any) -> None:
+    """Wake the dispatcher after a local write, so it does not wait for the next poll."""
+    if kind in ("participation", "event"):
+        _wake.set()
+
+add_change_listener(on_change)
+
+def decode_message(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {**row, "payload": json.loads(row["payload"])}
+
+def committed_prefix(rows: List[Dict[str, Any]], after_id: int) -> List[Dict[str, Any]]:
+    """
+    Get rows up to the first gap in IDs that may still be filled by a running transaction.
+    """
+    now = time.monotonic()
+    expected = after_id + 1
+    ready = []
+    for row in rows:
+        if row["id"] != expected and now - _gaps.setdefault(expected, now) < GAP_TIMEOUT:
+            return ready
+        ready.append(row)
+        expected = row["id"] + 1
+    return ready
+
+def deliver(subscriber: Subscriber, messages: List[Dict[str, Any]], logger: logging.Logger) -> None:
+    """Call subscriber for messages after its checkpoint and save the new checkpoint."""
+    last_id = subscriber.last_id
+    try:
+        for message in messages:
+            if message["id"] <= subscriber.last_id:
+                continue
+            if subscriber.kinds is None or message["kind"] in subscriber.kinds:
+                span, token = start_span(f"outbox {subscriber.name}", **{"outbox.message_id": message["id"]})
+                error = None
+                try:
+                    subscriber.callback(message)
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    end_span(span, token, error)
+            last_id = message["id"]
+    except Exception as e:
+        logger.error(f"Outbox subscriber {subscriber.name} failed, retrying in {RETRY_DELAY} s: {datetime.now()} - {e}")
+        subscriber.retry_at = time.monotonic() + RETRY_DELAY
+    if last_id != subscriber.last_id:
+        if subscriber.durable:
+            save_outbox_checkpoint(subscriber.name, last_id, logger)
+        subscriber.last_id = last_id
+
+def dispatch_pending(logger: logging.Logger) -> bool:
+    """
+    Deliver one batch of messages to all subscribers.
+
+    Returns:
+        bool: True if more messages may be waiting
+    """
+    global _last_seen_id
+    with _subscribers_lock:
+        subscribers = list(_subscribers.values())
+    for subscriber in subscribers:
+        if subscriber.last_id is None:
+            last_id = load_outbox_checkpoint(subscriber.name, logger) if subscriber.durable else None
+            if last_id is None:
+                last_id = load_last_outbox_id(logger)
+                if subscriber.durable:
+                    save_outbox_checkpoint(subscriber.name, last_id, logger)
+            subscriber.last_id = last_id
+
+    now = time.monotonic()
+    active = [subscriber for subscriber in subscribers if subscriber.retry_at <= now]
+    if not active:
+        return False
+
+    after_id = min(subscriber.last_id for subscriber in active)
+    rows = load_outbox_after(after_id, BATCH_SIZE, logger)
+    messages = [decode_message(row) for row in committed_prefix(rows, after_id)]
+    if rows:
+        _last_seen_id = max(_last_seen_id, rows[-1]["id"])
+    for missing in [missing for missing in _gaps if missing <= after_id]:
+        del _gaps[missing]
+
+    for subscriber in active:
+        deliver(subscriber, messages, logger)
+    return len(rows) == BATCH_SIZE and len(messages) == len(rows)
+
+def run_dispatcher(logger: logging.Logger) -> None:
+    next_cleanup = datetime.now()
+    while not _stopped.is_set():
+        _wake.wait(POLL_INTERVAL)
+        _wake.clear()
+        try:
+            if dispatch_pending(logger):
+                _wake.set()
+            if datetime.now() >= next_cleanup:
+                delete_outbox_before(datetime.now() - RETENTION, logger)
+                next_cleanup = datetime.now() + CLEANUP_INTERVAL
+        except Exception as e:
+            logger.error(f"Error dispatching outbox: {datetime.now()} - {e}")
+
+def post_to_webhook(url: str) -> Callable[[Dict[str, Any]], None]:
+    """Build subscriber posting each message as JSON, for integrations that poll the tables today."""
+    import requests
+
+    def post(message: Dict[str, Any]) -> None:
+        response = requests.post(
+            url,
+            data=json.dumps(message, default=str, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Idempotency-Key": str(message["id"])},
+            timeout=WEBHOOK_TIMEOUT
+        )
+        response.raise_for_status()
+    return post
+
+def subscribe_webhook() -> None:
+    """
+    Post attendance and event messages to OUTBOX_WEBHOOK_URL if set, called by the leader process.
+    """
+    if (url := os.getenv("OUTBOX_WEBHOOK_URL")) and "webhook" not in _subscribers:
+        subscribe("webhook", post_to_webhook(url), kinds={"participation", "event_created", "event_updated", "event_deleted"})
+
+def start_outbox_dispatcher(logger: logging.Logger) -> None:
+    """Start delivering outbox messages, called by every process."""
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+    _stopped.clear()
+    _thread = threading.Thread(target=run_dispatcher, args=(logger,), name="outbox-dispatcher", daemon=True)
+    _thread.start()
+
+def stop_outbox_dispatcher() -> None:
+    """Stop the dispatcher, durable subscribers continue from their checkpoint in the next leader."""
+    global _thread
+    _stopped.set()
+    _wake.set()
+    if _thread:
+        _thread.join(STOP_TIMEOUT)
+        _thread = None
@@ -0,0 +1,173 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, List, Optional
+import threading
+import logging
+import time
+import os
+import re
+
+# Constants
+DEFAULT_SLOW_QUERY_MS = 200
+# Same fingerprint is EXPLAINed at most once per interval
+EXPLAIN_INTERVAL = 600.0
+LATENCY_SAMPLES = 512
+TOP_QUERIES = 15
+
+STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+WHITESPACE = re.compile(r"\s+")
+
+@dataclass
+class QueryStats:
+    fingerprint: str
+    count: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    rows: int = 0
+    samples: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+    last_explained: float = 0.0
+
+    @property
+    def p95_seconds(self) -> float:
+        """95th percentile of the recent samples."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+_stats: Dict[str, QueryStats] = {}
+_lock = threading.Lock()
+_explainer: Optional[Callable[[str, Optional[tuple]], List[Dict[str, Any]]]] = None
+_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+
+def slow_query_threshold() -> float:
+    """Get slow query threshold in seconds from SLOW_QUERY_MS."""
+    return float(os.getenv("SLOW_QUERY_MS", DEFAULT_SLOW_QUERY_MS)) / 1000
+
+@lru_cache(maxsize=1024)
+def fingerprint(query: str) -> str:
+    """
+    Normalize query so calls differing only in values share statistics.
+
+    Placeholders and literals become "?", lists of them (IN lists and
+    multi-row VALUES) collapse to "(...)".
+    """
+    normalized = query.replace("%s", "?")
+    normalized = STRING_LITERAL.sub("?", normalized)
+    normalized = NUMBER_LITERAL.sub("?", normalized)
+    normalized = PLACEHOLDER_LIST.sub("(...)", normalized)
+    return WHITESPACE.sub(" ", normalized).strip()
+
+def set_explainer(explainer: Callable[[str, Optional[tuple]], List[Dict[str, Any]]]) -> None:
+    """Register function running EXPLAIN, provided by db.py."""
+    global _explainer
+    _explainer = explainer
+
+def explain_slow_query(query: str, params: Optional[tuple], seconds: float, logger: logging.Logger) -> None:
+    """Log slow query together with its EXPLAIN plan."""
+    plan = ""
+    try:
+        if _explainer and query.lstrip().lower().startswith("select"):
+            rows = _explainer(query, params)
+            plan = "\n".join(
+                f"  {row.get('table')}: type={row.get('type')} key={row.get('key')} "
+                f"rows={row.get('rows')} extra={row.get('Extra')}"
+                for row in rows
+            )
+    except Exception as e:
+        plan = f"  EXPLAIN failed: {e}"
+    logger.warning(f"Slow query ({seconds * 1000:.0f} ms): {fingerprint(query)}\n{plan}".rstrip())
+
+def record_query(
+    query: str,
+    params: Optional[tuple],
+    seconds: float,
+    rows: int,
+    failed: bool = False,
+    logger: Optional[logging.Logger] = None
+) -> None:
+    """
+    Add query execution to the statistics of its fingerprint.
+
+    Queries slower than the threshold are logged with EXPLAIN output,
+    produced off the calling thread.
+
+    Args:
+        query: Executed SQL
+        params: Query parameters
+        seconds: Duration of the execution
+        rows: Rows returned or affected
+        failed: Whether the query raised
+        logger: Optional logger instance
+    """
+    key = fingerprint(query)
+    explain = False
+    with _lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = QueryStats(key)
+        stats.count += 1
+        stats.errors += int(failed)
+        stats.total_seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+        stats.rows += rows
+        stats.samples.append(seconds)
+        now = time.monotonic()
+        if seconds >= slow_query_threshold() and now - stats.last_explained >= EXPLAIN_INTERVAL:
+            stats.last_explained = now
+            explain = True
+    if explain:
+        _explain_executor.submit(explain_slow_query, query, params, seconds, logger or logging.getLogger(__name__))
+
+def top_queries(limit: int = TOP_QUERIES, order_by: str = "total") -> List[Dict[str, Any]]:
+    """
+    Get fingerprints with the highest total (or p95) latency.
+
+    Args:
+        limit: Number of fingerprints
+        order_by: "total" or "p95"
+
+    Returns:
+        List[Dict[str, Any]]: Statistics of the fingerprints
+    """
+    with _lock:
+        snapshot = [
+            {
+                "fingerprint": stats.fingerprint,
+                "count": stats.count,
+                "errors": stats.errors,
+                "total_ms": stats.total_seconds * 1000,
+                "avg_ms": stats.total_seconds * 1000 / stats.count,
+                "p95_ms": stats.p95_seconds * 1000,
+                "max_ms": stats.max_seconds * 1000,
+                "rows": stats.rows
+            }
+            for stats in _stats.values()
+        ]
+    key = "p95_ms" if order_by == "p95" else "total_ms"
+    return sorted(snapshot, key=lambda row: row[key], reverse=True)[:limit]
+
+def format_top_queries(limit: int = TOP_QUERIES, order_by: str = "total") -> str:
+    """Format top fingerprints as plain text table."""
+    lines = [f"{'count':>7} {'total ms':>10} {'avg ms':>8} {'p95 ms':>8} {'max ms':>8} {'rows':>8}  query"]
+    for row in top_queries(limit, order_by):
+        lines.append(
+            f"{row['count']:>7} {row['total_ms']:>10.0f} {row['avg_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+            f"{row['max_ms']:>8.1f} {row['rows']:>8}  {row['fingerprint']}"
+        )
+    return "\n".join(lines)
+
+def dump_query_stats(logger: logging.Logger) -> None:
+    """Log top fingerprints, called on shutdown so the numbers outlive the process."""
+    if _stats:
+        logger.info(f"Query statistics since start:\n{format_top_queries()}")
+
+def reset_query_stats() -> None:
+    """Drop collected statistics."""
+    with _lock:
+        _stats.clear()
@@ -0,0 +1,272 @@
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+from datetime import datetime, date, timedelta
+from collections import OrderedDict
+import threading
+import logging
+from db import *
+
+# Constants
+RECURRENCE_HORIZON = timedelta(weeks=12)
+# Occurrences that are not materialized yet get IDs above all real events
+VIRTUAL_ID_BASE = 1_000_000_000
+OCCURRENCES_PER_SERIES = 10_000
+ALLOWED_INTERVALS = (1, 2)
+# Windows move with the current day, least recently used ones are dropped beyond this
+MAX_CACHED_WINDOWS = 32
+
+class RecurrenceError(Exception):
+    """Base exception for recurrence related errors"""
+    pass
+
+_cache: "OrderedDict[Tuple[date, date], List[Dict[str, Any]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def virtual_event_id(series_id: int, occurrence_index: int) -> int:
+    """Build ID of a not yet materialized occurrence."""
+    return VIRTUAL_ID_BASE + series_id * OCCURRENCES_PER_SERIES + occurrence_index
+
+def is_virtual_event_id(event_id: Any) -> bool:
+    """Check whether event ID points to a not yet materialized occurrence."""
+    return int(event_id) >= VIRTUAL_ID_BASE
+
+def split_virtual_event_id(event_id: Any) -> Tuple[int, int]:
+    """Split virtual event ID into series ID and occurrence index."""
+    return divmod(int(event_id) - VIRTUAL_ID_BASE, OCCURRENCES_PER_SERIES)
+
+def build_occurrence(series: Dict[str, Any], occurrence_index: int) -> Dict[str, Any]:
+    """Build event-like dictionary of n-th occurrence of the series."""
+    offset = timedelta(weeks=series['interval_weeks'] * occurrence_index)
+    return {
+        "id": virtual_event_id(series['id'], occurrence_index),
+        "name": series['name'],
+        "start_time": series['start_time'] + offset,
+        "end_time": series['end_time'] + offset,
+        "lock_time": series['lock_time'] + offset,
+        "type": series['type'],
+        "address": series['address'],
+        "series_id": series['id'],
+        "occurrence_index": occurrence_index
+    }
+
+def expand_series(
+    series: Dict[str, Any],
+    exceptions: Iterable[date],
+    window_start: datetime,
+    window_end: datetime
+) -> List[Dict[str, Any]]:
+    """
+    Expand series into occurrences ending after window start and starting before window end.
+
+    Args:
+        series: Series row
+        exceptions: Dates on which the series does not take place
+        window_start: Start of the window
+        window_end: End of the window
+
+    Returns:
+        List[Dict[str, Any]]: Occurrences ordered by start time
+    """
+    step = timedelta(weeks=series['interval_weeks'])
+    skipped = set(exceptions)
+    until = series.get('until_date')
+
+    # First occurrence whose end is after the window start
+    index = max(0, -((series['end_time'] - window_start) // step))
+    occurrences = []
+    while index < OCCURRENCES_PER_SERIES:
+        occurrence = build_occurrence(series, index)
+        if occurrence['start_time'] > window_end:
+            break
+        if until and occurrence['start_time'].date() > until:
+            break
+        if occurrence['end_time'] > window_start and occurrence['start_time'].date() not in skipped:
+            occurrences.append(occurrence)
+        index += 1
+    return occurrences
+
+def invalidate_occurrence_cache() -> None:
+    """Drop cached expansions, called whenever series or their rows change."""
+    notify_change("series")
+
+def on_change(kind: str, **keys: Any) -> None:
+    """Change listener, series may also be changed by another worker process."""
+    if kind == "series":
+        with _cache_lock:
+            _cache.clear()
+
+add_change_listener(on_change)
+
+def load_occurrences(window_start: date, window_end: date, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    """
+    Load not yet materialized occurrences of all series in the window of days.
+
+    Expansion is cached per window until a series or materialization changes,
+    at most MAX_CACHED_WINDOWS windows are kept.
+
+    Args:
+        window_start: First day of the window
+        window_end: Last day of the window
+        logger: Optional logger instance
+
+    Returns:
+        List[Dict[str, Any]]: Virtual occurrences ordered by start time
+    """
+    key = (window_start, window_end)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    start = datetime.combine(window_start, datetime.min.time())
+    end = datetime.combine(window_end, datetime.max.time())
+    series_rows = load_series_in_window(start, end, logger)
+    series_ids = [series['id'] for series in series_rows]
+
+    exceptions: Dict[int, List[date]] = {}
+    for row in load_series_exceptions(series_ids, logger):
+        exceptions.setdefault(row['series_id'], []).append(row['occurrence_date'])
+    materialized = {
+        (row['series_id'], row['occurrence_index'])
+        for row in load_materialized_occurrences(series_ids, logger)
+    }
+
+    occurrences = [
+        occurrence
+        for series in series_rows
+        for occurrence in expand_series(series, exceptions.get(series['id'], []), start, end)
+        if (series['id'], occurrence['occurrence_index']) not in materialized
+    ]
+    occurrences.sort(key=lambda e: e['start_time'])
+
+    with _cache_lock:
+        _cache[key] = occurrences
+        while len(_cache) > MAX_CACHED_WINDOWS:
+            _cache.popitem(last=False)
+    return occurrences
+
+def merge_events(events: List[Dict[str, Any]], occurrences: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge real events with virtual occurrences ordered by start time."""
+    return sorted([*events, *occurrences], key=lambda e: e['start_time'])
+
+def load_events_with_occurrences(event_type: Optional[str] = None, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    """
+    Load upcoming events including occurrences of series within the horizon.
+
+    Args:
+        event_type: Optional event type to filter by
+        logger: Optional logger instance
+
+    Returns:
+        List[Dict[str, Any]]: Events ordered by start time
+    """
+    now = datetime.now()
+    events = load_events_by_type_from_db(event_type, logger) if event_type else load_events_from_db(logger)
+    occurrences = [
+        occurrence
+        for occurrence in load_occurrences(now.date(), (now + RECURRENCE_HORIZON).date(), logger)
+        if occurrence['end_time'] > now and (not event_type or occurrence['type'] == event_type)
+    ]
+    return merge_events(events, occurrences)
+
+def load_occurrences_in_range(start_date: date, end_date: date, event_type: Optional[str] = None,
+                              logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    """Load virtual occurrences starting within the range of days."""
+    return [
+        occurrence
+        for occurrence in load_occurrences(start_date, end_date, logger)
+        if start_date <= occurrence['start_time'].date() <= end_date
+        and (not event_type or occurrence['type'] == event_type)
+    ]
+
+def load_event_or_occurrence(event_id: Any, logger: Optional[logging.Logger] = None) -> Optional[Dict[str, Any]]:
+    """
+    Load event by ID, expanding virtual occurrence IDs from their series.
+
+    Args:
+        event_id: Real or virtual event ID
+        logger: Optional logger instance
+
+    Returns:
+        Optional[Dict[str, Any]]: Event or None if not found
+    """
+    if not is_virtual_event_id(event_id):
+        return load_event_from_db(event_id, logger)
+
+    series_id, occurrence_index = split_virtual_event_id(event_id)
+    series = load_series_from_db(series_id, logger)
+    return build_occurrence(series, occurrence_index) if series else None
+
+def materialize_occurrence(event_id: Any, logger: Optional[logging.Logger] = None) -> int:
+    """
+    Get real event ID, inserting the occurrence row on first use.
+
+    Args:
+        event_id: Real or virtual event ID
+        logger: Optional logger instance
+
+    Returns:
+        int: ID of the event row
+
+    Raises:
+        RecurrenceError: If the series does not exist
+    """
+    if not is_virtual_event_id(event_id):
+        return int(event_id)
+
+    occurrence = load_event_or_occurrence(event_id, logger)
+    if not occurrence:
+        raise RecurrenceError(f"Series of occurrence {event_id} not found")
+
+    real_id = materialize_occurrence_to_db(occurrence, logger)
+    invalidate_occurrence_cache()
+    return real_id
+
+def create_series_from_event(
+    event: Dict[str, Any],
+    interval_weeks: int,
+    until_date: Optional[date],
+    exceptions: Iterable[date],
+    logger: Optional[logging.Logger] = None
+) -> int:
+    """
+    Turn event into the first occurrence of a recurring series.
+
+    Args:
+        event: Event row used as template
+        interval_weeks: Number of weeks between occurrences
+        until_date: Last day of the series, None for open-ended series
+        exceptions: Dates on which the series does not take place
+        logger: Optional logger instance
+
+    Returns:
+        int: ID of the new series
+
+    Raises:
+        RecurrenceError: If the interval is not supported or event already is in a series
+    """
+    if interval_weeks not in ALLOWED_INTERVALS:
+        raise RecurrenceError(f"Unsupported interval: {interval_weeks}")
+    if event.get('series_id'):
+        raise RecurrenceError(f"Event {event['id']} already is in series {event['series_id']}")
+
+    series_id = add_series_to_db(event, interval_weeks, until_date, logger)
+    attach_event_to_series(event['id'], series_id, 0, logger)
+    for occurrence_date in exceptions:
+        add_series_exception(series_id, occurrence_date, logger)
+
+    invalidate_occurrence_cache()
+    return series_id
+
+def delete_event_or_occurrence(event_id: Any, logger: Optional[logging.Logger] = None) -> None:
+    """
+    Delete event, keeping a deleted occurrence from being expanded again.
+
+    Args:
+        event_id: ID of the event row
+        logger: Optional logger instance
+    """
+    event = load_event_from_db(event_id, logger)
+    if event and event.get('series_id'):
+        add_series_exception(event['series_id'], event['start_time'].date(), logger)
+    delete_event(event_id, logger)
+    invalidate_occurrence_cache()
@@ -0,0 +1,205 @@
+from typing import Dict, List, Any, Optional, Set, Tuple
+from datetime import datetime, timedelta
+import threading
+import heapq
+import logging
+from slack_sdk import WebClient
+from db import (
+    add_change_listener, load_events_locking_between, load_materialized_occurrence,
+    load_sent_reminders, save_sent_reminder, delete_sent_reminders_before
+)
+from recurrence import load_occurrences, is_virtual_event_id, RECURRENCE_HORIZON
+from notifier import send_reminder_digests
+from metrics import register_gauge
+from tracing import start_span, end_span
+
+# Constants
+REMINDER_LEADS = (timedelta(hours=24), timedelta(hours=2))
+SCHEDULE_HORIZON = timedelta(days=7)
+# Horizon is re-read this often, event changes trigger a refresh through on_change()
+RELOAD_INTERVAL = timedelta(hours=6)
+RELOAD_RETRY = timedelta(minutes=5)
+# Reminders due this close together go out as one digest per member
+DIGEST_WINDOW = timedelta(minutes=30)
+
+# Heap of (fire_at, reminder_key, event)
+_heap: List[Tuple[datetime, str, Dict[str, Any]]] = []
+# Keys of sent reminders whose deadline has not passed yet, persisted in sent_reminders
+_fired: Set[str] = set()
+_condition = threading.Condition()
+_thread: Optional[threading.Thread] = None
+_stopped = threading.Event()
+_next_reload = datetime.min
+
+register_gauge("scheduler_pending_reminders", "Reminders waiting in the scheduler heap", lambda: len(_heap))
+
+def event_key(event: Dict[str, Any]) -> str:
+    """Build key that stays the same once an occurrence is materialized."""
+    if event.get("series_id") is not None and event.get("occurrence_index") is not None:
+        return f"s{event['series_id']}-{event['occurrence_index']}"
+    return f"e{event['id']}"
+
+def reminder_key(event: Dict[str, Any], lead: timedelta) -> str:
+    """Build key of a single reminder."""
+    return f"{event_key(event)}@{int(lead.total_seconds())}"
+
+def load_state(logger: logging.Logger) -> None:
+    """Load reminders sent by a previous process and drop expired ones."""
+    now = datetime.now()
+    try:
+        delete_sent_reminders_before(now, logger)
+        fired = set(load_sent_reminders(now, logger))
+    except Exception as e:
+        logger.error(f"Error loading sent reminders: {datetime.now()} - {e}")
+        return
+    with _condition:
+        _fired.clear()
+        _fired.update(fired)
+
+def mark_sent(key: str, event: Dict[str, Any], logger: logging.Logger) -> None:
+    """Persist the reminder as sent so it survives restarts."""
+    try:
+        save_sent_reminder(key, event["lock_time"], logger)
+    except Exception as e:
+        logger.error(f"Error saving sent reminder: {datetime.now()} - {e}")
+
+def load_upcoming_deadlines(now: datetime, logger: logging.Logger) -> List[Dict[str, Any]]:
+    """Load events and series occurrences locking within the horizon."""
+    end = now + SCHEDULE_HORIZON + max(REMINDER_LEADS)
+    events = load_events_locking_between(now, end, logger)
+    occurrences = [
+        occurrence
+        for occurrence in load_occurrences(now.date(), min(end, now + RECURRENCE_HORIZON).date(), logger)
+        if now < occurrence["lock_time"] <= end
+    ]
+    return [*events, *occurrences]
+
+def resolve_event(event: Dict[str, Any], logger: logging.Logger) -> Dict[str, Any]:
+    """
+    Get the event row of an occurrence materialized since it was scheduled.
+
+    Participations of a materialized occurrence belong to the real event, the
+    virtual one would remind members who already answered.
+    """
+    if not is_virtual_event_id(event["id"]):
+        return event
+    try:
+        return load_materialized_occurrence(event["series_id"], event["occurrence_index"], logger) or event
+    except Exception as e:
+        logger.error(f"Error resolving occurrence {event['id']}: {datetime.now()} - {e}")
+        return event
+
+def refresh_schedule(logger: logging.Logger) -> None:
+    """
+    Rebuild reminder heap from the database.
+
+    Called on startup, every RELOAD_INTERVAL and whenever events change.
+    Reminders missed while the bot was down are fired right away as long
+    as the deadline has not passed.
+
+    Args:
+        logger: Logger instance
+    """
+    global _next_reload
+    now = datetime.now()
+    try:
+        events = load_upcoming_deadlines(now, logger)
+    except Exception as e:
+        logger.error(f"Error loading deadlines: {datetime.now()} - {e}")
+        with _condition:
+            _next_reload = now + RELOAD_RETRY
+        return
+
+    with _condition:
+        fired = set(_fired)
+    heap = []
+    for event in events:
+        for lead in REMINDER_LEADS:
+            key = reminder_key(event, lead)
+            fire_at = event["lock_time"] - lead
+            if key in fired or fire_at > now + SCHEDULE_HORIZON:
+                continue
+            heap.append((max(fire_at, now), key, event))
+    heapq.heapify(heap)
+
+    with _condition:
+        _heap[:] = heap
+        _next_reload = now + RELOAD_INTERVAL
+        _condition.notify()
+
+def request_refresh() -> None:
+    """Ask the scheduler thread to reload deadlines."""
+    global _next_reload
+    with _condition:
+        _next_reload = datetime.now()
+        _condition.notify()
+
+def on_change(kind: str, **keys: Any) -> None:
+    """Change listener, deadlines move when events or series change in any worker."""
+    if kind in ("event", "series"):
+        request_refresh()
+
+add_change_listener(on_change)
+
+def run_scheduler(client: WebClient, logger: logging.Logger) -> None:
+    """
+    Sleep until the nearest reminder and fire it with those due shortly after, forever.
+
+    Args:
+        client: Slack WebClient instance
+        logger: Logger instance
+    """
+    while not _stopped.is_set():
+        with _condition:
+            now = datetime.now()
+            next_fire = _heap[0][0] if _heap else _next_reload
+            wake_at = min(next_fire, _next_reload)
+            if wake_at > now:
+                _condition.wait(timeout=(wake_at - now).total_seconds())
+                continue
+            due = []
+            while _heap and _heap[0][0] <= now + DIGEST_WINDOW:
+                due.append(heapq.heappop(_heap))
+            # Marked before sending so a concurrent refresh cannot queue them again
+            _fired.update(key for _, key, _ in due)
+
+        if not due:
+            refresh_schedule(logger)
+            continue
+
+        resolved = (resolve_event(event, logger) for _, _, event in due)
+        events = list({event["id"]: event for event in resolved}.values())
+        span, token = start_span("scheduler send_reminder_digests", events=len(events))
+        error = None
+        try:
+            send_reminder_digests(client, events, logger)
+        except Exception as e:
+            error = e
+            logger.error(f"Error sending reminders: {datetime.now()} - {e}")
+        finally:
+            end_span(span, token, error)
+        for _, key, event in due:
+            mark_sent(key, event, logger)
+
+def start_scheduler(client: WebClient, logger: logging.Logger) -> None:
+    """
+    Load sent reminders and deadlines and start the scheduler thread.
+
+    Args:
+        client: Slack WebClient instance
+        logger: Logger instance
+    """
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+    load_state(logger)
+    refresh_schedule(logger)
+    _stopped.clear()
+    _thread = threading.Thread(target=run_scheduler, args=(client, logger), name="scheduler", daemon=True)
+    _thread.start()
+
+def stop_scheduler() -> None:
+    """Stop the scheduler thread, sent reminders are already persisted."""
+    _stopped.set()
+    with _condition:
+        _condition.notify()
@@ -4,57 +4,24 @@ from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 import logging
 import config
+from querystats import top_queries
+from directory import get_channels, get_user_groups, is_group_member
 
 # Constants
 DEFAULT_OPTION = {"text": {"type": "plain_text", "text": "Žádná hodnota"}, "value": "None"}
+MAX_FINGERPRINT_LENGTH = 500
 
 class SettingsError(Exception):
     """Base exception for settings related errors"""
     pass
 
 def fetch_user_groups(client: WebClient, logger: logging.Logger) -> List[Dict[str, Any]]:
-    """Fetch user groups from Slack"""
-    try:
-        response = client.usergroups_list()
-        user_groups = [
-            {"text": {"type": "plain_text", "text": group["name"]}, "value": group["id"]}
-            for group in response["usergroups"]
-        ]
-        user_groups.insert(0, DEFAULT_OPTION)
-        return user_groups
-    except SlackApiError as e:
-        logger.error(f"Error fetching user groups: {e}")
-        return [DEFAULT_OPTION]
+    """Get user groups from the channel directory"""
+    return [DEFAULT_OPTION] + get_user_groups(client, logger)
 
 def fetch_channels(client: WebClient, logger: logging.Logger) -> List[Dict[str, Any]]:
-    """Fetch all channels from Slack (public + private) with pagination"""
-    try:
-        channels = []
-        cursor = None
-
-        while True:
-            response = client.conversations_list(
-                types="public_channel,private_channel",
-                exclude_archived=True,
-                limit=200,
-                cursor=cursor
-            )
-            batch = [
-                {"text": {"type": "plain_text", "text": channel["name"]}, "value": channel["id"]}
-                for channel in response["channels"]
-            ]
-            channels.extend(batch)
-
-            cursor = response.get("response_metadata", {}).get("next_cursor")
-            if not cursor:
-                break
-
-        channels.insert(0, DEFAULT_OPTION)
-        return channels
-
-    except SlackApiError as e:
-        logger.error(f"Error fetching channels: {e}")
-        return [DEFAULT_OPTION]
+    """Get all channels (public + private) from the channel directory"""
+    return [DEFAULT_OPTION] + get_channels(client, logger)
 
 def get_initial_option(id: Optional[str], array: List[Dict[str, Any]]) -> Tuple[str, str]:
     """Get initial option for a select menu"""
@@ -74,11 +41,18 @@ def build_settings_blocks(channels: List[Dict], config_values: Dict) -> List[Dic
         # Header section
         {
             "type": "actions",
-            "elements": [{
-                "type": "button",
-                "text": {"type": "plain_text", "text": "Zpět"},
-                "action_id": "go_to_attendance"
-            }]
+            "elements": [
+                {
+                    "type": "button",
+                    "text": {"type": "plain_text", "text": "Zpět"},
+                    "action_id": "go_to_attendance"
+                },
+                {
+                    "type": "button",
+                    "text": {"type": "plain_text", "text": "Statistiky dotazů"},
+                    "action_id": "show_query_stats"
+                }
+            ]
         },
         {
             "type": "header",
@@ -261,4 +235,62 @@ def go_to_settings(body: Dict[str, Any], client: WebClient, logger: logging.Logg
         user_id = body["user"]["id"]
         show_settings(client, user_id, logger)
     except Exception as e:
-        logger.error(f"Error: {datetime.now()} - {e}")
\ No newline at end of file
+        logger.error(f"Error: {datetime.now()} - {e}")
+
+def build_query_stats_blocks(order_by: str = "total") -> List[Dict]:
+    """Build blocks of the query statistics modal"""
+    rows = top_queries(order_by=order_by)
+    if not rows:
+        return [{
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": "Zatím nebyly zaznamenány žádné dotazy."}
+        }]
+
+    blocks = [{
+        "type": "context",
+        "elements": [{
+            "type": "mrkdwn",
+            "text": f"Seřazeno podle {'p95' if order_by == 'p95' else 'celkového času'}, od startu aplikace."
+        }]
+    }]
+    for row in rows:
+        query = row["fingerprint"][:MAX_FINGERPRINT_LENGTH]
+        blocks.extend([
+            {"type": "divider"},
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": (
+                        f"*{row['count']}×*, celkem {row['total_ms']:.0f} ms, "
+                        f"průměr {row['avg_ms']:.1f} ms, p95 {row['p95_ms']:.1f} ms, "
+                        f"max {row['max_ms']:.1f} ms, řádků {row['rows']}, chyb {row['errors']}\n"
+                        f"```{query}```"
+                    )
+                }
+            }
+        ])
+    return blocks
+
+def show_query_stats(body: Dict[str, Any], client: WebClient, logger: logging.Logger) -> None:
+    """
+    Open modal with the most expensive queries, admins only.
+    """
+    try:
+        user_id = body["user"]["id"]
+        if not is_group_member(client, config.admin_group, user_id):
+            return
+
+        client.views_open(
+            trigger_id=body["trigger_id"],
+            view={
+                "type": "modal",
+                "title": {"type": "plain_text", "text": "Statistiky dotazů"},
+                "close": {"type": "plain_text", "text": "Zavřít"},
+                "blocks": build_query_stats_blocks()
+            }
+        )
+    except SlackApiError as e:
+        logger.error(f"Slack API error showing query stats: {datetime.now()} - {e}")
+    except Exception as e:
+        logger.error(f"Error showing query stats: {datetime.now()} - {e}")
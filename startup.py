@@ -0,0 +1,130 @@
+from importlib.abc import Loader, MetaPathFinder
+from importlib.machinery import ModuleSpec
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import threading
+import logging
+import time
+import sys
+import os
+
+# Constants
+REPORT_MODULES = 15
+# Timing imports wraps every loader, so it is only done when asked for
+PROFILE_IMPORTS = os.getenv("STARTUP_PROFILE_IMPORTS") == "1"
+
+_started = time.perf_counter()
+_phases: List[Tuple[str, float]] = []
+# module -> (inclusive seconds, seconds spent in nested imports)
+_imports: Dict[str, List[float]] = {}
+_import_stack: List[str] = []
+_lock = threading.Lock()
+_reported = False
+
+class TimedLoader(Loader):
+    """Loader measuring how long executing the module takes."""
+
+    def __init__(self, loader: Loader):
+        self.loader = loader
+
+    def create_module(self, spec: ModuleSpec) -> Any:
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module: Any) -> None:
+        name = module.__name__
+        main_thread = threading.current_thread() is threading.main_thread()
+        if main_thread:
+            _import_stack.append(name)
+        start = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            if main_thread:
+                _import_stack.pop()
+                _imports.setdefault(name, [0.0, 0.0])[0] = elapsed
+                if _import_stack:
+                    parent = _imports.setdefault(_import_stack[-1], [0.0, 0.0])
+                    parent[1] += elapsed
+
+    def __getattr__(self, name: str) -> Any:
+        # get_resource_reader, is_package, ... of the wrapped loader
+        return getattr(self.loader, name)
+
+class ImportTimer(MetaPathFinder):
+    """Finder wrapping loaders found by the other finders with TimedLoader."""
+
+    def find_spec(self, fullname: str, path: Optional[Sequence[str]], target: Any = None) -> Optional[ModuleSpec]:
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = TimedLoader(spec.loader)
+                return spec
+        return None
+
+_timer = ImportTimer()
+if PROFILE_IMPORTS:
+    sys.meta_path.insert(0, _timer)
+
+def mark(phase: str) -> None:
+    """Record that the startup phase finished, measured from the first import of this module."""
+    with _lock:
+        _phases.append((phase, time.perf_counter() - _started))
+
+def top_imports(limit: int = REPORT_MODULES) -> List[Tuple[str, float, float]]:
+    """Get modules with the longest own import time as (module, own seconds, inclusive seconds)."""
+    rows = [(name, inclusive - nested, inclusive) for name, (inclusive, nested) in _imports.items()]
+    return sorted(rows, key=lambda row: row[1], reverse=True)[:limit]
+
+def format_report() -> str:
+    """Format phases and slowest imports as plain text."""
+    lines = ["Startup phases (seconds since start):"]
+    previous = 0.0
+    for phase, at in _phases:
+        lines.append(f"  {phase:<24} {at:>7.3f} (+{at - previous:.3f})")
+        previous = at
+    if PROFILE_IMPORTS:
+        lines.append(f"Slowest imports of {len(_imports)} modules (own / with nested imports, ms):")
+        for name, own, inclusive in top_imports():
+            lines.append(f"  {name:<40} {own * 1000:>8.1f} {inclusive * 1000:>8.1f}")
+    return "\n".join(lines)
+
+def report(logger: logging.Logger) -> None:
+    """Log the startup report once and stop timing imports."""
+    global _reported
+    with _lock:
+        if _reported:
+            return
+        _reported = True
+    if _timer in sys.meta_path:
+        sys.meta_path.remove(_timer)
+    logger.info(format_report())
+
+def on_socket_mode_hello(callback: Callable[[], None]) -> Callable[[Any, Dict[str, Any], Optional[str]], None]:
+    """Build Socket Mode message listener calling back on the first hello message."""
+    def listener(client: Any, message: Dict[str, Any], raw_message: Optional[str]) -> None:
+        if message.get("type") == "hello" and not _reported:
+            mark("socket_mode_hello")
+            callback()
+    return listener
+
+def warm_up(tasks: List[Tuple[str, Callable[[], Any]]], logger: logging.Logger) -> None:
+    """
+    Run warm-up tasks in a daemon thread, so connecting to Slack does not wait for them.
+
+    Args:
+        tasks: Pairs of name and function preparing what the first interaction needs
+        logger: Logger instance
+    """
+    def run() -> None:
+        for name, task in tasks:
+            start = time.perf_counter()
+            try:
+                task()
+                logger.debug(f"Warm-up {name} took {time.perf_counter() - start:.3f} s")
+            except Exception as e:
+                logger.error(f"Error warming up {name}: {datetime.now()} - {e}")
+    threading.Thread(target=run, name="warm-up", daemon=True).start()
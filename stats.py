@@ -0,0 +1,207 @@
+"""
+Member attendance statistics for admins, rendered from the attendance_rollups table.
+
+The rollups are kept up to date by the participation write path and count
+events once they start, the leader adds the answers of events that started
+every ROLLUP_REFRESH_INTERVAL. After data was loaded outside the bot
+(database import, dataset.py), rebuild them:
+
+    python stats.py --backfill
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+import threading
+import argparse
+import logging
+import locale
+import config
+from db import load_attendance_rollups, rebuild_attendance_rollups, refresh_started_event_rollups, season_of
+from directory import is_group_member
+
+# Constants
+EVENT_TYPES = ["Trénink", "Turnaj", "Ostatní"]
+DEFAULT_EVENT_TYPE = "Trénink"
+SEASON_OPTIONS = 3
+MEMBER_CATEGORIES = {"Open": "Open", "Women": "Women"}
+# Section text is limited to 3000 characters by Slack
+LINES_PER_SECTION = 20
+FILTERS_BLOCK = "stats_filters"
+# Seconds between counting events that started into the rollups
+ROLLUP_REFRESH_INTERVAL = 300
+
+_refresher: Optional[threading.Thread] = None
+_stopped = threading.Event()
+
+def recent_seasons(now: Optional[datetime] = None) -> List[str]:
+    """Get labels of the current and previous seasons, newest first."""
+    year = int(season_of(now or datetime.now()).split("/")[0])
+    return [f"{year - offset}/{(year - offset + 1) % 100:02d}" for offset in range(SEASON_OPTIONS)]
+
+def attendance_rate(row: Dict[str, Any]) -> float:
+    """Get share of answers that were Coming or Late."""
+    answered = row['coming'] + row['late'] + row['not_coming']
+    return (row['coming'] + row['late']) / answered if answered else 0.0
+
+def format_member_line(row: Dict[str, Any]) -> str:
+    """Format statistics of one member as a single mrkdwn line."""
+    attended = row['coming'] + row['late']
+    answered = attended + row['not_coming']
+    return (
+        f"*{row['name']}* {round(attendance_rate(row) * 100)} % ({attended}/{answered})"
+        f" · pozdě {row['late']} · pozdní omluvy {row['late_cancellations']}"
+        f" · série {row['current_streak']} (nejdelší {row['best_streak']})"
+    )
+
+def build_option(value: str) -> Dict[str, Any]:
+    return {"text": {"type": "plain_text", "text": value}, "value": value}
+
+def build_stats_blocks(rows: List[Dict[str, Any]], season: str, event_type: str) -> List[Dict[str, Any]]:
+    """
+    Build Home tab blocks of the statistics dashboard.
+
+    Args:
+        rows: Rollups of members joined with their name and category
+        season: Selected season
+        event_type: Selected event type
+
+    Returns:
+        List of block elements for the view
+    """
+    blocks = [
+        {
+            "type": "actions",
+            "block_id": FILTERS_BLOCK,
+            "elements": [
+                {
+                    "type": "button",
+                    "text": {"type": "plain_text", "text": "Zpět"},
+                    "action_id": "go_to_attendance"
+                },
+                {
+                    "type": "static_select",
+                    "action_id": "stats_season_select",
+                    "options": [build_option(option) for option in recent_seasons()],
+                    "initial_option": build_option(season)
+                },
+                {
+                    "type": "static_select",
+                    "action_id": "stats_type_select",
+                    "options": [build_option(option) for option in EVENT_TYPES],
+                    "initial_option": build_option(event_type)
+                }
+            ]
+        },
+        {
+            "type": "header",
+            "text": {"type": "plain_text", "text": f"Statistiky docházky {season} – {event_type}", "emoji": True}
+        },
+        {
+            "type": "context",
+            "elements": [{
+                "type": "mrkdwn",
+                "text": "Účast z odpovědí (přijdu a přijdu později), pozdní omluvy méně než 24 h před začátkem, "
+                        "série po sobě jdoucích účastí"
+            }]
+        }
+    ]
+
+    if not rows:
+        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": "Pro tuto sezónu nejsou žádné odpovědi."}})
+        return blocks
+
+    for category, title in MEMBER_CATEGORIES.items():
+        members = sorted(
+            (row for row in rows if row['category'] == category),
+            key=lambda row: (-attendance_rate(row), locale.strxfrm(row['name']))
+        )
+        if not members:
+            continue
+        blocks.append({"type": "divider"})
+        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": f"*{title}* ({len(members)})"}})
+        for start in range(0, len(members), LINES_PER_SECTION):
+            lines = [format_member_line(row) for row in members[start:start + LINES_PER_SECTION]]
+            blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": "\n".join(lines)}})
+    return blocks
+
+def show_stats(
+    client: WebClient,
+    user_id: str,
+    logger: logging.Logger,
+    season: Optional[str] = None,
+    event_type: Optional[str] = None
+) -> None:
+    """
+    Show statistics dashboard in the Home tab, admins only.
+
+    Args:
+        client: Slack WebClient instance
+        user_id: User ID to show the dashboard to
+        logger: Logger instance
+        season: Season to show, defaults to the current one
+        event_type: Event type to show, defaults to trainings
+    """
+    try:
+        if not is_group_member(client, config.admin_group, user_id):
+            return
+        season = season or season_of(datetime.now())
+        event_type = event_type or DEFAULT_EVENT_TYPE
+        rows = load_attendance_rollups(season, event_type, logger)
+
+        client.views_publish(
+            user_id=user_id,
+            view={
+                "type": "home",
+                "blocks": build_stats_blocks(rows, season, event_type)
+            }
+        )
+    except SlackApiError as e:
+        logger.error(f"Slack API error showing statistics: {datetime.now()} - {e}")
+    except Exception as e:
+        logger.error(f"Error showing statistics: {datetime.now()} - {e}")
+
+def run_rollup_refresher(logger: logging.Logger) -> None:
+    while True:
+        try:
+            rows = refresh_started_event_rollups(logger)
+            if rows:
+                logger.info(f"Counted started events into {rows} rollup rows")
+        except Exception as e:
+            logger.error(f"Error refreshing attendance rollups: {datetime.now()} - {e}")
+        if _stopped.wait(ROLLUP_REFRESH_INTERVAL):
+            return
+
+def start_rollup_refresher(logger: logging.Logger) -> None:
+    """Count events into the rollups as they start, run by the leader process."""
+    global _refresher
+    if _refresher and _refresher.is_alive():
+        return
+    _stopped.clear()
+    _refresher = threading.Thread(target=run_rollup_refresher, args=(logger,), name="rollup-refresher", daemon=True)
+    _refresher.start()
+
+def stop_rollup_refresher() -> None:
+    """Stop the refresher thread."""
+    _stopped.set()
+    if _refresher:
+        _refresher.join(timeout=5)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backfill", action="store_true", help="Rebuild all rollups from participants and history")
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.print_help()
+        return 1
+
+    logging.basicConfig(level=logging.INFO)
+    # Status texts of history rows are compared with the configured ones
+    config.load_settings()
+    start = datetime.now()
+    rows = rebuild_attendance_rollups(logging.getLogger(__name__))
+    print(f"Rebuilt {rows} rollup rows in {(datetime.now() - start).total_seconds():.1f} s")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,201 @@
+from contextvars import ContextVar, Token, copy_context
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+import logging
+import json
+import time
+import os
+import urllib.request
+
+# Constants
+SERVICE_NAME = "slack-attendance"
+FLUSH_INTERVAL = 5.0
+MAX_QUEUED_SPANS = 10000
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    kind: int
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_queue: List[Span] = []
+_lock = threading.Lock()
+_flushed = threading.Condition(_lock)
+_enabled = False
+_file_path: Optional[str] = None
+_endpoint: Optional[str] = None
+_thread: Optional[threading.Thread] = None
+_dropped = 0
+
+def start_span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any) -> Tuple[Optional[Span], Optional[Token]]:
+    """
+    Start span as child of the current one and make it current.
+
+    Returns (None, None) when tracing is off, end_span() accepts that.
+
+    Args:
+        name: Span name
+        kind: OTLP span kind
+        attributes: Span attributes
+
+    Returns:
+        Tuple[Optional[Span], Optional[Token]]: Span and token restoring the parent
+    """
+    if not _enabled:
+        return None, None
+    parent = _current.get()
+    span = Span(
+        trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+        span_id=os.urandom(8).hex(),
+        parent_id=parent.span_id if parent else None,
+        name=name,
+        kind=kind,
+        start_ns=time.time_ns(),
+        attributes=attributes
+    )
+    return span, _current.set(span)
+
+def end_span(span: Optional[Span], token: Optional[Token], error: Optional[BaseException] = None) -> None:
+    """End span, restore its parent as current and queue it for export."""
+    if span is None:
+        return
+    span.end_ns = time.time_ns()
+    if error is not None:
+        span.error = f"{type(error).__name__}: {error}"
+    _current.reset(token)
+    global _dropped
+    with _lock:
+        if len(_queue) < MAX_QUEUED_SPANS:
+            _queue.append(span)
+        else:
+            _dropped += 1
+
+def propagate(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Bind func to the current context so spans started in a worker thread keep their parent."""
+    context = copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+def format_value(value: Any) -> Dict[str, Any]:
+    """Convert attribute value to OTLP AnyValue."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def format_span(span: Span) -> Dict[str, Any]:
+    """Convert span to OTLP/JSON."""
+    data = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [{"key": key, "value": format_value(value)} for key, value in span.attributes.items()],
+        "status": {"code": STATUS_ERROR, "message": span.error} if span.error else {"code": STATUS_OK}
+    }
+    if span.parent_id:
+        data["parentSpanId"] = span.parent_id
+    return data
+
+def build_export_request(spans: List[Span]) -> Dict[str, Any]:
+    """Build OTLP ExportTraceServiceRequest in JSON encoding."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": SERVICE_NAME},
+                "spans": [format_span(span) for span in spans]
+            }]
+        }]
+    }
+
+def export_spans(spans: List[Span], logger: logging.Logger) -> None:
+    """Append spans to the trace file and/or post them to the collector."""
+    request = build_export_request(spans)
+    payload = json.dumps(request, ensure_ascii=False)
+    if _file_path:
+        try:
+            with open(_file_path, "a", encoding="utf-8") as f:
+                f.write(payload + "\n")
+        except OSError as e:
+            logger.error(f"Error writing trace file: {datetime.now()} - {e}")
+    if _endpoint:
+        try:
+            http_request = urllib.request.Request(
+                _endpoint, data=payload.encode("utf-8"),
+                headers={"Content-Type": "application/json"}, method="POST"
+            )
+            with urllib.request.urlopen(http_request, timeout=5):
+                pass
+        except Exception as e:
+            logger.error(f"Error posting spans to collector: {datetime.now()} - {e}")
+
+def flush(logger: logging.Logger) -> None:
+    """Export all queued spans."""
+    global _dropped
+    with _lock:
+        spans = _queue[:]
+        _queue.clear()
+        dropped, _dropped = _dropped, 0
+    if dropped:
+        logger.warning(f"Dropped {dropped} spans, export queue was full")
+    if spans:
+        export_spans(spans, logger)
+
+def run_exporter(logger: logging.Logger) -> None:
+    """Flush queued spans every FLUSH_INTERVAL seconds."""
+    while _enabled:
+        with _flushed:
+            _flushed.wait(timeout=FLUSH_INTERVAL)
+        flush(logger)
+
+def start_tracing(logger: logging.Logger) -> None:
+    """
+    Enable tracing and start the exporter thread.
+
+    Spans are written as OTLP/JSON lines to TRACING_FILE and/or posted to
+    the OTLP/HTTP collector at OTEL_EXPORTER_OTLP_TRACES_ENDPOINT. Does
+    nothing unless one of them is set.
+
+    Args:
+        logger: Logger instance
+    """
+    global _enabled, _file_path, _endpoint, _thread
+    _file_path = os.getenv("TRACING_FILE")
+    _endpoint = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT")
+    if _enabled or not (_file_path or _endpoint):
+        return
+    _enabled = True
+    _thread = threading.Thread(target=run_exporter, args=(logger,), name="tracing", daemon=True)
+    _thread.start()
+    logger.info("Tracing enabled")
+
+def stop_tracing(logger: logging.Logger) -> None:
+    """Disable tracing and export the remaining spans."""
+    global _enabled
+    if not _enabled:
+        return
+    _enabled = False
+    with _flushed:
+        _flushed.notify()
+    if _thread:
+        _thread.join(timeout=FLUSH_INTERVAL)
+    flush(logger)
@@ -0,0 +1,156 @@
+from typing import Any, Dict, List, Optional, Set
+import unicodedata
+import threading
+import logging
+import locale
+from db import add_change_listener, load_users_from_db
+
+# Constants
+# Queries up to this length are looked up directly, longer ones intersect grams of it
+MAX_GRAM = 3
+DEFAULT_LIMIT = 100
+
+def fold(text: str) -> str:
+    """Lowercase text and strip diacritics, so "Šimon" is matched by "sim"."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+def grams(text: str) -> Set[str]:
+    """Get all substrings of text up to MAX_GRAM characters long."""
+    return {
+        text[start:start + length]
+        for length in range(1, MAX_GRAM + 1)
+        for start in range(len(text) - length + 1)
+    }
+
+class UserSearchIndex:
+    """
+    In-memory index of users answering typeahead queries without the database.
+
+    Every substring of up to MAX_GRAM characters of the folded name points to
+    the users containing it. Longer queries intersect the sets of their grams
+    and check the remaining candidates by substring, so the matching stays the
+    same as a substring scan. Results are ordered by Czech collation with sort
+    keys computed once per user.
+    """
+
+    def __init__(self):
+        self._users: Dict[str, Dict[str, Any]] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self, logger: Optional[logging.Logger] = None) -> None:
+        """Replace indexed users with the users table."""
+        users = load_users_from_db(logger=logger)
+        with self._lock:
+            self._users.clear()
+            self._grams.clear()
+            for user in users:
+                self._add(user['user_id'], user['name'], user.get('category'))
+            self._loaded = True
+
+    def invalidate(self) -> None:
+        """Drop indexed users, the next search loads them again."""
+        with self._lock:
+            self._loaded = False
+
+    def upsert(self, user_id: str, name: Optional[str] = None, category: Optional[str] = None) -> None:
+        """
+        Add user or update the indexed one.
+
+        Args:
+            user_id: User ID
+            name: New name, None keeps the indexed one
+            category: New category, None keeps the indexed one
+        """
+        with self._lock:
+            if not self._loaded:
+                return
+            current = self._users.get(user_id)
+            if current is None and name is None:
+                # Unknown user without a name cannot be indexed, reload instead
+                self._loaded = False
+                return
+            if current is not None:
+                self._remove(user_id)
+            self._add(
+                user_id,
+                name if name is not None else current['name'],
+                category if category is not None else (current or {}).get('category')
+            )
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+        """
+        Find users whose name contains the query, ignoring case and diacritics.
+
+        Args:
+            query: Text typed by the user, empty returns everyone
+            limit: Maximum number of results
+            logger: Optional logger instance
+
+        Returns:
+            List[Dict[str, Any]]: Users with user_id, name and category in Czech alphabetical order
+        """
+        if not self._loaded:
+            self.load(logger)
+        folded = fold(query.strip())
+        with self._lock:
+            if not folded:
+                candidates = self._users.values()
+            elif len(folded) <= MAX_GRAM:
+                candidates = [self._users[user_id] for user_id in self._grams.get(folded, ())]
+            else:
+                posting = sorted(
+                    (self._grams.get(folded[start:start + MAX_GRAM], set()) for start in range(len(folded) - MAX_GRAM + 1)),
+                    key=len
+                )
+                candidate_ids = posting[0].intersection(*posting[1:])
+                candidates = [
+                    self._users[user_id]
+                    for user_id in candidate_ids
+                    if folded in self._users[user_id]['folded']
+                ]
+            found = sorted(candidates, key=lambda user: user['sort_key'])[:limit]
+            return [
+                {"user_id": user['user_id'], "name": user['name'], "category": user['category']}
+                for user in found
+            ]
+
+    def _add(self, user_id: str, name: str, category: Optional[str]) -> None:
+        folded = fold(name)
+        self._users[user_id] = {
+            "user_id": user_id,
+            "name": name,
+            "category": category,
+            "folded": folded,
+            "sort_key": locale.strxfrm(name)
+        }
+        for gram in grams(folded):
+            self._grams.setdefault(gram, set()).add(user_id)
+
+    def _remove(self, user_id: str) -> None:
+        user = self._users.pop(user_id)
+        for gram in grams(user['folded']):
+            posting = self._grams.get(gram)
+            if posting is not None:
+                posting.discard(user_id)
+                if not posting:
+                    del self._grams[gram]
+
+user_index = UserSearchIndex()
+
+def search_users(query: str, limit: int = DEFAULT_LIMIT, logger: Optional[logging.Logger] = None) -> List[Dict[str, Any]]:
+    """Search users of the shared index, see UserSearchIndex.search."""
+    return user_index.search(query, limit, logger)
+
+def on_change(kind: str, **keys: Any) -> None:
+    """Keep the index in sync with users added or updated by check_user and update_user_category."""
+    if kind != "user":
+        return
+    if "user_id" in keys:
+        user_index.upsert(keys['user_id'], keys.get('name'), keys.get('category'))
+    else:
+        user_index.invalidate()
+
+add_change_listener(on_change)
@@ -0,0 +1,97 @@
+"""
+HTTP (Events API) entry point serving the same Bolt app as bot.py.
+
+Slack signs every request with the app's signing secret and Bolt rejects
+requests whose signature or timestamp does not match SLACK_SIGNING_SECRET
+before any listener runs. Every server worker calls create_application(),
+so do not use gunicorn's --preload, the background threads would stay in
+the master process. The listeners are synchronous, so only WSGI servers
+are supported.
+
+Usage:
+    gunicorn 'web:create_application()' --workers 4 --threads 8 --bind 0.0.0.0:3000
+
+Request URL in the Slack app settings: https://<host>/slack/events
+"""
+import startup
+import atexit
+import threading
+import logging
+import os
+from slack_bolt.adapter.wsgi import SlackRequestHandler
+from bot import app, client, on_connected
+from coalesce import flush_all
+from historylog import start_history_writer, stop_history_writer
+from export_jobs import start_export_recovery, shutdown_export_jobs
+from scheduler import start_scheduler, stop_scheduler
+from ical import start_feed_server, stop_feed_server
+from outbox import start_outbox_dispatcher, stop_outbox_dispatcher, subscribe_webhook
+from metrics import start_metrics_server, stop_metrics_server
+from tracing import start_tracing, stop_tracing
+from querystats import dump_query_stats
+from stats import start_rollup_refresher, stop_rollup_refresher
+from workers import share_changes, run_as_leader
+import config
+
+# Constants
+EVENTS_PATH = "/slack/events"
+# Metrics ports tried after METRICS_PORT, server workers have no index
+MAX_HTTP_WORKERS = 32
+
+class WebError(Exception):
+    """Base exception for HTTP entry point errors"""
+    pass
+
+logger = logging.getLogger(__name__)
+# Set once this process holds the leader lock and started the leader services
+_leader = threading.Event()
+
+def start_leader_services() -> None:
+    """Start services one process of all hosts runs, the leader lock decides which."""
+    _leader.set()
+    start_export_recovery(client, logger)
+    start_scheduler(client, logger)
+    start_feed_server(logger)
+    subscribe_webhook()
+    start_rollup_refresher(logger)
+
+def shutdown() -> None:
+    """Stop services and flush buffers when the server stops the worker."""
+    if _leader.is_set():
+        stop_scheduler()
+        stop_feed_server()
+        stop_rollup_refresher()
+    stop_outbox_dispatcher()
+    stop_metrics_server()
+    flush_all(logger)
+    stop_history_writer(logger)
+    shutdown_export_jobs()
+    dump_query_stats(logger)
+    stop_tracing(logger)
+
+def create_application() -> SlackRequestHandler:
+    """
+    Start the services of one server worker and build its WSGI application.
+
+    Returns:
+        SlackRequestHandler: WSGI application serving EVENTS_PATH
+
+    Raises:
+        WebError: If SLACK_SIGNING_SECRET is not set
+    """
+    if not os.getenv("SLACK_SIGNING_SECRET"):
+        raise WebError("SLACK_SIGNING_SECRET must be set, requests cannot be verified without it")
+
+    startup.mark("app_setup")
+    config.load_settings()
+    start_tracing(logger)
+    start_history_writer(logger)
+    share_changes(logger)
+    start_outbox_dispatcher(logger)
+    if os.getenv("RUN_BACKGROUND_SERVICES", "1") == "1":
+        run_as_leader(start_leader_services, logger)
+    start_metrics_server(logger, attempts=MAX_HTTP_WORKERS)
+    atexit.register(shutdown)
+    startup.mark("services")
+    on_connected()
+    return SlackRequestHandler(app, path=EVENTS_PATH)
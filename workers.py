@@ -0,0 +1,222 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Tuple
+import multiprocessing
+import threading
+import importlib
+import logging
+import signal
+import time
+import sys
+import os
+from db import (
+    add_change_listener, notify_change, connect_to_db, try_named_lock, holds_named_lock, DatabaseError,
+    process_origin, save_change_message
+)
+from outbox import subscribe
+
+# Constants
+# Slack allows at most 10 Socket Mode connections per app
+MAX_SOCKET_MODE_CONNECTIONS = 10
+RESTART_DELAY = 5.0
+STOP_TIMEOUT = 10.0
+# Kinds of change notifications whose writes add their own outbox message
+OUTBOX_KINDS = ("participation", "event")
+# MySQL named locks are server-wide, deployments sharing a server need distinct names
+DEFAULT_LEADER_LOCK = "attendance_leader"
+LEADER_RETRY_INTERVAL = 5.0
+LEADER_CHECK_INTERVAL = 10.0
+
+SOCKET_MODE_TRANSPORTS = {
+    "builtin": "slack_bolt.adapter.socket_mode.builtin",
+    "websocket_client": "slack_bolt.adapter.socket_mode.websocket_client"
+}
+
+class WorkerError(Exception):
+    """Base exception for worker related errors"""
+    pass
+
+# Set while applying a change of another process, so it is not sent back
+_applying_remote = threading.local()
+
+def socket_mode_layout() -> Tuple[int, int]:
+    """
+    Get number of worker processes and Socket Mode connections per process.
+
+    Read from SOCKET_MODE_WORKERS and SOCKET_MODE_CONNECTIONS, both default to 1.
+
+    Raises:
+        WorkerError: If the layout exceeds the connection limit of Slack
+    """
+    workers = int(os.getenv("SOCKET_MODE_WORKERS", "1"))
+    connections = int(os.getenv("SOCKET_MODE_CONNECTIONS", "1"))
+    if workers < 1 or connections < 1:
+        raise WorkerError("SOCKET_MODE_WORKERS and SOCKET_MODE_CONNECTIONS must be positive")
+    if workers * connections > MAX_SOCKET_MODE_CONNECTIONS:
+        raise WorkerError(f"Slack allows at most {MAX_SOCKET_MODE_CONNECTIONS} Socket Mode connections per app, "
+                          f"{workers} workers × {connections} connections requested")
+    return workers, connections
+
+def create_handler(app: Any, app_token: str) -> Any:
+    """
+    Create Socket Mode handler of the transport selected by SOCKET_MODE_TRANSPORT.
+
+    Args:
+        app: Bolt App instance
+        app_token: App-level token
+
+    Raises:
+        WorkerError: If the transport is unknown or its package is missing
+    """
+    transport = os.getenv("SOCKET_MODE_TRANSPORT", "builtin")
+    if transport not in SOCKET_MODE_TRANSPORTS:
+        raise WorkerError(f"Unknown Socket Mode transport {transport}, use one of {', '.join(SOCKET_MODE_TRANSPORTS)}")
+    try:
+        module = importlib.import_module(SOCKET_MODE_TRANSPORTS[transport])
+    except ImportError as e:
+        raise WorkerError(f"Socket Mode transport {transport} is not installed: {e}")
+    return module.SocketModeHandler(app, app_token)
+
+def apply_remote_change(kind: str, keys: Dict[str, Any], logger: logging.Logger) -> None:
+    """Notify local listeners about change made by another process, without sending it back."""
+    _applying_remote.active = True
+    try:
+        notify_change(kind, **keys)
+    except Exception as e:
+        logger.error(f"Error applying change of another process: {datetime.now()} - {e}")
+    finally:
+        _applying_remote.active = False
+
+def apply_outbox_message(message: Dict[str, Any], logger: logging.Logger) -> None:
+    """Notify local listeners about outbox message written by another process."""
+    if message["origin"] == process_origin():
+        return
+    payload = message["payload"]
+    if message["kind"] == "change":
+        apply_remote_change(payload["kind"], payload["keys"], logger)
+    elif message["kind"] == "participation":
+        apply_remote_change("participation", {"event_id": message["event_id"], "user_id": payload["user_id"]}, logger)
+    else:
+        apply_remote_change("event", {"event_id": message["event_id"]}, logger)
+
+def share_changes(logger: logging.Logger) -> None:
+    """
+    Exchange change notifications with other processes through the outbox.
+
+    Keeps caches built on db.py change listeners (occurrences, calendar
+    feeds, scheduler, settings, users, directory) coherent across worker
+    processes and hosts. Event and participation writes already add an
+    outbox message in their transaction, notifications of other kinds are
+    added by this process. Every process reads the messages of the others
+    through its outbox dispatcher.
+
+    Args:
+        logger: Logger instance
+    """
+    def publish(kind: str, **keys: Any) -> None:
+        if kind not in OUTBOX_KINDS and not getattr(_applying_remote, "active", False):
+            save_change_message(kind, keys, logger)
+
+    add_change_listener(publish)
+    subscribe("changes", lambda message: apply_outbox_message(message, logger), durable=False)
+
+def run_worker(target: Callable[[int], None], index: int) -> None:
+    """Entry point of a worker process."""
+    # SystemExit unwinds target's finally blocks, so the worker shuts down cleanly
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    target(index)
+
+def run_workers(count: int, target: Callable[[int], None], logger: logging.Logger) -> None:
+    """
+    Run target(index) in count forked processes until SIGTERM or SIGINT.
+
+    Workers that die are restarted after RESTART_DELAY.
+
+    Args:
+        count: Number of worker processes
+        target: Function running one worker, blocks until the worker stops
+        logger: Logger instance
+    """
+    # Forked workers inherit the imported app instead of importing bot.py again
+    context = multiprocessing.get_context("fork")
+    processes: Dict[int, Any] = {}
+    stopping = threading.Event()
+
+    def spawn(index: int) -> None:
+        process = context.Process(
+            target=run_worker, args=(target, index),
+            name=f"worker-{index}"
+        )
+        process.start()
+        processes[index] = process
+        logger.info(f"Started worker {index} (pid {process.pid})")
+
+    def stop(signum: int, frame: Any) -> None:
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(count):
+        spawn(index)
+    while not stopping.wait(RESTART_DELAY):
+        for index, process in list(processes.items()):
+            if not process.is_alive():
+                logger.error(f"Worker {index} exited with code {process.exitcode}, restarting: {datetime.now()}")
+                spawn(index)
+
+    for process in processes.values():
+        process.terminate()
+    for process in processes.values():
+        process.join(STOP_TIMEOUT)
+        if process.is_alive():
+            logger.error(f"Worker {process.name} did not stop in {STOP_TIMEOUT} s, killing: {datetime.now()}")
+            process.kill()
+
+def run_as_leader(start: Callable[[], None], logger: logging.Logger) -> None:
+    """
+    Call start once this process holds the leader lock in the database.
+
+    The lock is a MySQL named lock (LEADER_LOCK_NAME) held by a dedicated
+    connection, so exactly one process of all hosts is the leader. Waits in
+    a daemon thread, so when the leader dies and its connection closes,
+    another process takes over its background services. A leader that loses
+    its connection stops itself with SIGTERM, so the services never run twice.
+
+    Args:
+        start: Function starting the services only one process may run
+        logger: Logger instance
+    """
+    name = os.getenv("LEADER_LOCK_NAME", DEFAULT_LEADER_LOCK)
+
+    def wait() -> None:
+        connection = None
+        while True:
+            try:
+                if connection is None:
+                    connection = connect_to_db(dedicated=True)
+                if try_named_lock(connection, name):
+                    break
+            except DatabaseError as e:
+                logger.error(f"Error taking leader lock: {datetime.now()} - {e}")
+                connection = None
+            time.sleep(LEADER_RETRY_INTERVAL)
+
+        logger.info(f"Process {os.getpid()} is the leader")
+        try:
+            start()
+        except Exception as e:
+            logger.error(f"Error starting leader services: {datetime.now()} - {e}")
+
+        while True:
+            time.sleep(LEADER_CHECK_INTERVAL)
+            try:
+                held = holds_named_lock(connection, name)
+            except DatabaseError as e:
+                logger.error(f"Error checking leader lock: {datetime.now()} - {e}")
+                held = False
+            if not held:
+                logger.error(f"Process {os.getpid()} lost the leader lock, stopping: {datetime.now()}")
+                os.kill(os.getpid(), signal.SIGTERM)
+                return
+
+    threading.Thread(target=wait, name="leader", daemon=True).start()